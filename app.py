@@ -5,33 +5,83 @@ This module provides the application factory pattern for creating Flask app inst
 Routes are organized in separate blueprint modules in the routes package.
 """
 
-from flask import Flask
-from database import init_database, add_sample_data
+from contextlib import ExitStack
+from flask import Flask, appcontext_pushed, g
+from database import init_database, add_sample_data, use_database
 from routes import register_blueprints
+from commands import register_commands
+from middleware import register_middleware
+from json_provider import FastJSONProvider
+from branches import configure_branches
+from services.backup_service import DEFAULT_BACKUP_DIR, DEFAULT_KEEP, SnapshotScheduler
 
 
-def create_app():
+def create_app(config=None):
     """
     Application factory function to create and configure Flask app.
     
+    Args:
+        config: Optional mapping of config overrides (e.g. DATABASE path)
+    
     Returns:
         Flask: Configured Flask application instance
     """
     app = Flask(__name__)
     app.secret_key = "super secret key"
+    app.config.update(config or {})
+    app.json = FastJSONProvider(app)
     
-    # Initialize the database
-    init_database()
-    
-    # Add sample data for testing and demonstration
-    add_sample_data()
+    # A configured DATABASE is used by this app only (setup below, and every app context)
+    with ExitStack() as scope:
+        if app.config.get('DATABASE'):
+            scope.enter_context(use_database(app.config['DATABASE']))
+            _register_database_scope(app, app.config['DATABASE'])
+        
+        # Initialize the database
+        init_database()
+        
+        # Add sample data for testing and demonstration
+        add_sample_data()
+        
+        # Load the branch -> database map (branch databases get the current schema)
+        configure_branches(app.config)
+        
+        # Online snapshots (scheduled when BACKUP_INTERVAL is set, in seconds)
+        app.config.setdefault('BACKUP_DIR', DEFAULT_BACKUP_DIR)
+        app.config.setdefault('BACKUP_KEEP', DEFAULT_KEEP)
+        if app.config.get('BACKUP_INTERVAL'):
+            app.extensions['snapshot_scheduler'] = SnapshotScheduler(
+                app.config['BACKUP_INTERVAL'], app.config['BACKUP_DIR'], app.config['BACKUP_KEEP']).start()
     
     # Register all route blueprints
     register_blueprints(app)
     
+    # Register response compression and request/response size metrics
+    register_middleware(app)
+    
+    # Register CLI commands (flask export, ...)
+    register_commands(app)
+    
     return app
 
 
+def _register_database_scope(app, path):
+    """Route database calls made in the app's contexts (requests, CLI commands) to path."""
+
+    def select_database(sender, **extra):
+        scope = ExitStack()
+        scope.enter_context(use_database(path))
+        g.database_scope = scope
+
+    appcontext_pushed.connect(select_database, app, weak=False)
+
+    @app.teardown_appcontext
+    def release_database(exc):
+        scope = g.pop('database_scope', None)
+        if scope is not None:
+            scope.close()
+
+
 if __name__ == '__main__':
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
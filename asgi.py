@@ -0,0 +1,132 @@
+"""
+ASGI entry point for the async JSON API
+
+Serves the read-heavy API endpoints (/api/search and /api/late_fee/...) from
+an asyncio event loop, so slow database work does not hold a worker thread
+per in-flight request. Business logic is shared with the Flask app through
+services.library_service; blocking calls run on an AsyncDatabase pool.
+Requests are routed to a branch database by the X-Branch header or the
+``branch`` query parameter, as in the Flask app, and admitted by the same
+per-patron and per-client token buckets as the Flask app's "api" blueprint.
+
+Run with any ASGI server, e.g.:
+    uvicorn asgi:app --port 5001
+"""
+
+import math
+import re
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+import metrics
+from async_database import AsyncDatabase
+from branches import configure_branches, default_branch, get_branch_path
+from database import init_database, use_database
+from json_provider import dumps_bytes
+from middleware.rate_limit import DEFAULT_RATE_LIMITS, RateLimiter
+from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+
+LATE_FEE_PATH = re.compile(r'^/api/late_fee/(?P<patron_id>[^/]+)/(?P<book_id>\d+)$')
+
+
+class AsyncApi:
+    """Minimal ASGI application exposing the JSON API."""
+
+    def __init__(self, db: AsyncDatabase = None, rate_limits: Optional[Dict[str, Dict[str, str]]] = None):
+        """rate_limits: as the RATE_LIMITS config, only the "api" entry applies (default DEFAULT_RATE_LIMITS; {} disables)"""
+        self.db = db or AsyncDatabase()
+        self.limiter = RateLimiter(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        query = parse_qs(scope['query_string'].decode())
+        headers = dict(scope.get('headers') or [])
+        branch_id = headers.get(b'x-branch', b'').decode() or query.get('branch', [None])[0] or default_branch()
+
+        extra_headers = []
+        retry_after = self._admit(scope)
+        if scope['method'] not in ('GET', 'HEAD'):
+            status, body = 405, {'error': 'Method not allowed'}
+        elif retry_after:
+            status, body = 429, {'error': 'Too many requests. Please slow down.'}
+            extra_headers.append((b'retry-after', str(max(1, math.ceil(retry_after))).encode()))
+        elif branch_id is None:
+            status, body = await self.dispatch(scope['path'], query)
+        else:
+            try:
+                path = get_branch_path(branch_id)
+            except ValueError as e:
+                status, body = 404, {'error': str(e)}
+            else:
+                with use_database(path):
+                    status, body = await self.dispatch(scope['path'], query)
+
+        payload = dumps_bytes(body)
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode()),
+                        *extra_headers],
+        })
+        await send({'type': 'http.response.body', 'body': payload if scope['method'] == 'GET' else b''})
+
+    def _admit(self, scope) -> float:
+        """Take the request's tokens from the "api" buckets. Returns seconds to wait (0 if admitted)."""
+        if 'api' not in self.limiter.limits:
+            return 0.0
+        match = LATE_FEE_PATH.match(scope['path'])
+        client = scope.get('client')
+        retry_after, kind = self.limiter.check('api', {
+            'patron': match['patron_id'].strip() if match else None,
+            'client': client[0] if client else None,
+        })
+        if kind is not None:
+            metrics.increment(f'rate_limit.limited.api.{kind}')
+            return retry_after
+        metrics.increment('rate_limit.allowed.api')
+        return 0.0
+
+    async def dispatch(self, path: str, query: Dict) -> Tuple[int, Dict]:
+        """Route a request path to its handler and return (status, JSON body)."""
+        if path == '/api/search':
+            return await self.search_books(query)
+        match = LATE_FEE_PATH.match(path)
+        if match:
+            return await self.late_fee(match['patron_id'], int(match['book_id']))
+        return 404, {'error': 'Not found'}
+
+    async def search_books(self, query: Dict) -> Tuple[int, Dict]:
+        """Async counterpart of GET /api/search."""
+        search_term = query.get('q', [''])[0].strip()
+        search_type = query.get('type', ['title'])[0]
+        if not search_term:
+            return 400, {'error': 'Search term is required'}
+
+        books = await self.db.run(search_books_in_catalog, search_term, search_type)
+        return 200, {'search_term': search_term, 'search_type': search_type, 'results': books, 'count': len(books)}
+
+    async def late_fee(self, patron_id: str, book_id: int) -> Tuple[int, Dict]:
+        """Async counterpart of GET /api/late_fee/<patron_id>/<book_id>."""
+        result = await self.db.run(calculate_late_fee_for_book, patron_id, book_id)
+        return 501 if 'not implemented' in result.get('status', '') else 200, result
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.db.run(init_database)
+                # Branch map from LIBRARY_BRANCHES_FILE, as create_app loads it for the Flask app
+                await self.db.run(configure_branches, {})
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.db.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncApi()
@@ -0,0 +1,61 @@
+"""
+Async Database Module - Non-blocking access to the SQLite helpers
+Runs blocking database and service calls on a dedicated thread pool so an
+asyncio event loop stays free while SQLite works. Context variables (such
+as the active database) are carried over to the worker thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from database import get_db_connection
+
+# Worker threads available for database calls
+DEFAULT_MAX_WORKERS = 16
+
+
+class AsyncDatabase:
+    """
+    Executor-backed async facade over the synchronous database layer.
+
+    Example:
+        db = AsyncDatabase()
+        books = await db.run(search_books_in_catalog, "gatsby", "title")
+        row = await db.fetchone('SELECT * FROM books WHERE id = ?', (1,))
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='sqlite-async')
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """Run a blocking function on the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def fetchall(self, query: str, params: Tuple = ()) -> List[Dict]:
+        """Run a read query and return all rows as dicts."""
+        return await self.run(_fetch, query, params, False)
+
+    async def fetchone(self, query: str, params: Tuple = ()) -> Optional[Dict]:
+        """Run a read query and return the first row as a dict (or None)."""
+        return await self.run(_fetch, query, params, True)
+
+    def close(self):
+        """Stop the worker threads once pending calls finish."""
+        self._executor.shutdown(wait=True)
+
+
+def _fetch(query: str, params: Tuple, one: bool):
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(query, params)
+        if one:
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
@@ -0,0 +1,93 @@
+"""
+Branches Module - Routing library branches to their own database files
+Each branch keeps its catalog and circulation in a separate SQLite file
+(shard), so branches never share a write lock. The branch map is loaded once
+at startup; a process only needs the branches it serves, which lets branches
+be spread over processes and nodes independently.
+
+Configuration (app config or environment):
+    BRANCHES: Mapping of branch id -> database path
+    BRANCHES_FILE / LIBRARY_BRANCHES_FILE: JSON file {"branches": {...}, "default": "<id>"}
+    DEFAULT_BRANCH: Branch used when a request names none (default: DATABASE)
+"""
+
+import json
+import os
+import re
+from contextlib import contextmanager
+from typing import Dict, List, Mapping, Optional
+
+from database import init_database, use_database
+
+BRANCH_ID = re.compile(r'^[A-Za-z0-9_-]{1,32}$')
+
+_branches: Dict[str, str] = {}
+_default_branch: Optional[str] = None
+
+
+def load_branches(branches: Mapping[str, str], default: Optional[str] = None) -> None:
+    """
+    Replace the branch map and make sure every branch database has the current schema.
+
+    Raises:
+        ValueError: If a branch id is malformed or the default is not a configured branch
+    """
+    global _default_branch
+    for branch_id in branches:
+        if not BRANCH_ID.match(branch_id):
+            raise ValueError(f"Invalid branch id: {branch_id!r}.")
+    if default is not None and default not in branches:
+        raise ValueError(f"Default branch {default!r} is not configured.")
+
+    for path in branches.values():
+        with use_database(path):
+            init_database()
+
+    _branches.clear()
+    _branches.update(branches)
+    _default_branch = default
+
+
+def configure_branches(config: Mapping) -> None:
+    """Load the branch map from app config, a JSON file, or the environment."""
+    branches = dict(config.get('BRANCHES') or {})
+    default = config.get('DEFAULT_BRANCH')
+
+    path = config.get('BRANCHES_FILE') or os.environ.get('LIBRARY_BRANCHES_FILE')
+    if not branches and path:
+        with open(path) as f:
+            data = json.load(f)
+        branches = data.get('branches', {})
+        default = default or data.get('default')
+
+    load_branches(branches, default)
+
+
+def branch_ids() -> List[str]:
+    """Get the configured branch ids in sorted order."""
+    return sorted(_branches)
+
+
+def default_branch() -> Optional[str]:
+    """Get the branch used when a request names none (None: the main DATABASE)."""
+    return _default_branch
+
+
+def get_branch_path(branch_id: str) -> str:
+    """
+    Get the database file of a branch.
+
+    Raises:
+        ValueError: If the branch is not configured
+    """
+    try:
+        return _branches[branch_id]
+    except KeyError:
+        raise ValueError(f"Unknown branch: {branch_id}.")
+
+
+@contextmanager
+def use_branch(branch_id: str):
+    """Route database calls made inside the block to a branch's database file."""
+    with use_database(get_branch_path(branch_id)):
+        yield
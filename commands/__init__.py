@@ -0,0 +1,26 @@
+"""
+Commands Package - Initialize all Flask CLI command groups
+"""
+
+from .export_commands import export_cli
+from .analytics_commands import analytics_cli
+from .loadtest_commands import borrow_stress_cli, loadtest_cli
+from .hold_commands import holds_cli
+from .backup_commands import backup_cli
+from .inventory_commands import inventory_cli
+from .notification_commands import notices_cli
+from .archive_commands import archive_cli
+from .snapshot_commands import snapshot_cli
+
+def register_commands(app):
+    """Register all CLI command groups with the Flask app."""
+    app.cli.add_command(export_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(loadtest_cli)
+    app.cli.add_command(borrow_stress_cli)
+    app.cli.add_command(holds_cli)
+    app.cli.add_command(backup_cli)
+    app.cli.add_command(inventory_cli)
+    app.cli.add_command(notices_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(snapshot_cli)
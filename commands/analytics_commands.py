@@ -0,0 +1,20 @@
+"""
+Analytics Commands - Maintenance of the circulation rollup tables
+
+Usage:
+    flask analytics rebuild
+"""
+
+import click
+from database import rebuild_circulation_rollups
+
+@click.group('analytics')
+def analytics_cli():
+    """Circulation analytics maintenance."""
+
+@analytics_cli.command('rebuild')
+def rebuild():
+    """Recompute the circulation rollups from borrow_records."""
+    if not rebuild_circulation_rollups():
+        raise click.ClickException('Rebuilding circulation rollups failed.')
+    click.echo('Circulation rollups rebuilt.')
@@ -0,0 +1,26 @@
+"""
+Archive Commands - Move old returned loans into borrow_history
+
+Usage:
+    flask archive --retention-days 365
+    flask archive --batch-size 200 --max-batches 10
+"""
+
+import click
+from services.archive_service import DEFAULT_BATCH_SIZE, DEFAULT_RETENTION_DAYS, archive_closed_loans
+
+@click.command('archive')
+@click.option('--retention-days', default=DEFAULT_RETENTION_DAYS, show_default=True,
+              help='Keep loans returned within this many days in borrow_records.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, help='Loans moved per transaction.')
+@click.option('--max-batches', type=int, default=None, help='Stop after N batches (default: archive everything due).')
+def archive_cli(retention_days, batch_size, max_batches):
+    """Archive loans returned before the retention window."""
+    try:
+        result = archive_closed_loans(retention_days, batch_size, max_batches)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo(f"Archived {result['archived']} loan(s) returned before {result['cutoff']} "
+               f"in {result['batches']} batch(es).")
@@ -0,0 +1,82 @@
+"""
+Backup Commands - Online backups, snapshots and restore
+
+Usage:
+    flask backup create [--dest library-copy.db]
+    flask backup list
+    flask backup prune --keep 7
+    flask backup restore library-20240101-020000.db --yes
+    flask backup schedule --interval 3600 --keep 24
+"""
+
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from services.backup_service import (
+    BACKUP_PAGES_PER_STEP, BACKUP_STEP_SLEEP, SnapshotScheduler, backup_database, create_snapshot,
+    list_snapshots, prune_snapshots, resolve_snapshot, restore_snapshot
+)
+
+def _backup_dir():
+    return current_app.config['BACKUP_DIR']
+
+@click.group('backup', cls=AppGroup)
+def backup_cli():
+    """Online backups and snapshots of the library database."""
+
+@backup_cli.command('create')
+@click.option('--dest', default=None, help='Write the copy here instead of a timestamped snapshot.')
+@click.option('--pages', default=BACKUP_PAGES_PER_STEP, show_default=True, help='Pages copied per step.')
+@click.option('--sleep', default=BACKUP_STEP_SLEEP, show_default=True, help='Seconds to pause between steps.')
+def create(dest, pages, sleep):
+    """Back up the live database without stopping the app."""
+    if dest:
+        result = backup_database(dest, pages, sleep)
+    else:
+        result = create_snapshot(_backup_dir(), current_app.config['BACKUP_KEEP'], pages=pages, sleep=sleep)
+    click.echo(f"Backed up {result['pages']} pages to {result['path']} in {result['elapsed']}s "
+               f"({result['steps']} steps, {result['restarts']} restarts).")
+    for name in result.get('pruned', []):
+        click.echo(f'Pruned {name}')
+
+@backup_cli.command('list')
+def list_():
+    """List snapshots, newest first."""
+    for snapshot in list_snapshots(_backup_dir()):
+        click.echo(f"{snapshot['name']}  {snapshot['size']:>10}  {snapshot['created_at']}")
+
+@backup_cli.command('prune')
+@click.option('--keep', type=int, default=None, help='Snapshots to keep (default BACKUP_KEEP).')
+def prune(keep):
+    """Delete old snapshots beyond the retention limit."""
+    for name in prune_snapshots(_backup_dir(), keep or current_app.config['BACKUP_KEEP']):
+        click.echo(f'Pruned {name}')
+
+@backup_cli.command('restore')
+@click.argument('snapshot')
+@click.option('--no-save', is_flag=True, help='Do not snapshot the current data first.')
+@click.confirmation_option(prompt='Replace the current database with this snapshot?')
+def restore(snapshot, no_save):
+    """Restore the database from a snapshot name or file."""
+    try:
+        result = restore_snapshot(resolve_snapshot(snapshot, _backup_dir()), _backup_dir(), not no_save)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if result['pre_restore_snapshot']:
+        click.echo(f"Saved current data as {result['pre_restore_snapshot']}")
+    click.echo(f"Restored from {result['restored_from']}")
+
+@backup_cli.command('schedule')
+@click.option('--interval', default=3600.0, show_default=True, help='Seconds between snapshots.')
+@click.option('--keep', type=int, default=None, help='Snapshots to keep (default BACKUP_KEEP).')
+def schedule(interval, keep):
+    """Take snapshots every INTERVAL seconds until interrupted."""
+    scheduler = SnapshotScheduler(interval, _backup_dir(), keep or current_app.config['BACKUP_KEEP'])
+    click.echo(f"Snapshotting every {interval}s into {scheduler.backup_dir}; Ctrl+C to stop.")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        scheduler.stop()
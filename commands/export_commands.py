@@ -0,0 +1,31 @@
+"""
+Export Commands - Streaming CSV exports from the command line
+
+Usage:
+    flask export books --out books.csv
+    flask export borrow_records --out loans.csv.gz --start 2024-01-01 --end 2024-12-31
+"""
+
+import click
+from services.export_service import EXPORTABLE_TABLES, export_to_file
+
+@click.command('export')
+@click.argument('table', type=click.Choice(sorted(EXPORTABLE_TABLES)))
+@click.option('--out', 'out_path', required=True, help='Output file path (.gz enables gzip).')
+@click.option('--columns', default='', help='Comma separated list of columns to export.')
+@click.option('--start', 'start_date', type=click.DateTime(['%Y-%m-%d']), help='First borrow date to include.')
+@click.option('--end', 'end_date', type=click.DateTime(['%Y-%m-%d']), help='Last borrow date to include.')
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+def export_cli(table, out_path, columns, start_date, end_date, compress):
+    """Export TABLE as CSV without loading it into memory."""
+    columns = [c.strip() for c in columns.split(',') if c.strip()]
+    try:
+        written = export_to_file(
+            out_path, table, columns,
+            start_date.date() if start_date else None,
+            end_date.date() if end_date else None,
+            compress or out_path.endswith('.gz')
+        )
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    click.echo(f'Exported {table} to {out_path} ({written} bytes).')
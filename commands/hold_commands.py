@@ -0,0 +1,19 @@
+"""
+Hold Commands - Hold queue maintenance
+
+Usage:
+    flask holds expire
+"""
+
+import click
+from services.hold_service import expire_ready_holds
+
+@click.group('holds')
+def holds_cli():
+    """Hold queue maintenance."""
+
+@holds_cli.command('expire')
+def expire():
+    """Expire ready holds past their pickup deadline and pass the copies on."""
+    count = expire_ready_holds()
+    click.echo(f'Expired {count} hold(s).')
@@ -0,0 +1,29 @@
+"""
+Inventory Commands - Reconcile available copies with open loans and holds
+
+Usage:
+    flask inventory reconcile
+    flask inventory reconcile --repair --incremental
+"""
+
+import click
+from services.inventory_service import DEFAULT_REPAIR_BATCH_SIZE, reconcile_inventory
+
+@click.group('inventory')
+def inventory_cli():
+    """Inventory consistency checks."""
+
+@inventory_cli.command('reconcile')
+@click.option('--repair', is_flag=True, help='Fix drifted books (default: report only).')
+@click.option('--incremental', is_flag=True, help='Only check books touched since the last incremental run.')
+@click.option('--batch-size', default=DEFAULT_REPAIR_BATCH_SIZE, show_default=True,
+              help='Books repaired per transaction.')
+def reconcile(repair, incremental, batch_size):
+    """Compare available_copies with total copies minus open loans and ready holds."""
+    result = reconcile_inventory(repair, incremental, batch_size)
+    scope = 'all books' if result['checked'] is None else f"{result['checked']} touched book(s)"
+    click.echo(f"Checked {scope}: {len(result['drift'])} with drift.")
+    for d in result['drift']:
+        click.echo(f"  #{d['book_id']} {d['title']}: available {d['available_copies']}, expected {max(d['expected'], 0)}")
+    if repair:
+        click.echo(f"Repaired {len(result['repaired'])} book(s).")
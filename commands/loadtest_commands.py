@@ -0,0 +1,87 @@
+"""
+Load Test Commands - Replay a concurrent request mix and report latency percentiles
+
+Usage:
+    flask loadtest --workers 16 --duration 30
+    flask loadtest --processes --mix catalog=2,borrow=1,return=1
+    flask loadtest --target http://localhost:5000 --patrons 1 --books 3
+    flask loadtest --server both --workers 32
+    flask borrow-stress --workers 1,4,8 --processes
+"""
+
+import json
+import click
+from loadtest import (
+    ASGI_MIX, DEFAULT_MIX, SERVERS, compare_servers, format_report, parse_mix, run_borrow_stress, run_load_test
+)
+
+@click.command('loadtest')
+@click.option('--target', default=None, help='Base URL of a running app (default: seed and serve a temporary one).')
+@click.option('--workers', default=8, show_default=True, help='Concurrent workers.')
+@click.option('--duration', default=10.0, show_default=True, help='Run time in seconds.')
+@click.option('--requests', 'requests_per_worker', type=int, default=None, help='Stop each worker after N requests.')
+@click.option('--mix', default=None,
+              help='Weighted operation mix (default: ' + ','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())
+              + '; for the ASGI app ' + ','.join(f'{k}={v}' for k, v in ASGI_MIX.items()) + ').')
+@click.option('--processes', 'use_processes', is_flag=True, help='Use worker processes instead of threads.')
+@click.option('--server', type=click.Choice([*SERVERS, 'both']), default='wsgi', show_default=True,
+              help='App to serve: the Flask app, the ASGI JSON API, or both one after the other for comparison.')
+@click.option('--books', default=500, show_default=True, help='Seeded books (id range for requests).')
+@click.option('--patrons', default=200, show_default=True, help='Seeded patrons (id range for requests).')
+@click.option('--loans', default=1000, show_default=True, help='Seeded loan history.')
+@click.option('--seed', default=1, show_default=True, help='Random seed for data and request mix.')
+@click.option('--json', 'as_json', is_flag=True, help='Print the report as JSON.')
+def loadtest_cli(target, workers, duration, requests_per_worker, mix, use_processes, server,
+                 books, patrons, loans, seed, as_json):
+    """Generate concurrent load and report throughput and latency per endpoint."""
+    try:
+        mix = parse_mix(mix) if mix else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--mix')
+    if server == 'both' and target:
+        raise click.BadParameter('Comparing servers needs the locally served apps.', param_hint='--target')
+
+    options = dict(workers=workers, duration=duration, requests_per_worker=requests_per_worker, mix=mix,
+                   use_processes=use_processes, books=books, patrons=patrons, loans=loans, seed=seed)
+    try:
+        if server == 'both':
+            reports = compare_servers(**options)
+        else:
+            reports = {server: run_load_test(target, server=server, **options)}
+    except (ValueError, RuntimeError) as e:
+        raise click.ClickException(str(e))
+
+    if as_json:
+        click.echo(json.dumps(reports if server == 'both' else reports[server], indent=2))
+        return
+    for name, report in reports.items():
+        if server == 'both':
+            click.echo(f'[{name}]')
+        click.echo(format_report(report))
+
+
+@click.command('borrow-stress')
+@click.option('--workers', default='1,4,8', show_default=True, help='Comma-separated worker counts to run.')
+@click.option('--operations', default=200, show_default=True, help='Borrow/return attempts per worker.')
+@click.option('--processes', 'use_processes', is_flag=True, help='Use worker processes instead of threads.')
+@click.option('--books', default=20, show_default=True, help='Seeded books (fewer means more contention).')
+@click.option('--patrons', default=10, show_default=True, help='Patrons borrowing.')
+@click.option('--seed', default=1, show_default=True, help='Random seed for data and operations.')
+def borrow_stress_cli(workers, operations, use_processes, books, patrons, seed):
+    """Borrow and return concurrently on a temporary database and check the invariants."""
+    try:
+        counts = [int(w) for w in workers.split(',')]
+    except ValueError:
+        raise click.BadParameter('Expected comma-separated integers.', param_hint='--workers')
+
+    failed = False
+    for count in counts:
+        result = run_borrow_stress(count, operations, use_processes, books, patrons, seed)
+        violations = {name: found for name, found in result['invariants'].items() if found}
+        click.echo(f"{result['workers']:>3} {result['mode']:<9} {result['borrows_per_second']:>9.1f} borrows/s  "
+                   f"borrowed={result['borrowed']} returned={result['returned']} "
+                   f"refused={result['refused']} errors={result['errors']}  "
+                   f"{'VIOLATIONS ' + json.dumps(violations) if violations else 'ok'}")
+        failed = failed or bool(violations)
+    if failed:
+        raise click.ClickException('Borrowing invariants were violated.')
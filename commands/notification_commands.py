@@ -0,0 +1,32 @@
+"""
+Notification Commands - Due-soon and overdue notice batches
+
+Usage:
+    flask notices generate --days 3
+    flask notices flush outbox.jsonl
+"""
+
+import click
+from services.notification_service import DEFAULT_CHUNK_SIZE, DUE_SOON_DAYS, flush_outbox, generate_notifications
+
+@click.group('notices')
+def notices_cli():
+    """Patron due-soon and overdue notices."""
+
+@notices_cli.command('generate')
+@click.option('--days', default=DUE_SOON_DAYS, show_default=True, help='Due-soon window in days.')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Loans queued per transaction.')
+def generate(days, chunk_size):
+    """Queue notices for overdue loans and loans due soon (once per loan and due date)."""
+    try:
+        result = generate_notifications(days, chunk_size)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    click.echo(f"Batch {result['batch_id']}: {result['overdue']} overdue and {result['due_soon']} due-soon loan(s) queued.")
+
+@notices_cli.command('flush')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, help='Messages written per chunk.')
+def flush(path, chunk_size):
+    """Append unsent outbox messages to a JSONL file and mark them sent."""
+    click.echo(f'Wrote {flush_outbox(path, chunk_size)} message(s) to {path}.')
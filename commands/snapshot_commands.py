@@ -0,0 +1,21 @@
+"""
+Snapshot Commands - Build the memory-mapped loan snapshot used by analytics scans
+
+Usage:
+    flask snapshot --dir snapshots/loans
+    flask snapshot --full
+"""
+
+import click
+from services.loan_snapshot import DEFAULT_SNAPSHOT_DIR, build_loan_snapshot
+
+@click.command('snapshot')
+@click.option('--dir', 'snapshot_dir', default=DEFAULT_SNAPSHOT_DIR, show_default=True,
+              help='Directory holding the column files.')
+@click.option('--full', is_flag=True, help='Rebuild from scratch instead of exporting only new loans and returns.')
+def snapshot_cli(snapshot_dir, full):
+    """Bring the columnar loan snapshot up to date."""
+    result = build_loan_snapshot(snapshot_dir, full)
+    click.echo(f"{'Built' if result['full'] else 'Updated'} loan snapshot in {snapshot_dir}: "
+               f"{result['appended']} loan(s) appended, {result['patched']} return(s) applied, "
+               f"{result['rows']} row(s) total.")
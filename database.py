@@ -3,23 +3,99 @@ Database module for Library Management System
 Handles all database operations and connections
 """
 
+import contextvars
+import json
+import logging
 import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from db_writer import WriteQueue
+from fees import days_overdue, late_fee_for_days
+from isbn import isbn13_key
+
+logger = logging.getLogger(__name__)
 
 # Database configuration
 DATABASE = 'library.db'
 
+# Late fee assessed when a loan is returned, and how much of it has been paid
+FEE_COLUMNS = (('late_fee', 'REAL'), ('days_overdue', 'INTEGER'), ('fee_paid', 'REAL'))
+
+# One single-writer queue per database file
+_write_queues: Dict[str, WriteQueue] = {}
+_write_queues_lock = threading.Lock()
+
+def _connect(path: str):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row  # This enables column access by name
+    return conn
+
+# Database files whose schema has been brought up to date by this process
+_schema_checked = set()
+
+# Database file selected for the current request/task (None: use DATABASE)
+_active_database: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('active_database', default=None)
+
+def current_database_path() -> str:
+    """Get the path of the database file used by the current request or thread."""
+    return _active_database.get() or DATABASE
+
+@contextmanager
+def use_database(path: str):
+    """Route database calls made inside the block (in this context) to another file."""
+    token = _active_database.set(path)
+    try:
+        yield
+    finally:
+        _active_database.reset(token)
+
 def get_db_connection():
     """Get a database connection."""
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row  # This enables column access by name
+    path = current_database_path()
+    conn = _connect(path)
+    if path not in _schema_checked:
+        # Bring files created by an older version up to the current schema
+        _schema_checked.add(path)
+        create_schema(conn)
+        conn.commit()
     return conn
 
+def get_write_queue() -> WriteQueue:
+    """Get the single-writer queue for the current database file."""
+    path = current_database_path()
+    with _write_queues_lock:
+        writer = _write_queues.get(path)
+        if writer is None:
+            get_db_connection().close()  # make sure the schema is current
+            writer = WriteQueue(lambda: _connect(path))
+            _write_queues[path] = writer
+    return writer
+
+def write_queue_depth() -> int:
+    """Get the number of writes waiting for the current database's writer (0 if it has none yet)."""
+    writer = _write_queues.get(current_database_path())
+    return writer.depth() if writer else 0
+
+def execute_write(operation: Callable, *args):
+    """
+    Run a write operation on the writer thread and wait for it to commit.
+    The operation receives the writer's connection as its first argument and
+    must not commit itself. Raises whatever the operation or commit raised.
+    """
+    return get_write_queue().submit(operation, *args).result()
+
 def init_database():
     """Initialize the database with required tables."""
     conn = get_db_connection()
-    
+    create_schema(conn)
+    conn.commit()
+    conn.close()
+
+def create_schema(conn):
+    """Create any missing tables and indexes on an open connection (does not commit)."""
     # Create books table
     conn.execute('''
         CREATE TABLE IF NOT EXISTS books (
@@ -28,9 +104,42 @@ def init_database():
             author TEXT NOT NULL,
             isbn TEXT UNIQUE NOT NULL,
             total_copies INTEGER NOT NULL,
-            available_copies INTEGER NOT NULL
+            available_copies INTEGER NOT NULL,
+            isbn13 INTEGER
         )
     ''')
+    if 'isbn13' not in {row[1] for row in conn.execute('PRAGMA table_info(books)')}:
+        # Files from before the integer key: add it and fill it in for valid ISBNs
+        conn.execute('ALTER TABLE books ADD COLUMN isbn13 INTEGER')
+        conn.executemany('UPDATE OR IGNORE books SET isbn13 = ? WHERE id = ?', [
+            (key, book_id) for book_id, isbn in conn.execute('SELECT id, isbn FROM books')
+            if (key := isbn13_key(isbn)) is not None
+        ])
+    # Canonical ISBN-13 key (NULL only for legacy rows whose ISBN does not validate)
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_books_isbn13
+        ON books (isbn13) WHERE isbn13 IS NOT NULL
+    ''')
+    # One index per catalog sort, with and without the author filter (see CATALOG_SORTS)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_title ON books (title)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_available_title
+        ON books (title) WHERE available_copies > 0
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_author_title ON books (author, title)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_books_availability ON books (available_copies)')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_author_availability
+        ON books (author, available_copies)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_copies_out
+        ON books ((total_copies - available_copies))
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_books_author_copies_out
+        ON books (author, (total_copies - available_copies))
+    ''')
     
     # Create borrow_records table
     conn.execute('''
@@ -41,12 +150,219 @@ def init_database():
             borrow_date TEXT NOT NULL,
             due_date TEXT NOT NULL,
             return_date TEXT,
+            late_fee REAL NOT NULL DEFAULT 0,
+            days_overdue INTEGER NOT NULL DEFAULT 0,
+            fee_paid REAL NOT NULL DEFAULT 0,
             FOREIGN KEY (book_id) REFERENCES books (id)
         )
     ''')
     
-    conn.commit()
-    conn.close()
+    # Supports keyset pagination of a patron's borrowing history
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_patron_history
+        ON borrow_records (patron_id, borrow_date, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_by_book
+        ON borrow_records (book_id) WHERE return_date IS NULL
+    ''')
+    
+    # Returned loans past the retention window move here (archive_loans), keeping
+    # borrow_records about the size of current circulation; ids are kept
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS borrow_history (
+            id INTEGER PRIMARY KEY,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            borrow_date TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            return_date TEXT NOT NULL,
+            late_fee REAL NOT NULL DEFAULT 0,
+            days_overdue INTEGER NOT NULL DEFAULT 0,
+            fee_paid REAL NOT NULL DEFAULT 0,
+            archived_at TEXT NOT NULL
+        )
+    ''')
+    for table in ('borrow_records', 'borrow_history'):
+        columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        if 'late_fee' not in columns:
+            # Files from before fees were stored at return: add them and record how late past
+            # returns were. Those patrons were told they owed nothing, so no fee is charged.
+            for column, kind in FEE_COLUMNS:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} {kind} NOT NULL DEFAULT 0')
+            conn.executemany(f'UPDATE {table} SET days_overdue = ? WHERE id = ?', [
+                (days_overdue(datetime.fromisoformat(due_date), datetime.fromisoformat(return_date)), loan_id)
+                for loan_id, due_date, return_date in conn.execute(f'''
+                    SELECT id, due_date, return_date FROM {table} WHERE return_date > due_date
+                ''')
+            ])
+    # Outstanding balances: returned loans whose assessed fee is not fully paid
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_unpaid_fees
+        ON borrow_records (patron_id, book_id) WHERE late_fee > fee_paid
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_history_patron_history
+        ON borrow_history (patron_id, borrow_date, id)
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_returned
+        ON borrow_records (return_date) WHERE return_date IS NOT NULL
+    ''')
+    # Every loan, open or archived (exports and rollup rebuilds)
+    conn.execute('''
+        CREATE VIEW IF NOT EXISTS all_borrow_records AS
+        SELECT id, patron_id, book_id, borrow_date, due_date, return_date FROM borrow_records
+        UNION ALL
+        SELECT id, patron_id, book_id, borrow_date, due_date, return_date FROM borrow_history
+    ''')
+    
+    # Circulation rollups, maintained incrementally by the borrow and return writes
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS circulation_daily (
+            day TEXT PRIMARY KEY,
+            checkouts INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            overdue_returns INTEGER NOT NULL DEFAULT 0,
+            loan_days_total REAL NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS book_circulation_daily (
+            day TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            checkouts INTEGER NOT NULL DEFAULT 0,
+            returns INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, book_id)
+        )
+    ''')
+    
+    # Create holds table (waiting -> ready -> fulfilled, or cancelled/expired)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'waiting',
+            ready_at TEXT,
+            expires_at TEXT,
+            FOREIGN KEY (book_id) REFERENCES books (id)
+        )
+    ''')
+    # FIFO queue per book, one active hold per patron and book, ready holds by pickup deadline
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_book_queue
+        ON holds (book_id, created_at) WHERE status = 'waiting'
+    ''')
+    conn.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_holds_active_patron
+        ON holds (patron_id, book_id) WHERE status IN ('waiting', 'ready')
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_ready_expiry
+        ON holds (expires_at) WHERE status = 'ready'
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_ready_by_book
+        ON holds (book_id) WHERE status = 'ready'
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_holds_active_by_patron
+        ON holds (patron_id, created_at) WHERE status IN ('waiting', 'ready')
+    ''')
+    # Per-book waiting queue version, bumped whenever a hold joins or leaves a waiting queue
+    # (hold queue cache invalidation across processes)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS hold_queue_versions (
+            book_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS holds_bump_queue_version_insert AFTER INSERT ON holds
+        WHEN NEW.status = 'waiting'
+        BEGIN
+            INSERT INTO hold_queue_versions (book_id, version) VALUES (NEW.book_id, 1)
+            ON CONFLICT (book_id) DO UPDATE SET version = version + 1;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS holds_bump_queue_version_update AFTER UPDATE OF status ON holds
+        WHEN (OLD.status = 'waiting') != (NEW.status = 'waiting')
+        BEGIN
+            INSERT INTO hold_queue_versions (book_id, version) VALUES (NEW.book_id, 1)
+            ON CONFLICT (book_id) DO UPDATE SET version = version + 1;
+        END
+    ''')
+    # Catalog version, bumped on every change to books (search cache invalidation)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)')
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS books_bump_version_{event.lower()} AFTER {event} ON books
+            BEGIN
+                UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+    # Append-only change log, written in the same transaction as each change
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS circulation_events (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT NOT NULL,
+            occurred_at TEXT NOT NULL,
+            book_id INTEGER,
+            patron_id TEXT,
+            payload TEXT NOT NULL DEFAULT '{}'
+        )
+    ''')
+    # A patron's latest event versions their cached status report
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_circulation_events_patron
+        ON circulation_events (patron_id, seq) WHERE patron_id IS NOT NULL
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS event_checkpoints (
+            consumer TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    ''')
+    # Due-soon / overdue notices: open loans by due date, one log row per loan, kind and due date
+    # (a renewed loan gets a new window), and one outbox message per patron per batch
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_borrow_records_open_by_due
+        ON borrow_records (due_date) WHERE return_date IS NULL
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notification_log (
+            record_id INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            notified_at TEXT NOT NULL,
+            PRIMARY KEY (record_id, kind, due_date)
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS notification_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL,
+            patron_id TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            sent_at TEXT,
+            UNIQUE (batch_id, patron_id)
+        )
+    ''')
+    conn.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+        ON notification_outbox (id) WHERE sent_at IS NULL
+    ''')
 
 def add_sample_data():
     """Add sample data to the database if it's empty."""
@@ -62,21 +378,13 @@ def add_sample_data():
         ]
         
         for title, author, isbn, copies in sample_books:
-            conn.execute('''
-                INSERT INTO books (title, author, isbn, total_copies, available_copies)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (title, author, isbn, copies, copies))
+            _insert_book(conn, title, author, isbn, copies, copies)
         
         # Make 1984 unavailable by adding a borrow record
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', ('123456', 3, 
-              (datetime.now() - timedelta(days=5)).isoformat(),
-              (datetime.now() + timedelta(days=9)).isoformat()))
+        borrow_date = datetime.now() - timedelta(days=5)
+        _insert_borrow_record(conn, '123456', 3, borrow_date, datetime.now() + timedelta(days=9))
         
-        # Update available copies for 1984
-        conn.execute('UPDATE books SET available_copies = 0 WHERE id = 3')
+        _update_book_availability(conn, 3, -1)
         
         conn.commit()
     
@@ -84,6 +392,13 @@ def add_sample_data():
 
 # Helper Functions for Database Operations
 
+# Catalog sort name -> (sort key expression, direction); every sort breaks ties on id
+CATALOG_SORTS = {
+    'title': ('title', 'ASC'),
+    'availability': ('available_copies', 'DESC'),
+    'copies_out': ('total_copies - available_copies', 'DESC'),
+}
+
 def get_all_books() -> List[Dict]:
     """Get all books from the database."""
     conn = get_db_connection()
@@ -91,6 +406,49 @@ def get_all_books() -> List[Dict]:
     conn.close()
     return [dict(book) for book in books]
 
+def get_books_page(sort: str, limit: int, after: Optional[Tuple] = None, available_only: bool = False,
+                   author: Optional[str] = None) -> List[Dict]:
+    """
+    Get one page of the catalog in a CATALOG_SORTS order.
+    Uses keyset pagination on (sort key, id): pass the last row's
+    (sort key, id) as `after` to fetch the next page.
+    available_only keeps books with a copy on the shelf; author is an exact match.
+    """
+    key, direction = CATALOG_SORTS[sort]
+    conditions = []
+    params = []
+    if available_only:
+        # Only the availability index and the partial title index may use this term; elsewhere "+"
+        # keeps it a plain filter so the planner walks the sort index instead of sorting a range
+        indexed = sort == 'availability' or (sort == 'title' and not author)
+        conditions.append('available_copies > 0' if indexed else '+available_copies > 0')
+    if author:
+        conditions.append('author = ?')
+        params.append(author)
+    if after:
+        # Spelled out rather than as a row value so expression keys still seek the index
+        op = '>' if direction == 'ASC' else '<'
+        conditions.append(f'{key} {op}= ? AND ({key} {op} ? OR id {op} ?)')
+        params.extend((after[0], after[0], after[1]))
+    params.append(limit)
+
+    conn = get_db_connection()
+    books = conn.execute(f'''
+        SELECT * FROM books
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY {key} {direction}, id {direction}
+        LIMIT ?
+    ''', params).fetchall()
+    conn.close()
+    return [dict(book) for book in books]
+
+def get_catalog_version() -> int:
+    """Get the catalog version (changes whenever any book row changes)."""
+    conn = get_db_connection()
+    version = conn.execute('SELECT version FROM catalog_version WHERE id = 1').fetchone()[0]
+    conn.close()
+    return version
+
 def get_book_by_id(book_id: int) -> Optional[Dict]:
     """Get a specific book by ID."""
     conn = get_db_connection()
@@ -99,12 +457,19 @@ def get_book_by_id(book_id: int) -> Optional[Dict]:
     return dict(book) if book else None
 
 def get_book_by_isbn(isbn: str) -> Optional[Dict]:
-    """Get a specific book by ISBN."""
+    """Get a specific book by ISBN, exactly as stored."""
     conn = get_db_connection()
     book = conn.execute('SELECT * FROM books WHERE isbn = ?', (isbn,)).fetchone()
     conn.close()
     return dict(book) if book else None
 
+def get_book_by_isbn13(isbn13: int) -> Optional[Dict]:
+    """Get a specific book by its ISBN-13 integer key."""
+    conn = get_db_connection()
+    book = conn.execute('SELECT * FROM books WHERE isbn13 = ?', (isbn13,)).fetchone()
+    conn.close()
+    return dict(book) if book else None
+
 def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     """Get currently borrowed books for a patron."""
     conn = get_db_connection()
@@ -130,6 +495,139 @@ def get_patron_borrowed_books(patron_id: str) -> List[Dict]:
     
     return borrowed_books
 
+def get_patron_loan_status(patron_id: str, as_of: datetime, first_week_days: int, first_week_rate: float,
+                           later_rate: float, max_fee: float) -> Dict:
+    """
+    Get a patron's open loans with their late fees and the totals, in one statement.
+    Fees follow the tiered schedule passed in: first_week_rate per day for the
+    first first_week_days days overdue, later_rate per day after that, capped
+    at max_fee per loan. Days overdue are whole days past the due date as of as_of.
+
+    Returns:
+        dict: {"loans": [{"book_id", "title", "author", "borrow_date", "due_date",
+                          "is_overdue", "days_overdue", "fee_amount"}, ...],
+               "total_borrowed", "currently_overdue", "total_late_fees"}
+    """
+    # The totals are window aggregates ordered like the patron history index, so nothing is sorted
+    conn = get_db_connection()
+    rows = conn.execute('''
+        WITH open_loans AS (
+            SELECT br.id, br.book_id, b.title, b.author, br.borrow_date, br.due_date,
+                   br.due_date < :as_of AS is_overdue,
+                   MAX(CAST(ROUND((julianday(:as_of) - julianday(br.due_date)) * 86400000) AS INTEGER)
+                       / 86400000, 0) AS days_overdue
+            FROM borrow_records br
+            JOIN books b ON b.id = br.book_id
+            WHERE br.patron_id = :patron_id AND br.return_date IS NULL
+        ), assessed AS (
+            SELECT *, ROUND(MIN(:max_fee, CASE
+                WHEN days_overdue <= :first_week_days THEN days_overdue * :first_week_rate
+                ELSE :first_week_days * :first_week_rate + (days_overdue - :first_week_days) * :later_rate
+            END), 2) AS fee_amount
+            FROM open_loans
+        )
+        SELECT *,
+               COUNT(*) OVER loans AS total_borrowed,
+               SUM(is_overdue) OVER loans AS currently_overdue,
+               SUM(fee_amount) OVER loans AS total_late_fees
+        FROM assessed
+        WINDOW loans AS (ORDER BY borrow_date, id ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+        ORDER BY borrow_date, id
+    ''', {'patron_id': patron_id, 'as_of': as_of.isoformat(), 'first_week_days': first_week_days,
+          'first_week_rate': first_week_rate, 'later_rate': later_rate, 'max_fee': max_fee}).fetchall()
+    conn.close()
+
+    loans = [{
+        'book_id': row['book_id'],
+        'title': row['title'],
+        'author': row['author'],
+        'borrow_date': datetime.fromisoformat(row['borrow_date']),
+        'due_date': datetime.fromisoformat(row['due_date']),
+        'is_overdue': bool(row['is_overdue']),
+        'days_overdue': row['days_overdue'],
+        'fee_amount': row['fee_amount'],
+    } for row in rows]
+    first = rows[0] if rows else None
+    return {
+        'loans': loans,
+        'total_borrowed': first['total_borrowed'] if first else 0,
+        'currently_overdue': first['currently_overdue'] if first else 0,
+        'total_late_fees': round(first['total_late_fees'], 2) if first else 0.0,
+    }
+
+def get_patron_last_write(patron_id: str) -> int:
+    """Get the sequence number of the patron's latest circulation event (0 if none)."""
+    conn = get_db_connection()
+    seq = conn.execute('''
+        SELECT MAX(seq) FROM circulation_events WHERE patron_id = ?
+    ''', (patron_id,)).fetchone()[0]
+    conn.close()
+    return seq or 0
+
+def get_patron_borrow_history(patron_id: str, limit: int, before: Optional[Tuple[str, int]] = None,
+                              start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              status: str = 'all') -> List[Dict]:
+    """
+    Get one page of a patron's borrowing history, newest first.
+    Covers both current loans and archived ones (borrow_history).
+    Uses keyset pagination on (borrow_date, id): pass the last row's
+    (borrow_date, id) as `before` to fetch the next page.
+    start_date is inclusive and end_date exclusive (ISO strings);
+    status is 'all', 'open' or 'returned'.
+    """
+    conditions = ['br.patron_id = ?']
+    params = [patron_id]
+    if before:
+        conditions.append('(br.borrow_date, br.id) < (?, ?)')
+        params.extend(before)
+    if start_date:
+        conditions.append('br.borrow_date >= ?')
+        params.append(start_date)
+    if end_date:
+        conditions.append('br.borrow_date < ?')
+        params.append(end_date)
+    if status == 'open':
+        conditions.append('br.return_date IS NULL')
+    elif status == 'returned':
+        conditions.append('br.return_date IS NOT NULL')
+
+    # Archived loans are all returned; each side walks its own patron history index
+    tables = ['borrow_records'] if status == 'open' else ['borrow_records', 'borrow_history']
+    query = ' UNION ALL '.join(f'''
+        SELECT br.id AS id, br.book_id, br.borrow_date, br.due_date, br.return_date, br.late_fee, br.fee_paid,
+               b.title, b.author
+        FROM {table} br
+        JOIN books b ON br.book_id = b.id
+        WHERE {' AND '.join(conditions)}
+    ''' for table in tables)
+
+    conn = get_db_connection()
+    records = conn.execute(f'''
+        {query}
+        ORDER BY borrow_date DESC, id DESC
+        LIMIT ?
+    ''', params * len(tables) + [limit]).fetchall()
+    conn.close()
+
+    history = []
+    for record in records:
+        due_date = datetime.fromisoformat(record['due_date'])
+        return_date = datetime.fromisoformat(record['return_date']) if record['return_date'] else None
+        history.append({
+            'record_id': record['id'],
+            'book_id': record['book_id'],
+            'title': record['title'],
+            'author': record['author'],
+            'borrow_date': datetime.fromisoformat(record['borrow_date']),
+            'due_date': due_date,
+            'return_date': return_date,
+            'is_overdue': (return_date or datetime.now()) > due_date,
+            'late_fee': record['late_fee'],
+            'fee_paid': record['fee_paid'],
+        })
+
+    return history
+
 def get_patron_borrow_count(patron_id: str) -> int:
     """Get the number of books currently borrowed by a patron."""
     conn = get_db_connection()
@@ -140,62 +638,749 @@ def get_patron_borrow_count(patron_id: str) -> int:
     conn.close()
     return count
 
-def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
-    """Insert a new book into the database."""
+def get_outstanding_late_fees(patron_id: str, book_id: Optional[int] = None) -> float:
+    """Get the unpaid late fees assessed on a patron's returned loans (of one book, if given)."""
+    query = '''
+        SELECT SUM(late_fee - fee_paid) FROM borrow_records
+        WHERE patron_id = ? AND late_fee > fee_paid
+    '''
+    params = [patron_id]
+    if book_id is not None:
+        query += ' AND book_id = ?'
+        params.append(book_id)
     conn = get_db_connection()
+    total = conn.execute(query, params).fetchone()[0]
+    conn.close()
+    return round(total or 0.0, 2)
+
+def iter_query_rows(query: str, params: Tuple = (), batch_size: int = 1000) -> Iterator[Tuple]:
+    """
+    Stream the rows of a query as plain tuples, fetching batch_size at a time.
+    The connection stays open until the generator is exhausted or closed.
+    """
+    conn = sqlite3.connect(current_database_path())
     try:
-        conn.execute('''
-            INSERT INTO books (title, author, isbn, total_copies, available_copies)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (title, author, isbn, total_copies, available_copies))
-        conn.commit()
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
         conn.close()
+
+def get_daily_circulation(start_day: str, end_day: str) -> List[Dict]:
+    """Get the daily circulation rollup rows for days in [start_day, end_day]."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT * FROM circulation_daily
+        WHERE day BETWEEN ? AND ?
+        ORDER BY day
+    ''', (start_day, end_day)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def get_circulation_totals(start_day: str, end_day: str) -> Dict:
+    """Get circulation rollup totals for days in [start_day, end_day]."""
+    conn = get_db_connection()
+    totals = conn.execute('''
+        SELECT COALESCE(SUM(checkouts), 0) AS checkouts,
+               COALESCE(SUM(returns), 0) AS returns,
+               COALESCE(SUM(overdue_returns), 0) AS overdue_returns,
+               COALESCE(SUM(loan_days_total), 0) AS loan_days_total
+        FROM circulation_daily
+        WHERE day BETWEEN ? AND ?
+    ''', (start_day, end_day)).fetchone()
+    conn.close()
+    return dict(totals)
+
+def get_top_borrowed_books(start_day: str, end_day: str, limit: int) -> List[Dict]:
+    """Get the most borrowed books for days in [start_day, end_day] from the per-book rollup."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT r.book_id, b.title, b.author, SUM(r.checkouts) AS checkouts
+        FROM book_circulation_daily r
+        JOIN books b ON b.id = r.book_id
+        WHERE r.day BETWEEN ? AND ?
+        GROUP BY r.book_id
+        HAVING SUM(r.checkouts) > 0
+        ORDER BY checkouts DESC, r.book_id
+        LIMIT ?
+    ''', (start_day, end_day, limit)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def rebuild_circulation_rollups() -> bool:
+    """Recompute the circulation rollups from every loan, archived ones included (backfill or repair)."""
+    try:
+        execute_write(_rebuild_circulation_rollups)
         return True
-    except Exception as e:
-        conn.close()
+    except Exception:
+        logger.exception('Failed to rebuild circulation rollups')
+        return False
+
+def archive_loans(returned_before: datetime, batch_size: int, archived_at: datetime) -> int:
+    """
+    Move up to batch_size loans returned before returned_before from borrow_records
+    to borrow_history, oldest returns first, in one transaction. Loans with
+    unpaid late fees stay in borrow_records until they are paid.
+
+    Returns:
+        int: Number of loans moved (0 when none are left, -1 on error)
+    """
+    try:
+        return execute_write(_archive_loans, returned_before, batch_size, archived_at)
+    except Exception:
+        logger.exception('Failed to archive loans returned before %s', returned_before)
+        return -1
+
+def iter_open_loan_due_dates(batch_size: int = 5000) -> Iterator[Tuple[str, str]]:
+    """Stream (patron_id, due_date) for every open loan."""
+    return iter_query_rows(
+        'SELECT patron_id, due_date FROM borrow_records WHERE return_date IS NULL',
+        (), batch_size
+    )
+
+def iter_loans_after(record_id: int, batch_size: int = 5000) -> Iterator[Tuple]:
+    """
+    Stream (id, book_id, patron_id, borrow_date, due_date, return_date, late_fee)
+    for every loan, archived ones included, with an id above record_id, in id order.
+    """
+    return iter_query_rows('''
+        SELECT id, book_id, patron_id, borrow_date, due_date, return_date, late_fee FROM borrow_records
+        WHERE id > ?
+        UNION ALL
+        SELECT id, book_id, patron_id, borrow_date, due_date, return_date, late_fee FROM borrow_history
+        WHERE id > ?
+        ORDER BY id
+    ''', (record_id, record_id), batch_size)
+
+def get_loan_late_fees(record_ids: List[int]) -> Dict[int, float]:
+    """Get the stored late fee of each given loan, archived ones included (record id -> fee, None if unset)."""
+    if not record_ids:
+        return {}
+    placeholders = ', '.join('?' * len(record_ids))
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT id, late_fee FROM borrow_records WHERE id IN ({placeholders})
+        UNION ALL
+        SELECT id, late_fee FROM borrow_history WHERE id IN ({placeholders})
+    ''', record_ids + record_ids).fetchall()
+    conn.close()
+    return {row[0]: row[1] for row in rows}
+
+def get_events_after(seq: int, limit: int = 500, event_types: Optional[List[str]] = None) -> List[Dict]:
+    """
+    Get circulation events with a sequence number above seq, oldest first.
+
+    Returns:
+        list: Event dicts (seq, event_type, occurred_at, book_id, patron_id, payload)
+    """
+    query = 'SELECT * FROM circulation_events WHERE seq > ?'
+    params: list = [seq]
+    if event_types:
+        query += f" AND event_type IN ({', '.join('?' * len(event_types))})"
+        params.extend(event_types)
+    query += ' ORDER BY seq LIMIT ?'
+    params.append(limit)
+
+    conn = get_db_connection()
+    rows = conn.execute(query, params).fetchall()
+    conn.close()
+    return [dict(row, payload=json.loads(row['payload'])) for row in rows]
+
+def get_latest_event_seq() -> int:
+    """Get the sequence number of the newest circulation event (0 if none)."""
+    conn = get_db_connection()
+    seq = conn.execute('SELECT MAX(seq) FROM circulation_events').fetchone()[0]
+    conn.close()
+    return seq or 0
+
+def get_event_checkpoint(consumer: str) -> int:
+    """Get the last sequence number a consumer has processed (0 if it never ran)."""
+    conn = get_db_connection()
+    row = conn.execute('SELECT seq FROM event_checkpoints WHERE consumer = ?', (consumer,)).fetchone()
+    conn.close()
+    return row['seq'] if row else 0
+
+def save_event_checkpoint(consumer: str, seq: int) -> bool:
+    """Record that a consumer has processed every event up to seq."""
+    try:
+        execute_write(_save_event_checkpoint, consumer, seq, datetime.now())
+        return True
+    except Exception:
+        logger.exception('Failed to save event checkpoint for %s', consumer)
+        return False
+
+# Copies a book should have on the shelf: total minus open loans minus copies held for pickup
+EXPECTED_AVAILABILITY_SQL = '''
+    b.total_copies
+    - (SELECT COUNT(*) FROM borrow_records r WHERE r.book_id = b.id AND r.return_date IS NULL)
+    - (SELECT COUNT(*) FROM holds h WHERE h.book_id = b.id AND h.status = 'ready')
+'''
+
+def find_availability_drift(book_ids: Optional[List[int]] = None) -> List[Dict]:
+    """
+    Find books whose available_copies differs from the copies not on loan or held.
+
+    Args:
+        book_ids: Only check these books (default: every book)
+
+    Returns:
+        list: {"book_id", "title", "total_copies", "available_copies", "expected"} dicts
+    """
+    query = f'''
+        SELECT * FROM (
+            SELECT b.id AS book_id, b.title, b.total_copies, b.available_copies,
+                   {EXPECTED_AVAILABILITY_SQL} AS expected
+            FROM books b
+            {{where}}
+        )
+        WHERE available_copies != MAX(expected, 0)
+        ORDER BY book_id
+    '''
+    conn = get_db_connection()
+    if book_ids is None:
+        rows = conn.execute(query.format(where='')).fetchall()
+    else:
+        rows = []
+        for start in range(0, len(book_ids), 500):
+            chunk = book_ids[start:start + 500]
+            where = f"WHERE b.id IN ({', '.join('?' * len(chunk))})"
+            rows.extend(conn.execute(query.format(where=where), chunk).fetchall())
+    conn.close()
+    return [dict(row) for row in rows]
+
+def repair_book_availability(book_ids: List[int]) -> List[Dict]:
+    """
+    Reset available_copies to the expected value for the given books, in one transaction.
+    Drift is recomputed inside the transaction, so books fixed in the meantime are left alone.
+
+    Returns:
+        list: {"book_id", "before", "after"} for each book changed
+    """
+    return execute_write(_repair_book_availability, book_ids, datetime.now())
+
+def get_book_ids_in_events(after: int, through: int) -> List[int]:
+    """Get the distinct books named by events with after < seq <= through."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT DISTINCT book_id FROM circulation_events
+        WHERE seq > ? AND seq <= ? AND book_id IS NOT NULL
+    ''', (after, through)).fetchall()
+    conn.close()
+    return sorted(row[0] for row in rows)
+
+def get_notifiable_loans(kind: str, after: Tuple[str, int], due_before: str, limit: int) -> List[Dict]:
+    """
+    Get open loans due before due_before that have no `kind` notice for their
+    current due date, in (due_date, id) order. Uses keyset pagination: pass
+    (window start, 0) for the first chunk and the last row's (due_date, record_id) after that.
+
+    Returns:
+        list: {"record_id", "patron_id", "book_id", "title", "due_date"} dicts
+    """
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT br.id AS record_id, br.patron_id, br.book_id, b.title, br.due_date
+        FROM borrow_records br
+        JOIN books b ON b.id = br.book_id
+        WHERE br.return_date IS NULL AND (br.due_date, br.id) > (?, ?) AND br.due_date < ?
+          AND NOT EXISTS (
+              SELECT 1 FROM notification_log n
+              WHERE n.record_id = br.id AND n.kind = ? AND n.due_date = br.due_date
+          )
+        ORDER BY br.due_date, br.id
+        LIMIT ?
+    ''', (after[0], after[1], due_before, kind, limit)).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def get_pending_notifications(after_id: int = 0, limit: int = 100) -> List[Dict]:
+    """Get unsent outbox messages with an id above after_id, oldest first."""
+    conn = get_db_connection()
+    rows = conn.execute('''
+        SELECT * FROM notification_outbox
+        WHERE sent_at IS NULL AND id > ?
+        ORDER BY id
+        LIMIT ?
+    ''', (after_id, limit)).fetchall()
+    conn.close()
+    return [dict(row, payload=json.loads(row['payload'])) for row in rows]
+
+def get_active_hold(patron_id: str, book_id: int) -> Optional[Dict]:
+    """Get a patron's waiting or ready hold on a book."""
+    conn = get_db_connection()
+    hold = conn.execute('''
+        SELECT * FROM holds
+        WHERE patron_id = ? AND book_id = ? AND status IN ('waiting', 'ready')
+    ''', (patron_id, book_id)).fetchone()
+    conn.close()
+    return dict(hold) if hold else None
+
+def get_patron_holds(patron_id: str) -> List[Dict]:
+    """Get a patron's waiting and ready holds."""
+    conn = get_db_connection()
+    holds = conn.execute('''
+        SELECT h.*, b.title, b.author
+        FROM holds h
+        JOIN books b ON h.book_id = b.id
+        WHERE h.patron_id = ? AND h.status IN ('waiting', 'ready')
+        ORDER BY h.created_at
+    ''', (patron_id,)).fetchall()
+    conn.close()
+    return [dict(hold) for hold in holds]
+
+def get_waiting_holds(book_id: int) -> List[Dict]:
+    """Get the waiting holds on a book in queue (FIFO) order."""
+    conn = get_db_connection()
+    holds = conn.execute('''
+        SELECT id, patron_id, created_at FROM holds
+        WHERE book_id = ? AND status = 'waiting'
+        ORDER BY created_at, id
+    ''', (book_id,)).fetchall()
+    conn.close()
+    return [dict(hold) for hold in holds]
+
+def get_hold_queue_version(book_id: int) -> int:
+    """Get a book's waiting queue version (changes whenever a hold joins or leaves the queue)."""
+    conn = get_db_connection()
+    row = conn.execute('SELECT version FROM hold_queue_versions WHERE book_id = ?', (book_id,)).fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+def get_books_with_ready_holds(book_ids: List[int]) -> Set[int]:
+    """Get which of the given books have a copy reserved for a ready hold."""
+    if not book_ids:
+        return set()
+    conn = get_db_connection()
+    rows = conn.execute(f'''
+        SELECT DISTINCT book_id FROM holds
+        WHERE status = 'ready' AND book_id IN ({', '.join('?' * len(book_ids))})
+    ''', book_ids).fetchall()
+    conn.close()
+    return {row[0] for row in rows}
+
+def insert_hold(patron_id: str, book_id: int, created_at: datetime) -> Optional[int]:
+    """Insert a waiting hold and return its id (None on failure, e.g. a duplicate active hold)."""
+    try:
+        return execute_write(_insert_hold, patron_id, book_id, created_at)
+    except Exception:
+        logger.exception('Failed to place hold for patron %s, book %s', patron_id, book_id)
+        return None
+
+def cancel_hold(hold_id: int, now: datetime, pickup_deadline: datetime) -> Tuple[bool, Optional[Dict]]:
+    """
+    Cancel a waiting or ready hold. A ready hold's reserved copy is handed to
+    the next waiting hold (or made available) in the same transaction.
+
+    Returns:
+        tuple: (success: bool, handoff: hold the copy was assigned to, or None)
+    """
+    try:
+        return True, execute_write(_finish_hold, hold_id, 'cancelled', now, pickup_deadline)
+    except Exception:
+        logger.exception('Failed to cancel hold %s', hold_id)
+        return False, None
+
+def complete_return(patron_id: str, book_id: int, return_date: datetime,
+                    pickup_deadline: datetime) -> Tuple[Optional[bool], Optional[Dict], Optional[Dict]]:
+    """
+    Record a return and route the copy in one transaction: the loan's late fee
+    is assessed and stored, the next waiting hold on the book becomes ready
+    (until pickup_deadline); with no holds the copy goes back to available_copies.
+
+    Returns:
+        tuple: (success: bool, handoff: hold the copy was assigned to, or None,
+                fee: {"record_id", "fee_amount", "days_overdue"} assessed on the loan);
+               success is None if the patron had no open loan of the book
+               (e.g. a concurrent return closed it first)
+    """
+    try:
+        handoff, fee = execute_write(_complete_return, patron_id, book_id, return_date, pickup_deadline)
+        return True, handoff, fee
+    except ValueError:
+        return None, None, None
+    except Exception:
+        logger.exception('Failed to complete return for patron %s, book %s', patron_id, book_id)
+        return False, None, None
+
+def borrow_copy(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime, max_borrowed: int,
+                hold_id: Optional[int] = None) -> str:
+    """
+    Lend a copy in one transaction. The patron's open loans and the shelf (or the
+    patron's ready hold, when hold_id is given) are checked inside it, so concurrent
+    borrows can neither push a patron past max_borrowed nor take more copies than exist.
+
+    Returns:
+        str: "borrowed", "limit_reached", "unavailable" or "error"
+    """
+    try:
+        return execute_write(_borrow_copy, patron_id, book_id, borrow_date, due_date, max_borrowed, hold_id)
+    except Exception:
+        logger.exception('Failed to lend book %s to patron %s', book_id, patron_id)
+        return 'error'
+
+def borrow_held_copy(hold_id: int, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
+    """Lend the copy reserved by a ready hold and mark the hold fulfilled."""
+    try:
+        execute_write(_borrow_held_copy, hold_id, patron_id, book_id, borrow_date, due_date)
+        return True
+    except Exception:
+        logger.exception('Failed to lend held copy for hold %s', hold_id)
+        return False
+
+def expire_ready_holds(now: datetime, pickup_deadline: datetime) -> List[Dict]:
+    """
+    Expire ready holds whose pickup deadline has passed, handing each copy on.
+
+    Returns:
+        list: One {"hold_id", "book_id", "handoff"} entry per expired hold
+    """
+    return execute_write(_expire_ready_holds, now, pickup_deadline)
+
+def insert_book(title: str, author: str, isbn: str, total_copies: int, available_copies: int) -> bool:
+    """Insert a new book into the database."""
+    try:
+        execute_write(_insert_book, title, author, isbn, total_copies, available_copies)
+        return True
+    except Exception:
+        logger.exception('Failed to insert book %s', isbn)
         return False
 
 def insert_borrow_record(patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime) -> bool:
     """Insert a new borrow record into the database."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
-            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
-            VALUES (?, ?, ?, ?)
-        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat()))
-        conn.commit()
-        conn.close()
+        execute_write(_insert_borrow_record, patron_id, book_id, borrow_date, due_date)
         return True
-    except Exception as e:
-        conn.close()
+    except Exception:
+        logger.exception('Failed to insert borrow record for patron %s, book %s', patron_id, book_id)
+        return False
+
+def record_fee_payment(patron_id: str, book_id: int, amount: float, transaction_id: str, paid_at: datetime) -> bool:
+    """Record a successful late fee payment against the patron's unpaid fees for the book, oldest loan first."""
+    try:
+        execute_write(_record_fee_payment, patron_id, book_id, amount, transaction_id, paid_at)
+        return True
+    except Exception:
+        logger.exception('Failed to record payment %s for patron %s', transaction_id, patron_id)
         return False
 
 def update_book_availability(book_id: int, change: int) -> bool:
     """Update the available copies of a book by a given amount (+1 for return, -1 for borrow)."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
-            UPDATE books SET available_copies = available_copies + ? WHERE id = ?
-        ''', (change, book_id))
-        conn.commit()
-        conn.close()
+        execute_write(_update_book_availability, book_id, change)
         return True
-    except Exception as e:
-        conn.close()
+    except Exception:
+        logger.exception('Failed to update availability for book %s', book_id)
         return False
 
 def update_borrow_record_return_date(patron_id: str, book_id: int, return_date: datetime) -> bool:
     """Update the return date for a borrow record."""
-    conn = get_db_connection()
     try:
-        conn.execute('''
-            UPDATE borrow_records 
-            SET return_date = ? 
-            WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
-        ''', (return_date.isoformat(), patron_id, book_id))
-        conn.commit()
-        conn.close()
+        execute_write(_update_borrow_record_return_date, patron_id, book_id, return_date)
         return True
-    except Exception as e:
-        conn.close()
+    except Exception:
+        logger.exception('Failed to record return for patron %s, book %s', patron_id, book_id)
         return False
+
+def queue_notifications(batch_id: str, kind: str, loans: List[Dict], created_at: datetime) -> int:
+    """
+    Log `kind` notices for the loans and add them to their patrons' outbox messages for the batch,
+    in one transaction. Loans already noticed for their due date are skipped.
+
+    Returns:
+        int: Number of loans queued
+    """
+    return execute_write(_queue_notifications, batch_id, kind, loans, created_at)
+
+def mark_notifications_sent(notification_ids: List[int], sent_at: datetime) -> bool:
+    """Mark outbox messages as sent."""
+    try:
+        execute_write(_mark_notifications_sent, notification_ids, sent_at)
+        return True
+    except Exception:
+        logger.exception('Failed to mark %d notification(s) sent', len(notification_ids))
+        return False
+
+# Write operations - run on the writer thread via execute_write()
+
+def _insert_book(conn, title: str, author: str, isbn: str, total_copies: int, available_copies: int):
+    book_id = conn.execute('''
+        INSERT INTO books (title, author, isbn, isbn13, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', (title, author, isbn, isbn13_key(isbn), total_copies, available_copies)).lastrowid
+    _append_event(conn, 'book_added', datetime.now(), book_id=book_id,
+                  title=title, author=author, isbn=isbn, total_copies=total_copies)
+
+def _insert_borrow_record(conn, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime):
+    record_id = conn.execute('''
+        INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date)
+        VALUES (?, ?, ?, ?)
+    ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat())).lastrowid
+    _record_checkout(conn, book_id, borrow_date)
+    _append_event(conn, 'checkout', borrow_date, book_id=book_id, patron_id=patron_id,
+                  record_id=record_id, due_date=due_date.isoformat())
+
+def _update_book_availability(conn, book_id: int, change: int):
+    conn.execute('''
+        UPDATE books SET available_copies = available_copies + ? WHERE id = ?
+    ''', (change, book_id))
+
+def _assess_return(due_date: str, return_date: datetime) -> Tuple[int, float]:
+    overdue = days_overdue(datetime.fromisoformat(due_date), return_date)
+    return overdue, late_fee_for_days(overdue)
+
+def _update_borrow_record_return_date(conn, patron_id: str, book_id: int,
+                                      return_date: datetime) -> Optional[Dict]:
+    # One copy comes back per return: a patron holding two copies of a book closes the older loan first
+    loan = conn.execute('''
+        SELECT borrow_date, due_date, id FROM borrow_records
+        WHERE patron_id = ? AND book_id = ? AND return_date IS NULL
+        ORDER BY id LIMIT 1
+    ''', (patron_id, book_id)).fetchone()
+    if loan is None:
+        return None
+    overdue, fee = _assess_return(loan[1], return_date)
+    conn.execute('''
+        UPDATE borrow_records SET return_date = ?, days_overdue = ?, late_fee = ? WHERE id = ?
+    ''', (return_date.isoformat(), overdue, fee, loan[2]))
+    _record_return(conn, book_id, datetime.fromisoformat(loan[0]), datetime.fromisoformat(loan[1]), return_date)
+    _append_event(conn, 'return', return_date, book_id=book_id, patron_id=patron_id,
+                  record_id=loan[2], due_date=loan[1], days_overdue=overdue, late_fee=fee)
+    return {'record_id': loan[2], 'fee_amount': fee, 'days_overdue': overdue}
+
+def _insert_hold(conn, patron_id: str, book_id: int, created_at: datetime) -> int:
+    return conn.execute('''
+        INSERT INTO holds (patron_id, book_id, created_at) VALUES (?, ?, ?)
+    ''', (patron_id, book_id, created_at.isoformat())).lastrowid
+
+def _hand_off_copy(conn, book_id: int, now: datetime, pickup_deadline: datetime) -> Optional[Dict]:
+    hold = conn.execute('''
+        SELECT id, patron_id FROM holds
+        WHERE book_id = ? AND status = 'waiting'
+        ORDER BY created_at, id
+        LIMIT 1
+    ''', (book_id,)).fetchone()
+    if hold is None:
+        _update_book_availability(conn, book_id, +1)
+        return None
+    conn.execute('''
+        UPDATE holds SET status = 'ready', ready_at = ?, expires_at = ? WHERE id = ?
+    ''', (now.isoformat(), pickup_deadline.isoformat(), hold[0]))
+    return {'hold_id': hold[0], 'patron_id': hold[1], 'book_id': book_id, 'expires_at': pickup_deadline}
+
+def _complete_return(conn, patron_id: str, book_id: int, return_date: datetime, pickup_deadline: datetime):
+    assessment = _update_borrow_record_return_date(conn, patron_id, book_id, return_date)
+    if assessment is None:
+        raise ValueError(f'Patron {patron_id} has no open loan of book {book_id}')
+    return _hand_off_copy(conn, book_id, return_date, pickup_deadline), assessment
+
+def _finish_hold(conn, hold_id: int, status: str, now: datetime, pickup_deadline: datetime):
+    hold = conn.execute('''
+        SELECT book_id, patron_id, status FROM holds WHERE id = ? AND status IN ('waiting', 'ready')
+    ''', (hold_id,)).fetchone()
+    if hold is None:
+        raise ValueError(f'Hold {hold_id} is not active')
+    conn.execute('UPDATE holds SET status = ? WHERE id = ?', (status, hold_id))
+    if hold[2] != 'ready':
+        return None
+    # The reserved copy moves to the next hold or the shelf; log it so event consumers see the book change
+    handoff = _hand_off_copy(conn, hold[0], now, pickup_deadline)
+    _append_event(conn, 'hold_released', now, book_id=hold[0], patron_id=hold[1], hold_id=hold_id,
+                  status=status, next_hold_id=handoff['hold_id'] if handoff else None)
+    return handoff
+
+def _borrow_held_copy(conn, hold_id: int, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime):
+    updated = conn.execute('''
+        UPDATE holds SET status = 'fulfilled'
+        WHERE id = ? AND patron_id = ? AND book_id = ? AND status = 'ready'
+    ''', (hold_id, patron_id, book_id)).rowcount
+    if not updated:
+        raise ValueError(f'Hold {hold_id} is not ready for patron {patron_id}')
+    _insert_borrow_record(conn, patron_id, book_id, borrow_date, due_date)
+
+def _borrow_copy(conn, patron_id: str, book_id: int, borrow_date: datetime, due_date: datetime,
+                 max_borrowed: int, hold_id: Optional[int]) -> str:
+    open_loans = conn.execute('''
+        SELECT COUNT(*) FROM borrow_records WHERE patron_id = ? AND return_date IS NULL
+    ''', (patron_id,)).fetchone()[0]
+    if open_loans >= max_borrowed:
+        return 'limit_reached'
+    if hold_id is not None:
+        try:
+            _borrow_held_copy(conn, hold_id, patron_id, book_id, borrow_date, due_date)
+        except ValueError:
+            return 'unavailable'
+        return 'borrowed'
+    taken = conn.execute('''
+        UPDATE books SET available_copies = available_copies - 1 WHERE id = ? AND available_copies > 0
+    ''', (book_id,)).rowcount
+    if not taken:
+        return 'unavailable'
+    _insert_borrow_record(conn, patron_id, book_id, borrow_date, due_date)
+    # A patron still queued for the book has it now; a later return must not reserve them a second copy
+    conn.execute('''
+        UPDATE holds SET status = 'fulfilled' WHERE patron_id = ? AND book_id = ? AND status = 'waiting'
+    ''', (patron_id, book_id))
+    return 'borrowed'
+
+def _expire_ready_holds(conn, now: datetime, pickup_deadline: datetime) -> List[Dict]:
+    expired = conn.execute('''
+        SELECT id, book_id FROM holds
+        WHERE status = 'ready' AND expires_at <= ?
+        ORDER BY expires_at
+    ''', (now.isoformat(),)).fetchall()
+    results = []
+    for hold_id, book_id in expired:
+        handoff = _finish_hold(conn, hold_id, 'expired', now, pickup_deadline)
+        results.append({'hold_id': hold_id, 'book_id': book_id, 'handoff': handoff})
+    return results
+
+def _append_event(conn, event_type: str, occurred_at: datetime, book_id: Optional[int] = None,
+                  patron_id: Optional[str] = None, **payload):
+    conn.execute('''
+        INSERT INTO circulation_events (event_type, occurred_at, book_id, patron_id, payload)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (event_type, occurred_at.isoformat(), book_id, patron_id, json.dumps(payload)))
+
+def _save_event_checkpoint(conn, consumer: str, seq: int, updated_at: datetime):
+    conn.execute('''
+        INSERT INTO event_checkpoints (consumer, seq, updated_at) VALUES (?, ?, ?)
+        ON CONFLICT (consumer) DO UPDATE SET seq = excluded.seq, updated_at = excluded.updated_at
+    ''', (consumer, seq, updated_at.isoformat()))
+
+def _repair_book_availability(conn, book_ids: List[int], repaired_at: datetime) -> List[Dict]:
+    placeholders = ', '.join('?' * len(book_ids))
+    drift = conn.execute(f'''
+        SELECT book_id, available_copies, MAX(expected, 0) FROM (
+            SELECT b.id AS book_id, b.available_copies, {EXPECTED_AVAILABILITY_SQL} AS expected
+            FROM books b WHERE b.id IN ({placeholders})
+        )
+        WHERE available_copies != MAX(expected, 0)
+    ''', book_ids).fetchall()
+    conn.executemany('UPDATE books SET available_copies = ? WHERE id = ?',
+                     [(after, book_id) for book_id, _, after in drift])
+    for book_id, before, after in drift:
+        _append_event(conn, 'availability_repaired', repaired_at, book_id=book_id, before=before, after=after)
+    return [{'book_id': book_id, 'before': before, 'after': after} for book_id, before, after in drift]
+
+def _record_fee_payment(conn, patron_id: str, book_id: int, amount: float, transaction_id: str, paid_at: datetime):
+    # Settle the book's unpaid fees oldest loan first
+    remaining = amount
+    for loan_id, due in conn.execute('''
+        SELECT id, late_fee - fee_paid FROM borrow_records
+        WHERE patron_id = ? AND book_id = ? AND late_fee > fee_paid
+        ORDER BY id
+    ''', (patron_id, book_id)).fetchall():
+        if remaining <= 0:
+            break
+        applied = min(due, remaining)
+        conn.execute('UPDATE borrow_records SET fee_paid = ROUND(fee_paid + ?, 2) WHERE id = ?', (applied, loan_id))
+        remaining = round(remaining - applied, 2)
+    _append_event(conn, 'fee_paid', paid_at, book_id=book_id, patron_id=patron_id,
+                  amount=amount, transaction_id=transaction_id)
+
+def _queue_notifications(conn, batch_id: str, kind: str, loans: List[Dict], created_at: datetime) -> int:
+    by_patron: Dict[str, List[Dict]] = {}
+    for loan in loans:
+        logged = conn.execute('''
+            INSERT OR IGNORE INTO notification_log (record_id, kind, due_date, notified_at)
+            VALUES (?, ?, ?, ?)
+        ''', (loan['record_id'], kind, loan['due_date'], created_at.isoformat())).rowcount
+        if logged:
+            by_patron.setdefault(loan['patron_id'], []).append(
+                {key: loan[key] for key in ('record_id', 'book_id', 'title', 'due_date')})
+
+    for patron_id, patron_loans in by_patron.items():
+        # A patron's loans can span chunks and kinds; they all go into one message per batch.
+        # If the batch's message was already flushed (a reused batch id), it is requeued with just the new loans.
+        row = conn.execute('''
+            SELECT payload FROM notification_outbox WHERE batch_id = ? AND patron_id = ? AND sent_at IS NULL
+        ''', (batch_id, patron_id)).fetchone()
+        payload = json.loads(row[0]) if row else {'overdue': [], 'due_soon': []}
+        payload[kind].extend(patron_loans)
+        conn.execute('''
+            INSERT INTO notification_outbox (batch_id, patron_id, created_at, payload) VALUES (?, ?, ?, ?)
+            ON CONFLICT (batch_id, patron_id) DO UPDATE SET
+                payload = excluded.payload,
+                created_at = CASE WHEN sent_at IS NULL THEN created_at ELSE excluded.created_at END,
+                sent_at = NULL
+        ''', (batch_id, patron_id, created_at.isoformat(), json.dumps(payload)))
+    return sum(len(patron_loans) for patron_loans in by_patron.values())
+
+def _mark_notifications_sent(conn, notification_ids: List[int], sent_at: datetime):
+    conn.executemany('UPDATE notification_outbox SET sent_at = ? WHERE id = ?',
+                     [(sent_at.isoformat(), notification_id) for notification_id in notification_ids])
+
+def _record_checkout(conn, book_id: int, borrow_date: datetime):
+    day = borrow_date.date().isoformat()
+    conn.execute('''
+        INSERT INTO circulation_daily (day, checkouts) VALUES (?, 1)
+        ON CONFLICT (day) DO UPDATE SET checkouts = checkouts + 1
+    ''', (day,))
+    conn.execute('''
+        INSERT INTO book_circulation_daily (day, book_id, checkouts) VALUES (?, ?, 1)
+        ON CONFLICT (day, book_id) DO UPDATE SET checkouts = checkouts + 1
+    ''', (day, book_id))
+
+def _record_return(conn, book_id: int, borrow_date: datetime, due_date: datetime, return_date: datetime):
+    day = return_date.date().isoformat()
+    overdue = 1 if return_date > due_date else 0
+    loan_days = (return_date - borrow_date).total_seconds() / 86400
+    conn.execute('''
+        INSERT INTO circulation_daily (day, returns, overdue_returns, loan_days_total) VALUES (?, 1, ?, ?)
+        ON CONFLICT (day) DO UPDATE SET
+            returns = returns + 1,
+            overdue_returns = overdue_returns + excluded.overdue_returns,
+            loan_days_total = loan_days_total + excluded.loan_days_total
+    ''', (day, overdue, loan_days))
+    conn.execute('''
+        INSERT INTO book_circulation_daily (day, book_id, returns) VALUES (?, ?, 1)
+        ON CONFLICT (day, book_id) DO UPDATE SET returns = returns + 1
+    ''', (day, book_id))
+
+def _archive_loans(conn, returned_before: datetime, batch_size: int, archived_at: datetime) -> int:
+    ids = [row[0] for row in conn.execute('''
+        SELECT id FROM borrow_records
+        WHERE return_date IS NOT NULL AND return_date < ? AND late_fee <= fee_paid
+        ORDER BY return_date
+        LIMIT ?
+    ''', (returned_before.isoformat(), batch_size))]
+    if not ids:
+        return 0
+    placeholders = ', '.join('?' * len(ids))
+    conn.execute(f'''
+        INSERT INTO borrow_history (id, patron_id, book_id, borrow_date, due_date, return_date,
+                                    late_fee, days_overdue, fee_paid, archived_at)
+        SELECT id, patron_id, book_id, borrow_date, due_date, return_date,
+               late_fee, days_overdue, fee_paid, ? FROM borrow_records
+        WHERE id IN ({placeholders})
+    ''', [archived_at.isoformat(), *ids])
+    conn.execute(f'DELETE FROM borrow_records WHERE id IN ({placeholders})', ids)
+    return len(ids)
+
+def _rebuild_circulation_rollups(conn):
+    conn.execute('DELETE FROM circulation_daily')
+    conn.execute('DELETE FROM book_circulation_daily')
+    conn.execute('''
+        INSERT INTO book_circulation_daily (day, book_id, checkouts, returns)
+        SELECT day, book_id, SUM(checkouts), SUM(returns) FROM (
+            SELECT date(borrow_date) AS day, book_id, 1 AS checkouts, 0 AS returns FROM all_borrow_records
+            UNION ALL
+            SELECT date(return_date), book_id, 0, 1 FROM all_borrow_records WHERE return_date IS NOT NULL
+        )
+        GROUP BY day, book_id
+    ''')
+    conn.execute('''
+        INSERT INTO circulation_daily (day, checkouts, returns, overdue_returns, loan_days_total)
+        SELECT day, SUM(checkouts), SUM(returns), SUM(overdue), SUM(loan_days) FROM (
+            SELECT date(borrow_date) AS day, 1 AS checkouts, 0 AS returns, 0 AS overdue, 0 AS loan_days
+            FROM all_borrow_records
+            UNION ALL
+            SELECT date(return_date), 0, 1, return_date > due_date,
+                   julianday(return_date) - julianday(borrow_date)
+            FROM all_borrow_records WHERE return_date IS NOT NULL
+        )
+        GROUP BY day
+    ''')
@@ -0,0 +1,111 @@
+"""
+Database Writer Module - Single-writer queue for SQLite writes
+Serializes write operations from all threads onto one dedicated writer thread
+per database file and group-commits concurrent operations in one transaction.
+"""
+
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from typing import Callable, List, Tuple
+
+# Maximum number of queued operations committed together in one transaction
+MAX_BATCH_SIZE = 64
+
+
+class WriteQueue:
+    """
+    Dedicated writer thread for a single SQLite database file.
+
+    Callers submit operations as functions that take an open connection as
+    their first argument. The writer drains everything that is queued (up to
+    max_batch_size), runs each operation inside its own savepoint and commits
+    the whole batch once. Results and exceptions are handed back through
+    futures, so a failing operation never rolls back its neighbours.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], max_batch_size: int = MAX_BATCH_SIZE):
+        """
+        Start the writer thread.
+
+        Args:
+            connect: Factory returning a new connection to the database file
+            max_batch_size: Maximum operations per group commit
+        """
+        self._connect = connect
+        self.max_batch_size = max_batch_size
+        self.batches_committed = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable, *args) -> Future:
+        """Queue a write operation and return a future for its result."""
+        future = Future()
+        self._queue.put((operation, args, future))
+        return future
+
+    def depth(self) -> int:
+        """Get the number of operations waiting for the writer."""
+        return self._queue.qsize()
+
+    def _run(self):
+        conn = None
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                    conn.isolation_level = None  # transactions are managed explicitly
+                except Exception as e:
+                    for _, _, future in batch:
+                        if future.set_running_or_notify_cancel():
+                            future.set_exception(e)
+                    continue
+
+            if not self._commit_batch(conn, batch):
+                # Start over with a fresh connection after a failed commit
+                conn.close()
+                conn = None
+
+    def _commit_batch(self, conn: sqlite3.Connection, batch: List[Tuple]) -> bool:
+        outcomes = []
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for operation, args, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                conn.execute('SAVEPOINT write_op')
+                try:
+                    result = operation(conn, *args)
+                except Exception as e:
+                    conn.execute('ROLLBACK TO write_op')
+                    conn.execute('RELEASE write_op')
+                    outcomes.append((future, None, e))
+                else:
+                    conn.execute('RELEASE write_op')
+                    outcomes.append((future, result, None))
+            conn.execute('COMMIT')
+        except Exception as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for _, _, future in batch:
+                if not future.done():
+                    if future.running() or future.set_running_or_notify_cancel():
+                        future.set_exception(e)
+            return False
+
+        self.batches_committed += 1
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        return True
@@ -0,0 +1,30 @@
+"""
+Fees Module - R5 late fee schedule
+The single implementation of the tiered late fee schedule. The database layer
+uses it to assess a loan's fee when it is returned; services.fee_forecast uses
+it for live assessments of open loans and for projections.
+"""
+
+from datetime import datetime
+
+FEE_PER_DAY_FIRST_WEEK = 0.50
+FEE_PER_DAY_AFTER_FIRST_WEEK = 1.00
+FIRST_WEEK_DAYS = 7
+MAX_FEE_PER_BOOK = 15.00
+
+
+def late_fee_for_days(days_overdue: int) -> float:
+    """Late fee for a loan that is days_overdue days past its due date."""
+    if days_overdue <= 0:
+        return 0.0
+    if days_overdue <= FIRST_WEEK_DAYS:
+        fee = days_overdue * FEE_PER_DAY_FIRST_WEEK
+    else:
+        fee = (FIRST_WEEK_DAYS * FEE_PER_DAY_FIRST_WEEK
+               + (days_overdue - FIRST_WEEK_DAYS) * FEE_PER_DAY_AFTER_FIRST_WEEK)
+    return round(min(fee, MAX_FEE_PER_BOOK), 2)
+
+
+def days_overdue(due_date: datetime, as_of: datetime) -> int:
+    """Whole days past the due date as of as_of (0 if not overdue)."""
+    return max((as_of - due_date).days, 0)
@@ -0,0 +1,67 @@
+"""
+ISBN Module - ISBN normalization and validation
+Accepts ISBN-13 or ISBN-10 input with or without hyphens and spaces and
+reduces it to the canonical ISBN-13, stored as an integer key.
+"""
+
+from typing import Optional
+
+ISBN13_PREFIX = '978'  # Bookland prefix ISBN-10s are converted under
+
+
+def _strip(raw: str) -> str:
+    return raw.replace('-', '').replace(' ', '').upper()
+
+
+def isbn13_check_digit(first12: str) -> int:
+    """Check digit for the first 12 digits of an ISBN-13."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return (10 - total % 10) % 10
+
+
+def _isbn10_is_valid(digits: str) -> bool:
+    if not (digits[:9].isdigit() and (digits[9].isdigit() or digits[9] == 'X')):
+        return False
+    values = [int(d) for d in digits[:9]] + [10 if digits[9] == 'X' else int(digits[9])]
+    return sum(weight * value for weight, value in zip(range(10, 0, -1), values)) % 11 == 0
+
+
+def parse_isbn(raw: str) -> int:
+    """
+    Normalize an ISBN-13 or ISBN-10 to its ISBN-13 integer key.
+
+    Args:
+        raw: ISBN as entered; hyphens and spaces are ignored
+
+    Returns:
+        int: The ISBN-13 as an integer
+
+    Raises:
+        ValueError: If the ISBN has the wrong length, non-digits or a bad check digit
+    """
+    digits = _strip(raw or '')
+    if len(digits) == 13:
+        if not digits.isdigit():
+            raise ValueError("ISBN must contain only digits.")
+        if int(digits[12]) != isbn13_check_digit(digits[:12]):
+            raise ValueError("ISBN check digit is invalid.")
+        return int(digits)
+    if len(digits) == 10:
+        if not _isbn10_is_valid(digits):
+            raise ValueError("ISBN-10 is invalid (bad digits or check digit).")
+        first12 = ISBN13_PREFIX + digits[:9]
+        return int(f"{first12}{isbn13_check_digit(first12)}")
+    raise ValueError("ISBN must be exactly 13 digits (or an ISBN-10).")
+
+
+def isbn13_key(raw: str) -> Optional[int]:
+    """The ISBN-13 integer key for raw, or None if it is not a valid ISBN."""
+    try:
+        return parse_isbn(raw)
+    except ValueError:
+        return None
+
+
+def format_isbn13(key: int) -> str:
+    """The canonical 13-digit string for an ISBN-13 integer key."""
+    return f"{key:013d}"
@@ -0,0 +1,57 @@
+"""
+JSON Provider Module - Fast JSON encoding for Flask and the ASGI API
+Uses orjson when it is installed and falls back to the standard library
+otherwise. Both paths encode datetime and date values as ISO 8601 strings.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+def _default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return float(o)
+    return DefaultJSONProvider.default(o)
+
+
+def dumps_bytes(obj, sort_keys: bool = False, indent: bool = False) -> bytes:
+    """Encode obj as UTF-8 JSON bytes with the fastest available encoder."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+    return json.dumps(obj, default=_default, sort_keys=sort_keys, indent=2 if indent else None,
+                      separators=None if indent else (',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps_bytes (orjson when available)."""
+
+    default = staticmethod(_default)
+
+    def dumps(self, obj, **kwargs) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.sort_keys).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = not (self.compact if self.compact is not None else not self._app.debug)
+        return self._app.response_class(dumps_bytes(obj, self.sort_keys, indent), mimetype=self.mimetype)
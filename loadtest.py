@@ -0,0 +1,486 @@
+"""
+Load Test Module - Concurrent load generator for the Library Management System
+
+Seeds a throwaway database, serves the app on a local port and replays a
+weighted mix of catalog views, searches, borrows, returns and late-fee
+lookups from many threads or processes. Reports throughput, latency
+percentiles and error counts per endpoint. The async JSON API (asgi.py) can
+be targeted instead of the Flask app, and compare_servers runs the same
+search and late-fee mix against both (serving the ASGI app needs uvicorn).
+
+run_borrow_stress drives the borrow and return services directly from many
+threads or processes against a small, contended catalog, reports borrows per
+second and checks the circulation invariants afterwards.
+"""
+
+import http.cookiejar
+import math
+import multiprocessing
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Default operation mix (relative weights)
+DEFAULT_MIX = {'catalog': 4, 'search': 3, 'borrow': 1, 'return': 1, 'late_fee': 1}
+
+# Operations the ASGI app serves, and its default mix
+ASGI_OPERATIONS = ('search', 'late_fee')
+ASGI_MIX = {'search': 3, 'late_fee': 1}
+
+SERVERS = ('wsgi', 'asgi')
+
+SEARCH_TERMS = ['the', 'history', 'art', 'science', 'river', 'night', 'garden', 'war']
+AUTHORS = ['Austen', 'Orwell', 'Morrison', 'Tolstoy', 'Achebe', 'Woolf', 'Murakami', 'Borges']
+
+REQUEST_TIMEOUT = 30
+
+# Outcome of a request the app turned down (a flashed error such as "not available"); not an error
+REFUSED = 'refused'
+
+# Share of borrow-stress operations that are borrows (the rest return a loan)
+STRESS_BORROW_SHARE = 0.7
+
+
+def parse_mix(spec: str) -> Dict[str, int]:
+    """
+    Parse an operation mix such as "catalog=4,search=3,borrow=1".
+
+    Raises:
+        ValueError: If an operation is unknown or a weight is not a positive integer
+    """
+    mix = {}
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown operation: {name}. Choose from {', '.join(DEFAULT_MIX)}.")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise ValueError(f"Invalid weight for {name}: {weight}.")
+        if mix[name] <= 0:
+            raise ValueError(f"Weight for {name} must be positive.")
+    if not mix:
+        raise ValueError("Operation mix is empty.")
+    return mix
+
+
+def seed_dataset(path: str, books: int = 500, patrons: int = 200, loans: int = 1000, seed: int = 1) -> None:
+    """
+    Populate a database file with a reproducible catalog and loan history.
+    Roughly a third of the loans are left open, some of them overdue.
+    """
+    from database import _connect, create_schema  # imported lazily: worker processes only need the HTTP client
+
+    rng = random.Random(seed)
+    conn = _connect(path)
+    create_schema(conn)
+    now = datetime.now()
+
+    book_rows = []
+    for i in range(books):
+        copies = rng.randint(1, 5)
+        title = f"{rng.choice(['The', 'A', 'Our'])} {rng.choice(SEARCH_TERMS).title()} of Book {i}"
+        isbn = _isbn13(979000000000 + i)
+        book_rows.append((title, rng.choice(AUTHORS), isbn, int(isbn), copies, copies))
+    conn.executemany('''
+        INSERT INTO books (title, author, isbn, isbn13, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', book_rows)
+
+    available = {i + 1: row[4] for i, row in enumerate(book_rows)}
+    for _ in range(loans):
+        book_id = rng.randint(1, books)
+        patron_id = f"{100000 + rng.randrange(patrons)}"
+        borrow_date = now - timedelta(days=rng.randint(0, 60), minutes=rng.randint(0, 1440))
+        due_date = borrow_date + timedelta(days=14)
+        return_date = None
+        if available[book_id] == 0 or rng.random() < 0.66:
+            return_date = (borrow_date + timedelta(days=rng.randint(1, 25))).isoformat()
+        else:
+            available[book_id] -= 1
+        conn.execute('''
+            INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (patron_id, book_id, borrow_date.isoformat(), due_date.isoformat(), return_date))
+
+    conn.executemany('UPDATE books SET available_copies = ? WHERE id = ?',
+                     [(copies, book_id) for book_id, copies in available.items()])
+    conn.commit()
+    conn.close()
+
+
+def _isbn13(prefix: int) -> str:
+    from isbn import isbn13_check_digit
+    digits = f"{prefix:012d}"
+    return f"{digits}{isbn13_check_digit(digits)}"
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _build_request(rng: random.Random, operation: str, books: int, patrons: int) -> Tuple[str, str, Optional[dict]]:
+    patron_id = f"{100000 + rng.randrange(patrons)}"
+    book_id = rng.randint(1, books)
+    if operation == 'catalog':
+        return 'GET', '/catalog', None
+    if operation == 'search':
+        if rng.random() < 0.5:
+            params = {'q': rng.choice(SEARCH_TERMS), 'type': 'title'}
+        else:
+            params = {'q': rng.choice(AUTHORS), 'type': 'author'}
+        return 'GET', '/api/search?' + urllib.parse.urlencode(params), None
+    if operation == 'borrow':
+        return 'POST', '/borrow', {'patron_id': patron_id, 'book_id': book_id}
+    if operation == 'return':
+        return 'POST', '/return', {'patron_id': patron_id, 'book_id': book_id}
+    return 'GET', f'/api/late_fee/{patron_id}/{book_id}', None
+
+
+def _classify(status: int, body: bytes) -> Optional[str]:
+    if b'database is locked' in body:
+        return 'lock_timeout'
+    if status >= 500:
+        return 'http_5xx'
+    if b'Database error occurred' in body:
+        return 'db_error'
+    if status == 429:
+        return 'rate_limited'
+    if b'class="flash-error"' in body:
+        return REFUSED
+    return None
+
+
+def _fetch(opener, request) -> Tuple[Optional[str], Optional[str]]:
+    """Send a request. Returns (error, redirect location)."""
+    try:
+        with opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+            return _classify(response.status, response.read()), None
+    except urllib.error.HTTPError as e:
+        if e.code in (301, 302, 303):
+            return None, e.headers.get('Location')
+        return _classify(e.code, e.read()) or f'http_{e.code}', None
+    except (urllib.error.URLError, OSError) as e:
+        return 'timeout' if 'timed out' in str(e) else 'connection_error', None
+
+
+def _worker(args) -> List[Tuple[str, float, Optional[str]]]:
+    base_url, mix, books, patrons, deadline, max_requests, seed = args
+    rng = random.Random(seed)
+    # Cookies carry the session, where a redirecting form leaves its flash message
+    opener = urllib.request.build_opener(_NoRedirect, urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    operations, weights = list(mix), list(mix.values())
+    samples = []
+
+    while time.time() < deadline and (max_requests is None or len(samples) < max_requests):
+        operation = rng.choices(operations, weights)[0]
+        method, path, form = _build_request(rng, operation, books, patrons)
+        data = urllib.parse.urlencode(form).encode() if form else None
+
+        started = time.perf_counter()
+        error, location = _fetch(opener, urllib.request.Request(base_url + path, data=data, method=method))
+        latency = time.perf_counter() - started
+        if location:
+            # Borrow redirects to the catalog, which shows its outcome; that page is not part of the latency
+            error, _ = _fetch(opener, urllib.request.Request(urllib.parse.urljoin(base_url + path, location)))
+        samples.append((operation, latency, error))
+
+    return samples
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Tuple[str, float, Optional[str]]], elapsed: float) -> Dict:
+    """
+    Build the report for a run.
+
+    Returns:
+        dict: {"elapsed", "requests", "throughput", "endpoints": {name: {...}}}
+              Refused requests are counted under "refused", not as errors.
+    """
+    by_operation = defaultdict(list)
+    errors = defaultdict(lambda: defaultdict(int))
+    refused = defaultdict(int)
+    for operation, latency, error in samples:
+        by_operation[operation].append(latency)
+        if error == REFUSED:
+            refused[operation] += 1
+        elif error:
+            errors[operation][error] += 1
+
+    endpoints = {}
+    for operation, latencies in sorted(by_operation.items()):
+        latencies.sort()
+        error_count = sum(errors[operation].values())
+        endpoints[operation] = {
+            'requests': len(latencies),
+            'throughput': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+            'error_rate': round(error_count / len(latencies), 4),
+            'errors': dict(errors[operation]),
+            'refused': refused[operation],
+        }
+
+    return {
+        'elapsed': round(elapsed, 3),
+        'requests': len(samples),
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'endpoints': endpoints,
+    }
+
+
+def format_report(report: Dict) -> str:
+    """Render a report as a text table."""
+    lines = [
+        f"{report['requests']} requests in {report['elapsed']}s ({report['throughput']} req/s)",
+        f"{'endpoint':<10} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} "
+        f"{'refused':>8}  detail",
+    ]
+    for name, stats in report['endpoints'].items():
+        detail = ', '.join(f'{k}={v}' for k, v in sorted(stats['errors'].items()))
+        lines.append(
+            f"{name:<10} {stats['requests']:>7} {stats['throughput']:>8} {stats['p50_ms']:>8} "
+            f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['error_rate']:>7.2%} {stats['refused']:>8}  {detail}"
+        )
+    return '\n'.join(lines)
+
+
+def _serve_wsgi(database_path: str) -> Tuple[str, Callable[[], None]]:
+    """Serve the Flask app on a local port. Returns (base URL, stop)."""
+    from app import create_app
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = create_app({'DATABASE': database_path, 'RATE_LIMITS': {}})  # all workers share one address
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}', server.shutdown
+
+
+def _serve_asgi(database_path: str) -> Tuple[str, Callable[[], None]]:
+    """Serve the ASGI app with uvicorn on a local port. Returns (base URL, stop)."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise RuntimeError("Serving the ASGI app needs uvicorn (pip install uvicorn).")
+    import socket
+    from asgi import AsyncApi
+    from database import use_database
+
+    api = AsyncApi(rate_limits={})  # all workers share one address
+
+    async def app(scope, receive, send):
+        with use_database(database_path):
+            await api(scope, receive, send)
+
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level='warning', lifespan='on'))
+    thread = threading.Thread(target=server.run, kwargs={'sockets': [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("The ASGI server failed to start.")
+        time.sleep(0.01)
+
+    def stop():
+        server.should_exit = True
+        thread.join()
+        sock.close()
+
+    return f'http://127.0.0.1:{sock.getsockname()[1]}', stop
+
+
+def run_load_test(base_url: Optional[str] = None, workers: int = 8, duration: float = 10.0,
+                  requests_per_worker: Optional[int] = None, mix: Optional[Dict[str, int]] = None,
+                  use_processes: bool = False, books: int = 500, patrons: int = 200, loans: int = 1000,
+                  seed: int = 1, database_path: Optional[str] = None, server: str = 'wsgi') -> Dict:
+    """
+    Run a load test and return its report.
+
+    Args:
+        base_url: Existing app to target; None seeds a database and serves the app locally
+        workers: Number of concurrent workers
+        duration: Maximum run time in seconds
+        requests_per_worker: Stop each worker after this many requests (optional)
+        mix: Operation weights (default DEFAULT_MIX, or ASGI_MIX for the ASGI app)
+        use_processes: Run workers in separate processes instead of threads
+        books, patrons, loans: Size of the seeded dataset (also the id ranges requests use)
+        seed: Seed for the dataset and the request mix
+        database_path: Where to create the seeded database (default: a temporary file)
+        server: "wsgi" (the Flask app) or "asgi" (the async JSON API, search and late_fee only)
+
+    Returns:
+        dict: Report as built by summarize()
+
+    Raises:
+        ValueError: If the server is unknown or the mix has operations it does not serve
+    """
+    if server not in SERVERS:
+        raise ValueError(f"Unknown server: {server}. Choose from {', '.join(SERVERS)}.")
+    mix = mix or (ASGI_MIX if server == 'asgi' else DEFAULT_MIX)
+    if server == 'asgi' and set(mix) - set(ASGI_OPERATIONS):
+        raise ValueError(f"The ASGI app only serves {', '.join(ASGI_OPERATIONS)}.")
+    stop = None
+    tmpdir = None
+
+    if base_url is None:
+        import tempfile
+
+        if database_path is None:
+            tmpdir = tempfile.TemporaryDirectory()
+            database_path = f'{tmpdir.name}/loadtest.db'
+        seed_dataset(database_path, books, patrons, loans, seed)
+        base_url, stop = (_serve_asgi if server == 'asgi' else _serve_wsgi)(database_path)
+
+    try:
+        deadline = time.time() + duration
+        jobs = [(base_url, mix, books, patrons, deadline, requests_per_worker, seed * 1000 + i) for i in range(workers)]
+        started = time.perf_counter()
+        if use_processes:
+            with multiprocessing.get_context('spawn').Pool(workers) as pool:
+                results = pool.map(_worker, jobs)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(_worker, jobs))
+        elapsed = time.perf_counter() - started
+    finally:
+        if stop is not None:
+            stop()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    return summarize([sample for result in results for sample in result], elapsed)
+
+
+def compare_servers(mix: Optional[Dict[str, int]] = None, **options) -> Dict[str, Dict]:
+    """
+    Run the same load test against the Flask app and the ASGI app, each on a freshly seeded database.
+
+    Args:
+        mix: Operation weights, limited to ASGI_OPERATIONS (default ASGI_MIX)
+        **options: Other run_load_test arguments (not base_url, database_path or server)
+
+    Returns:
+        dict: {"wsgi": report, "asgi": report}
+    """
+    mix = mix or ASGI_MIX
+    return {server: run_load_test(mix=mix, server=server, **options) for server in SERVERS}
+
+
+def _borrow_stress_worker(args) -> Dict[str, int]:
+    database_path, books, patrons, operations, seed = args
+    import database  # imported lazily: spawned processes configure their own database module
+    from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+    rng = random.Random(seed)
+    counts = defaultdict(int)
+    with database.use_database(database_path):
+        for _ in range(operations):
+            patron_id = f"{100000 + rng.randrange(patrons)}"
+            if rng.random() < STRESS_BORROW_SHARE:
+                success, message = borrow_book_by_patron(patron_id, rng.randint(1, books))
+                counts['borrowed' if success else 'errors' if 'error' in message else 'refused'] += 1
+                continue
+            loans = database.get_patron_borrowed_books(patron_id)
+            if loans:
+                success, message = return_book_by_patron(patron_id, rng.choice(loans)['book_id'])
+                counts['returned' if success else 'errors' if 'error' in message else 'refused'] += 1
+    return dict(counts)
+
+
+def check_borrow_invariants(database_path: str, max_borrowed: int = 5) -> Dict[str, List]:
+    """
+    Check a database after concurrent borrowing.
+
+    Returns:
+        dict: {"negative_availability": [book ids], "over_limit": [patron ids],
+               "drift": availability drift as found by find_availability_drift}
+              (all empty when the invariants hold)
+    """
+    import database
+    conn = database._connect(database_path)
+    negative = [row[0] for row in conn.execute('SELECT id FROM books WHERE available_copies < 0')]
+    over_limit = [row[0] for row in conn.execute("""
+        SELECT patron_id FROM borrow_records WHERE return_date IS NULL
+        GROUP BY patron_id HAVING COUNT(*) > ?
+    """, (max_borrowed,))]
+    conn.close()
+    with database.use_database(database_path):
+        drift = database.find_availability_drift()
+    return {'negative_availability': negative, 'over_limit': over_limit, 'drift': drift}
+
+
+def run_borrow_stress(workers: int = 4, operations_per_worker: int = 200, use_processes: bool = False,
+                      books: int = 20, patrons: int = 10, seed: int = 1,
+                      database_path: Optional[str] = None) -> Dict:
+    """
+    Hammer the borrow and return services from concurrent workers and check the invariants.
+
+    Args:
+        workers: Number of concurrent threads or processes
+        operations_per_worker: Borrow/return attempts per worker
+        use_processes: Run workers in separate processes (each with its own writer thread)
+        books, patrons: Size of the catalog and patron pool (small values mean more contention)
+        seed: Seed for the dataset and the operation mix
+        database_path: Where to create the database (default: a temporary file)
+
+    Returns:
+        dict: {"mode", "workers", "elapsed", "borrowed", "returned", "refused", "errors",
+               "borrows_per_second", "invariants"}
+    """
+    import tempfile
+    from services.library_service import MAX_BORROWED_BOOKS
+
+    tmpdir = None
+    if database_path is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        database_path = f'{tmpdir.name}/stress.db'
+    try:
+        seed_dataset(database_path, books, patrons, loans=0, seed=seed)
+        jobs = [(database_path, books, patrons, operations_per_worker, seed * 1000 + i) for i in range(workers)]
+        started = time.perf_counter()
+        if use_processes:
+            with multiprocessing.get_context('spawn').Pool(workers) as pool:
+                results = pool.map(_borrow_stress_worker, jobs)
+        else:
+            with ThreadPoolExecutor(workers) as pool:
+                results = list(pool.map(_borrow_stress_worker, jobs))
+        elapsed = time.perf_counter() - started
+        invariants = check_borrow_invariants(database_path, MAX_BORROWED_BOOKS)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    totals = {key: sum(result.get(key, 0) for result in results)
+              for key in ('borrowed', 'returned', 'refused', 'errors')}
+    return {
+        'mode': 'processes' if use_processes else 'threads',
+        'workers': workers,
+        'elapsed': round(elapsed, 3),
+        **totals,
+        'borrows_per_second': round(totals['borrowed'] / elapsed, 2) if elapsed else 0.0,
+        'invariants': invariants,
+    }
@@ -0,0 +1,55 @@
+"""
+Metrics Module - Process-wide counters and value summaries
+Cheap, thread-safe instrumentation shared by the app, its middleware and the
+services. Counters only go up; summaries keep count, sum and max of observed
+values. Names are dotted strings, e.g. "http.response_bytes.api.search_books_api".
+"""
+
+import threading
+from typing import Dict
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_summaries: Dict[str, list] = {}  # name -> [count, total, max]
+
+
+def increment(name: str, amount: int = 1) -> None:
+    """Add amount to a counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name: str, value: float) -> None:
+    """Record one observed value (a size, a duration, ...)."""
+    with _lock:
+        summary = _summaries.get(name)
+        if summary is None:
+            _summaries[name] = [1, value, value]
+        else:
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = max(summary[2], value)
+
+
+def snapshot() -> Dict:
+    """
+    Get the current values of all metrics.
+
+    Returns:
+        dict: {"counters": {name: int}, "summaries": {name: {"count", "sum", "max", "avg"}}}
+    """
+    with _lock:
+        return {
+            'counters': dict(_counters),
+            'summaries': {
+                name: {'count': count, 'sum': total, 'max': peak, 'avg': round(total / count, 2)}
+                for name, (count, total, peak) in _summaries.items()
+            },
+        }
+
+
+def reset() -> None:
+    """Clear all metrics."""
+    with _lock:
+        _counters.clear()
+        _summaries.clear()
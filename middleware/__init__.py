@@ -0,0 +1,15 @@
+"""
+Middleware Package - Request/response hooks shared by all blueprints
+"""
+
+from .branch import register_branch_routing
+from .compression import register_compression
+from .profiling import register_profiling
+from .rate_limit import register_rate_limiting
+
+def register_middleware(app):
+    """Register all request/response middleware with the Flask app."""
+    register_profiling(app)  # first, so a profile covers the other hooks too
+    register_branch_routing(app)
+    register_rate_limiting(app)
+    register_compression(app)
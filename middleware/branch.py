@@ -0,0 +1,35 @@
+"""
+Branch Middleware - Route each request to its branch database
+
+The branch comes from the X-Branch header or a ``branch`` query/form field
+and falls back to DEFAULT_BRANCH. Requests naming an unknown branch get 404.
+"""
+
+from contextlib import ExitStack
+from flask import g, jsonify, request
+from branches import default_branch, use_branch
+
+
+def register_branch_routing(app):
+    """Install the hooks that select the branch database per request."""
+
+    @app.before_request
+    def select_branch():
+        branch_id = request.headers.get('X-Branch') or request.values.get('branch') or default_branch()
+        g.branch = branch_id
+        if branch_id is None:
+            return None
+
+        scope = ExitStack()
+        try:
+            scope.enter_context(use_branch(branch_id))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 404
+        g.branch_scope = scope
+        return None
+
+    @app.teardown_request
+    def release_branch(exc):
+        scope = g.pop('branch_scope', None)
+        if scope is not None:
+            scope.close()
@@ -0,0 +1,64 @@
+"""
+Compression Middleware - gzip/deflate for JSON and HTML responses
+
+Compresses buffered responses at or above COMPRESS_MIN_SIZE bytes when the
+client accepts gzip or deflate. Streamed responses (CSV exports) are left
+alone; they handle compression themselves. Request and response sizes are
+recorded in the metrics module per endpoint.
+
+Config:
+    COMPRESS_MIN_SIZE: Smallest body worth compressing (default 1024 bytes)
+    COMPRESS_LEVEL: zlib compression level 1-9 (default 6)
+    COMPRESS_MIMETYPES: Compressible content types (default JSON and HTML)
+"""
+
+import gzip
+import zlib
+from flask import request
+import metrics
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+DEFAULT_MIMETYPES = ('application/json', 'text/html')
+
+
+def register_compression(app):
+    """Install the compression and size-metrics after_request hook."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_MIN_SIZE)
+    app.config.setdefault('COMPRESS_LEVEL', DEFAULT_LEVEL)
+    app.config.setdefault('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES)
+
+    @app.after_request
+    def compress_response(response):
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe(f'http.request_bytes.{endpoint}', request.content_length or 0)
+
+        if response.direct_passthrough or response.is_streamed:
+            return response
+
+        size = response.content_length or 0
+        metrics.observe(f'http.response_bytes.{endpoint}', size)
+
+        encoding = _choose_encoding(response, size, app.config)
+        if encoding is None:
+            metrics.observe(f'http.response_wire_bytes.{endpoint}', size)
+            return response
+
+        data = response.get_data()
+        level = app.config['COMPRESS_LEVEL']
+        compressed = gzip.compress(data, level, mtime=0) if encoding == 'gzip' else zlib.compress(data, level)
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+
+        metrics.increment(f'http.compressed_responses.{encoding}')
+        metrics.observe(f'http.response_wire_bytes.{endpoint}', len(compressed))
+        return response
+
+
+def _choose_encoding(response, size, config):
+    if size < config['COMPRESS_MIN_SIZE'] or 'Content-Encoding' in response.headers:
+        return None
+    if response.mimetype not in config['COMPRESS_MIMETYPES'] or not 200 <= response.status_code < 300:
+        return None
+    return request.accept_encodings.best_match(['gzip', 'deflate'])
@@ -0,0 +1,112 @@
+"""
+Profiling Middleware - Opt-in cProfile captures of slow requests
+
+A request is profiled when PROFILE_REQUESTS is on, or when it carries an
+X-Profile header signed with PROFILE_SECRET (see sign_profile_request), so a
+single slow page can be captured in production without profiling everything.
+Captures of requests slower than PROFILE_THRESHOLD_MS are kept in a bounded
+on-disk ring buffer (services.profile_service) and served by the admin API.
+
+Only one request is profiled at a time; requests that arrive while another
+one is being profiled run unprofiled.
+
+Config:
+    PROFILE_REQUESTS: Profile every request (default False)
+    PROFILE_SECRET: Key for signed X-Profile headers (unset: header ignored)
+    PROFILE_THRESHOLD_MS: Keep captures of requests at least this slow (default 500)
+    PROFILE_DIR: Where captures are stored (default "profiles")
+    PROFILE_KEEP: Captures kept (default 50)
+"""
+
+import cProfile
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from flask import g, request
+import metrics
+from services.profile_service import DEFAULT_KEEP, DEFAULT_PROFILE_DIR, save_capture
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD_MS = 500
+
+
+def sign_profile_request(secret: str, path: str, expires: int) -> str:
+    """
+    Build an X-Profile header value that asks for `path` to be profiled until `expires` (Unix time).
+    """
+    signature = hmac.new(secret.encode(), f"{expires}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def _signed_request(secret: str) -> bool:
+    expires, _, signature = request.headers.get('X-Profile', '').partition('.')
+    if not secret or not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(sign_profile_request(secret, request.path, int(expires)), f"{expires}.{signature}")
+
+
+def register_profiling(app):
+    """Install the profiling hooks (nothing is installed unless profiling is configured)."""
+    app.config.setdefault('PROFILE_REQUESTS', False)
+    app.config.setdefault('PROFILE_THRESHOLD_MS', DEFAULT_THRESHOLD_MS)
+    app.config.setdefault('PROFILE_DIR', DEFAULT_PROFILE_DIR)
+    app.config.setdefault('PROFILE_KEEP', DEFAULT_KEEP)
+    if not app.config['PROFILE_REQUESTS'] and not app.config.get('PROFILE_SECRET'):
+        return
+
+    # cProfile allows one active profiler per interpreter (3.12+) or thread
+    busy = threading.Lock()
+
+    @app.before_request
+    def start_profile():
+        if request.blueprint == 'admin':
+            return None
+        if not app.config['PROFILE_REQUESTS'] and not _signed_request(app.config.get('PROFILE_SECRET')):
+            return None
+        if not busy.acquire(blocking=False):
+            metrics.increment('profiler.busy')
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiling tool is active
+            busy.release()
+            metrics.increment('profiler.busy')
+            return None
+        g.profiler = profiler
+        g.profile_started = time.perf_counter()
+        return None
+
+    @app.after_request
+    def note_status(response):
+        if 'profiler' in g:
+            g.profile_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return
+        profiler.disable()
+        busy.release()
+
+        duration_ms = round((time.perf_counter() - g.profile_started) * 1000, 2)
+        if duration_ms < app.config['PROFILE_THRESHOLD_MS']:
+            metrics.increment('profiler.discarded')
+            return
+        meta = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': g.get('profile_status', 500),
+            'duration_ms': duration_ms,
+        }
+        try:
+            save_capture(profiler, meta, app.config['PROFILE_DIR'], app.config['PROFILE_KEEP'])
+            metrics.increment('profiler.captured')
+        except OSError:
+            logger.exception('Failed to store profile of %s %s', request.method, request.path)
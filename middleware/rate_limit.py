@@ -0,0 +1,172 @@
+"""
+Rate Limit Middleware - Token buckets per patron and per client, plus load shedding
+
+Each blueprint listed in RATE_LIMITS gets two token buckets per caller: one
+keyed by patron id (form field or URL segment) and one by client address.
+A request needs a token from both; otherwise it gets 429 with Retry-After.
+Write requests (POST) are shed with 503 while the database's write queue is
+deeper than WRITE_QUEUE_SHED_DEPTH, so one flood cannot stall every writer.
+
+Config:
+    RATE_LIMITS: {blueprint: {"patron": "10/minute", "client": "60/minute"}}
+                 (an empty mapping disables rate limiting)
+    WRITE_QUEUE_SHED_DEPTH: Pending writes before POSTs are shed (default 256; 0 disables)
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from flask import jsonify, request
+import metrics
+from database import write_queue_depth
+
+DEFAULT_RATE_LIMITS = {
+    'borrowing': {'patron': '20/minute', 'client': '120/minute'},
+    'api': {'patron': '60/minute', 'client': '600/minute'},
+}
+DEFAULT_SHED_DEPTH = 256
+
+# Most buckets kept; past this the least recently used are evicted
+MAX_BUCKETS = 10000
+# Seconds between sweeps for idle (full) buckets
+PRUNE_INTERVAL = 60
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600}
+
+
+def parse_limit(spec: str) -> Tuple[float, int]:
+    """
+    Parse "N/period" into (tokens per second, burst size).
+
+    Raises:
+        ValueError: If the spec is malformed
+    """
+    count, _, period = spec.partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit: {spec!r}. Use N/second, N/minute or N/hour.")
+    return int(count) / PERIODS[period], int(count)
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`."""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate: float, capacity: int, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class RateLimiter:
+    """Thread-safe collection of token buckets keyed by (scope, key)."""
+
+    def __init__(self, limits: Dict[str, Dict[str, str]], clock: Callable[[], float] = time.monotonic):
+        self.limits = {
+            blueprint: {kind: parse_limit(spec) for kind, spec in kinds.items()}
+            for blueprint, kinds in limits.items()
+        }
+        self.clock = clock
+        # Least recently used first
+        self._buckets: 'OrderedDict[Tuple[str, str, str], TokenBucket]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_prune = clock() + PRUNE_INTERVAL
+
+    def check(self, blueprint: str, keys: Dict[str, Optional[str]]) -> Tuple[float, Optional[str]]:
+        """
+        Take a token for each key kind configured for the blueprint.
+
+        Returns:
+            tuple: (retry_after seconds, limited kind) - (0, None) if allowed
+        """
+        limits = self.limits.get(blueprint)
+        if not limits:
+            return 0.0, None
+        now = self.clock()
+        with self._lock:
+            if now >= self._next_prune:
+                self._prune(now)
+            buckets = []
+            for kind, (rate, burst) in limits.items():
+                key = keys.get(kind)
+                if key is None:
+                    continue
+                bucket = self._buckets.get((blueprint, kind, key))
+                if bucket is None:
+                    bucket = self._buckets[(blueprint, kind, key)] = TokenBucket(rate, burst, now)
+                    if len(self._buckets) > MAX_BUCKETS:
+                        self._buckets.popitem(last=False)
+                else:
+                    self._buckets.move_to_end((blueprint, kind, key))
+                bucket.refill(now)
+                buckets.append((bucket.wait_time(), kind, bucket))
+
+            # Take from every bucket or from none, so a refused request costs nothing
+            wait, kind, _ = max(buckets, key=lambda b: b[0], default=(0.0, None, None))
+            if wait > 0:
+                return wait, kind
+            for _, _, bucket in buckets:
+                bucket.tokens -= 1
+        return 0.0, None
+
+    def _prune(self, now: float):
+        """Drop idle buckets from the least recently used end, stopping at the first one still refilling."""
+        self._next_prune = now + PRUNE_INTERVAL
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if not bucket.is_full(now):
+                break
+            del self._buckets[key]
+
+
+def _patron_key() -> Optional[str]:
+    patron_id = (request.view_args or {}).get('patron_id') or request.form.get('patron_id')
+    return patron_id.strip() if patron_id else None
+
+
+def _too_busy(status: int, message: str, retry_after: float):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def register_rate_limiting(app):
+    """Install the admission-control before_request hook."""
+    app.config.setdefault('RATE_LIMITS', DEFAULT_RATE_LIMITS)
+    app.config.setdefault('WRITE_QUEUE_SHED_DEPTH', DEFAULT_SHED_DEPTH)
+    limiter = RateLimiter(app.config['RATE_LIMITS'])
+    app.extensions['rate_limiter'] = limiter
+
+    @app.before_request
+    def admit_request():
+        blueprint = request.blueprint
+        if blueprint not in limiter.limits:
+            return None
+
+        shed_depth = app.config['WRITE_QUEUE_SHED_DEPTH']
+        if request.method == 'POST' and shed_depth and write_queue_depth() > shed_depth:
+            metrics.increment(f'rate_limit.shed.{blueprint}')
+            return _too_busy(503, 'The library system is busy. Please try again shortly.', 1)
+
+        retry_after, kind = limiter.check(blueprint, {'patron': _patron_key(), 'client': request.remote_addr})
+        if kind is not None:
+            metrics.increment(f'rate_limit.limited.{blueprint}.{kind}')
+            return _too_busy(429, 'Too many requests. Please slow down.', retry_after)
+
+        metrics.increment(f'rate_limit.allowed.{blueprint}')
+        return None
@@ -6,6 +6,10 @@ from .catalog_routes import catalog_bp
 from .borrowing_routes import borrowing_bp
 from .search_routes import search_bp
 from .api_routes import api_bp
+from .export_routes import export_bp
+from .patron_routes import patron_bp
+from .analytics_routes import analytics_bp
+from .admin_routes import admin_bp
 
 def register_blueprints(app):
     """Register all route blueprints with the Flask app."""
@@ -13,3 +17,7 @@ def register_blueprints(app):
     app.register_blueprint(borrowing_bp)
     app.register_blueprint(search_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(export_bp)
+    app.register_blueprint(patron_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(admin_bp)
@@ -0,0 +1,75 @@
+"""
+Admin Routes - Operational endpoints (backups, request profiles, ...)
+
+Every endpoint requires the X-Admin-Token header to match the ADMIN_TOKEN
+config value; without ADMIN_TOKEN the admin API is disabled. Other endpoints
+that expose patron data (CSV exports, the event feed) use the same check.
+"""
+
+import hmac
+import os
+from flask import Blueprint, current_app, jsonify, request, send_file
+from services.backup_service import create_snapshot, list_snapshots, resolve_snapshot, restore_snapshot
+from services.profile_service import list_captures, resolve_capture
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+@admin_bp.before_request
+def require_admin_token():
+    """Error response unless the request carries the admin token (None when it does)."""
+    expected = current_app.config.get('ADMIN_TOKEN')
+    if not expected:
+        return jsonify({'error': 'Admin API is disabled.'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), expected):
+        return jsonify({'error': 'Invalid admin token.'}), 403
+    return None
+
+@admin_bp.route('/backups', methods=['GET'])
+def get_backups():
+    """
+    List snapshots of the current database, newest first.
+    """
+    snapshots = list_snapshots(current_app.config['BACKUP_DIR'])
+    return jsonify({'snapshots': [{k: v for k, v in s.items() if k != 'path'} for s in snapshots]})
+
+@admin_bp.route('/backups', methods=['POST'])
+def post_backup():
+    """
+    Take a snapshot now (online) and apply the retention limit.
+    """
+    result = create_snapshot(current_app.config['BACKUP_DIR'], current_app.config['BACKUP_KEEP'])
+    result.pop('path')
+    return jsonify(result), 201
+
+@admin_bp.route('/backups/<name>/restore', methods=['POST'])
+def post_restore(name):
+    """
+    Restore the database from a snapshot; the current data is snapshotted first.
+    """
+    backup_dir = current_app.config['BACKUP_DIR']
+    try:
+        if name not in {s['name'] for s in list_snapshots(backup_dir)}:
+            raise ValueError(f"Snapshot not found: {name}.")
+        result = restore_snapshot(resolve_snapshot(name, backup_dir), backup_dir)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify({'restored_from': name, 'pre_restore_snapshot': result['pre_restore_snapshot']})
+
+@admin_bp.route('/profiles', methods=['GET'])
+def get_profiles():
+    """
+    List stored request profiles (slow requests captured by the profiler), newest first.
+    """
+    return jsonify({'profiles': list_captures(current_app.config['PROFILE_DIR'])})
+
+@admin_bp.route('/profiles/<filename>', methods=['GET'])
+def download_profile(filename):
+    """
+    Download a capture: <id>.prof (pstats dump) or <id>.txt (text summary).
+    """
+    try:
+        path = resolve_capture(filename, current_app.config['PROFILE_DIR'])
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    mimetype = 'text/plain' if filename.endswith('.txt') else 'application/octet-stream'
+    return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=filename)
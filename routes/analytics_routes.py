@@ -0,0 +1,46 @@
+"""
+Analytics Routes - JSON circulation dashboards backed by rollup tables
+"""
+
+from datetime import date
+from flask import Blueprint, jsonify, request
+from services.analytics_service import (
+    get_daily_checkouts_and_returns, get_circulation_summary, get_top_books
+)
+
+analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
+
+@analytics_bp.route('/daily')
+def daily():
+    """Checkouts and returns per day. Query parameters: start, end (YYYY-MM-DD)."""
+    try:
+        return jsonify(get_daily_checkouts_and_returns(*_window_args()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@analytics_bp.route('/summary')
+def summary():
+    """Totals, average loan duration and overdue rate. Query parameters: start, end."""
+    try:
+        return jsonify(get_circulation_summary(*_window_args()))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@analytics_bp.route('/top_books')
+def top_books():
+    """Most borrowed books. Query parameters: start, end, limit (default 10)."""
+    try:
+        limit = int(request.args.get('limit', 10))
+        return jsonify(get_top_books(*_window_args(), limit=limit))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+def _window_args():
+    window = []
+    for arg in ('start', 'end'):
+        value = request.args.get(arg)
+        try:
+            window.append(date.fromisoformat(value) if value else None)
+        except ValueError:
+            raise ValueError(f"Invalid date: {value}. Use YYYY-MM-DD.")
+    return window
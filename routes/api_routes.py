@@ -3,7 +3,20 @@ API Routes - JSON API endpoints
 """
 
 from flask import Blueprint, jsonify, request
-from services.library_service import calculate_late_fee_for_book, search_books_in_catalog
+from services.library_service import (
+    calculate_late_fee_for_book, search_books_in_catalog, get_patron_borrowing_history, browse_catalog,
+    get_patron_status_report
+)
+from services.fee_forecast import forecast_late_fees
+from services.hold_service import get_hold_queue, get_patron_holds
+from services.branch_service import search_all_branches
+from services.event_service import read_events
+from services.search_cache import search_cache
+from branches import branch_ids, default_branch
+from routes.patron_routes import parse_history_args
+from routes.catalog_routes import parse_catalog_args
+from routes.admin_routes import require_admin_token
+import metrics
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -16,6 +29,25 @@ def get_late_fee(patron_id, book_id):
     result = calculate_late_fee_for_book(patron_id, book_id)
     return jsonify(result), 501 if 'not implemented' in result.get('status', '') else 200
 
+@api_bp.route('/catalog')
+def get_catalog():
+    """
+    Get one page of the catalog.
+    API endpoint for R2: Book Catalog Display
+    Query parameters: sort (title/availability/copies_out), available (1 for available only),
+    author, limit, cursor
+    """
+    try:
+        options = parse_catalog_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    page = browse_catalog(**options)
+    if 'error' in page:
+        return jsonify(page), 400
+
+    return jsonify({**page, 'count': len(page['books'])})
+
 @api_bp.route('/search')
 def search_books_api():
     """
@@ -37,3 +69,121 @@ def search_books_api():
         'results': books,
         'count': len(books)
     })
+
+@api_bp.route('/patron/<patron_id>/history')
+def get_borrowing_history(patron_id):
+    """
+    Get one page of a patron's borrowing history.
+    API endpoint for R7: Patron Status Report (borrowing history)
+    Query parameters: limit, cursor, start, end (YYYY-MM-DD), status (all/open/returned)
+    """
+    try:
+        options = parse_history_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    history = get_patron_borrowing_history(patron_id, **options)
+    if 'error' in history:
+        return jsonify(history), 400
+
+    return jsonify(history)
+
+@api_bp.route('/patron/<patron_id>/status')
+def get_patron_status(patron_id):
+    """
+    Get a patron's status report: open loans with late fees, totals and recent history.
+    API endpoint for R7: Patron Status Report
+    """
+    report = get_patron_status_report(patron_id)
+    if 'error' in report:
+        return jsonify(report), 400
+
+    return jsonify(report)
+
+@api_bp.route('/fees/forecast')
+def get_fee_forecast():
+    """
+    Project late fee revenue and exposure across all open loans.
+    Query parameters: horizons (comma separated days, default 30,60,90),
+    step (curve spacing in days, default 1), top (patrons to list, default 20)
+    """
+    try:
+        horizons = [int(h) for h in request.args.get('horizons', '30,60,90').split(',') if h.strip()]
+        step = int(request.args.get('step', 1))
+        top = int(request.args.get('top', 20))
+        forecast = forecast_late_fees(horizons, step, top)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(forecast)
+
+@api_bp.route('/patron/<patron_id>/holds')
+def get_holds_for_patron(patron_id):
+    """
+    Get a patron's waiting and ready holds with queue positions.
+    """
+    if not patron_id.isdigit() or len(patron_id) != 6:
+        return jsonify({'error': 'Invalid patron ID. Must be exactly 6 digits.'}), 400
+
+    return jsonify({'patron_id': patron_id, 'holds': get_patron_holds(patron_id)})
+
+@api_bp.route('/books/<int:book_id>/holds')
+def get_holds_for_book(book_id):
+    """
+    Get the hold queue for a book in FIFO order.
+    """
+    queue = get_hold_queue(book_id)
+    return jsonify({'book_id': book_id, 'queue': queue, 'count': len(queue)})
+
+@api_bp.route('/branches')
+def list_branches():
+    """
+    List the branches served by this process.
+    """
+    return jsonify({'branches': branch_ids(), 'default': default_branch()})
+
+@api_bp.route('/branches/search')
+def search_branches_api():
+    """
+    Search every branch's catalog (or a comma separated ``branches`` subset) in parallel.
+    """
+    search_term = request.args.get('q', '').strip()
+    search_type = request.args.get('type', 'title')
+    if not search_term:
+        return jsonify({'error': 'Search term is required'}), 400
+
+    branches = [b.strip() for b in request.args.get('branches', '').split(',') if b.strip()]
+    try:
+        result = search_all_branches(search_term, search_type, branches)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({'search_term': search_term, 'search_type': search_type, **result})
+
+@api_bp.route('/events')
+def get_events():
+    """
+    Read circulation events after a sequence number, oldest first.
+    Requires the admin token (events carry patron ids and payment transaction ids).
+    Query parameters: after (default 0), limit (default 500), type (comma separated)
+    """
+    denied = require_admin_token()
+    if denied is not None:
+        return denied
+
+    try:
+        after = int(request.args.get('after', 0))
+        limit = int(request.args.get('limit', 500))
+        types = [t.strip() for t in request.args.get('type', '').split(',') if t.strip()]
+        result = read_events(after, limit, types)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(result)
+
+@api_bp.route('/metrics')
+def get_metrics():
+    """
+    Get process-wide counters and summaries (request/response sizes, search cache, ...).
+    """
+    return jsonify({**metrics.snapshot(), 'search_cache': search_cache.stats()})
@@ -4,6 +4,7 @@ Borrowing Routes - Book borrowing and returning endpoints
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from services.library_service import borrow_book_by_patron, return_book_by_patron
+from services.hold_service import place_hold, cancel_hold
 
 borrowing_bp = Blueprint('borrowing', __name__)
 
@@ -49,3 +50,39 @@ def return_book():
     
     flash(message, 'success' if success else 'error')
     return render_template('return_book.html')
+
+@borrowing_bp.route('/hold', methods=['POST'])
+def hold_book():
+    """
+    Place a hold on an unavailable book.
+    """
+    patron_id = request.form.get('patron_id', '').strip()
+    
+    try:
+        book_id = int(request.form.get('book_id', ''))
+    except (ValueError, TypeError):
+        flash('Invalid book ID.', 'error')
+        return redirect(url_for('catalog.catalog'))
+    
+    success, message = place_hold(patron_id, book_id)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('catalog.catalog'))
+
+@borrowing_bp.route('/hold/cancel', methods=['POST'])
+def cancel_book_hold():
+    """
+    Cancel a hold; a reserved copy passes to the next patron in line.
+    """
+    patron_id = request.form.get('patron_id', '').strip()
+    
+    try:
+        book_id = int(request.form.get('book_id', ''))
+    except (ValueError, TypeError):
+        flash('Invalid book ID.', 'error')
+        return redirect(url_for('catalog.catalog'))
+    
+    success, message = cancel_hold(patron_id, book_id)
+    
+    flash(message, 'success' if success else 'error')
+    return redirect(url_for('catalog.catalog'))
@@ -3,8 +3,8 @@ Catalog Routes - Book catalog related endpoints
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from database import get_all_books
-from services.library_service import add_book_to_catalog
+from services.library_service import add_book_to_catalog, browse_catalog, CATALOG_PAGE_SIZE
+from services.hold_service import books_awaiting_pickup
 
 catalog_bp = Blueprint('catalog', __name__)
 
@@ -16,11 +16,44 @@ def index():
 @catalog_bp.route('/catalog')
 def catalog():
     """
-    Display all books in the catalog.
+    Display one page of the catalog.
     Implements R2: Book Catalog Display
+    Query parameters: sort (title/availability/copies_out), available (1 for available only),
+    author, limit, cursor
     """
-    books = get_all_books()
-    return render_template('catalog.html', books=books)
+    try:
+        options = parse_catalog_args(request.args)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return render_template('catalog.html', books=[], next_cursor=None, options={})
+
+    page = browse_catalog(**options)
+    if 'error' in page:
+        flash(page['error'], 'error')
+        return render_template('catalog.html', books=[], next_cursor=None, options=options)
+
+    # Books whose reserved copy the hold's patron can still borrow, though none is on the shelf
+    pickup_ids = books_awaiting_pickup(book['id'] for book in page['books'])
+    return render_template('catalog.html', books=page['books'], next_cursor=page['next_cursor'], options=options,
+                           pickup_ids=pickup_ids)
+
+def parse_catalog_args(args) -> dict:
+    """
+    Parse catalog query parameters (sort, available, author, limit, cursor).
+    Raises ValueError for malformed values.
+    """
+    try:
+        limit = int(args.get('limit', CATALOG_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Page size must be an integer.')
+
+    return {
+        'sort': args.get('sort', 'title'),
+        'available_only': args.get('available', '') in ('1', 'true', 'on'),
+        'author': args.get('author') or None,
+        'limit': limit,
+        'cursor': args.get('cursor') or None,
+    }
 
 @catalog_bp.route('/add_book', methods=['GET', 'POST'])
 def add_book():
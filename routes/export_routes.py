@@ -0,0 +1,44 @@
+"""
+Export Routes - Streaming CSV downloads of catalog and loan history
+Exports include patron ids, so they require the admin token (see admin_routes).
+"""
+
+from datetime import date
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from services.export_service import iter_csv_chunks
+from routes.admin_routes import require_admin_token
+
+export_bp = Blueprint('export', __name__, url_prefix='/export')
+export_bp.before_request(require_admin_token)
+
+@export_bp.route('/<table>.csv')
+def export_table(table):
+    """
+    Stream a table as CSV.
+    Query parameters: columns (comma separated), start and end (YYYY-MM-DD),
+    gzip (1 to download a .csv.gz).
+    """
+    columns = [c.strip() for c in request.args.get('columns', '').split(',') if c.strip()]
+    compress = request.args.get('gzip', '') in ('1', 'true', 'yes')
+
+    try:
+        start_date = _parse_date(request.args.get('start'))
+        end_date = _parse_date(request.args.get('end'))
+        chunks = iter_csv_chunks(table, columns, start_date, end_date, compress)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    filename = f'{table}.csv.gz' if compress else f'{table}.csv'
+    return Response(
+        stream_with_context(chunks),
+        mimetype='application/gzip' if compress else 'text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date: {value}. Use YYYY-MM-DD.")
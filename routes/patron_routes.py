@@ -0,0 +1,66 @@
+"""
+Patron Routes - Patron account pages
+"""
+
+from datetime import date
+from flask import Blueprint, render_template, request, flash
+from services.library_service import get_patron_borrowing_history, get_patron_status_report, HISTORY_PAGE_SIZE
+
+patron_bp = Blueprint('patron', __name__)
+
+@patron_bp.route('/patron/<patron_id>/history')
+def borrowing_history(patron_id):
+    """
+    Display one page of a patron's borrowing history.
+    Web interface for R7: Patron Status Report
+    """
+    try:
+        options = parse_history_args(request.args)
+    except ValueError as e:
+        flash(str(e), 'error')
+        return render_template('patron_history.html', patron_id=patron_id, records=[], next_cursor=None, options={})
+
+    history = get_patron_borrowing_history(patron_id, **options)
+    if 'error' in history:
+        flash(history['error'], 'error')
+        return render_template('patron_history.html', patron_id=patron_id, records=[], next_cursor=None, options=options)
+
+    return render_template('patron_history.html', patron_id=patron_id, records=history['records'],
+                           next_cursor=history['next_cursor'], options=options)
+
+@patron_bp.route('/patron/status')
+@patron_bp.route('/patron/<patron_id>/status')
+def patron_status(patron_id=None):
+    """
+    Display a patron's current loans, late fees and recent history.
+    Web interface for R7: Patron Status Report
+    """
+    patron_id = patron_id or request.args.get('patron_id', '').strip()
+    if not patron_id:
+        return render_template('patron_status.html', patron_id='', report=None)
+
+    report = get_patron_status_report(patron_id)
+    if 'error' in report:
+        flash(report['error'], 'error')
+        return render_template('patron_status.html', patron_id=patron_id, report=None)
+
+    return render_template('patron_status.html', patron_id=patron_id, report=report)
+
+def parse_history_args(args) -> dict:
+    """
+    Parse borrowing history query parameters (limit, cursor, start, end, status).
+    Raises ValueError for malformed values.
+    """
+    try:
+        limit = int(args.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Page size must be an integer.')
+
+    options = {'limit': limit, 'cursor': args.get('cursor') or None, 'status': args.get('status', 'all')}
+    for key, arg in (('start_date', 'start'), ('end_date', 'end')):
+        value = args.get(arg)
+        try:
+            options[key] = date.fromisoformat(value) if value else None
+        except ValueError:
+            raise ValueError(f'Invalid date: {value}. Use YYYY-MM-DD.')
+    return options
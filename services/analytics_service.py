@@ -0,0 +1,98 @@
+"""
+Analytics Service Module - Circulation dashboards
+Reads only the circulation rollup tables, never scans borrow_records.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Optional
+from database import get_daily_circulation, get_circulation_totals, get_top_borrowed_books
+
+# Default reporting window in days
+DEFAULT_WINDOW_DAYS = 30
+MAX_WINDOW_DAYS = 366
+
+
+def _resolve_window(start_date: Optional[date], end_date: Optional[date]):
+    end_date = end_date or date.today()
+    start_date = start_date or end_date - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+    if start_date > end_date:
+        raise ValueError("Start date must be on or before end date.")
+    if (end_date - start_date).days >= MAX_WINDOW_DAYS:
+        raise ValueError(f"Reporting window must be at most {MAX_WINDOW_DAYS} days.")
+    return start_date, end_date
+
+
+def get_daily_checkouts_and_returns(start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict:
+    """
+    Get checkouts and returns per day, including days with no activity.
+    
+    Args:
+        start_date: First day (default: 30 days before end_date)
+        end_date: Last day (default: today)
+        
+    Returns:
+        dict: {"start", "end", "days": [{"day", "checkouts", "returns"}, ...]}
+        
+    Raises:
+        ValueError: If the window is empty or too long
+    """
+    start_date, end_date = _resolve_window(start_date, end_date)
+    rows = {r['day']: r for r in get_daily_circulation(start_date.isoformat(), end_date.isoformat())}
+
+    days = []
+    day = start_date
+    while day <= end_date:
+        row = rows.get(day.isoformat(), {})
+        days.append({
+            'day': day.isoformat(),
+            'checkouts': row.get('checkouts', 0),
+            'returns': row.get('returns', 0),
+        })
+        day += timedelta(days=1)
+
+    return {'start': start_date.isoformat(), 'end': end_date.isoformat(), 'days': days}
+
+
+def get_circulation_summary(start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict:
+    """
+    Get totals, average loan duration and overdue rate for returns in the window.
+    
+    Returns:
+        dict: {"start", "end", "checkouts", "returns", "average_loan_days", "overdue_rate"}
+        
+    Raises:
+        ValueError: If the window is empty or too long
+    """
+    start_date, end_date = _resolve_window(start_date, end_date)
+    totals = get_circulation_totals(start_date.isoformat(), end_date.isoformat())
+    returns = totals['returns']
+
+    return {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'checkouts': totals['checkouts'],
+        'returns': returns,
+        'average_loan_days': round(totals['loan_days_total'] / returns, 2) if returns else None,
+        'overdue_rate': round(totals['overdue_returns'] / returns, 4) if returns else None,
+    }
+
+
+def get_top_books(start_date: Optional[date] = None, end_date: Optional[date] = None, limit: int = 10) -> Dict:
+    """
+    Get the most borrowed books in the window.
+    
+    Returns:
+        dict: {"start", "end", "books": [{"book_id", "title", "author", "checkouts"}, ...]}
+        
+    Raises:
+        ValueError: If the window or limit is invalid
+    """
+    if not 1 <= limit <= 100:
+        raise ValueError("Limit must be between 1 and 100.")
+    start_date, end_date = _resolve_window(start_date, end_date)
+
+    return {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'books': get_top_borrowed_books(start_date.isoformat(), end_date.isoformat(), limit),
+    }
@@ -0,0 +1,60 @@
+"""
+Archive Service Module - Move old returned loans out of borrow_records
+Loans returned more than a retention window ago are copied to borrow_history
+and deleted from borrow_records in small batches, one write transaction each,
+so borrows and returns queued behind the archiver wait for one batch at most.
+Open-loan queries then only see current circulation; history queries and
+exports read both tables.
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from database import archive_loans
+
+# Returned loans stay in borrow_records for this long
+DEFAULT_RETENTION_DAYS = 365
+
+# Loans moved per write transaction
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+
+def archive_closed_loans(retention_days: int = DEFAULT_RETENTION_DAYS, batch_size: int = DEFAULT_BATCH_SIZE,
+                         max_batches: Optional[int] = None,
+                         clock: Callable[[], datetime] = datetime.now) -> Dict:
+    """
+    Archive every loan returned more than retention_days ago.
+
+    Args:
+        retention_days: Returned loans younger than this stay in borrow_records
+        batch_size: Loans moved per transaction (1-5000)
+        max_batches: Stop after this many batches (default: until none are left)
+        clock: Returns "now" (injectable for tests)
+
+    Returns:
+        dict: {"cutoff", "archived", "batches"}
+
+    Raises:
+        ValueError: If the retention window or the batch size is out of range
+        RuntimeError: If a batch fails (earlier batches stay archived)
+    """
+    if retention_days < 0:
+        raise ValueError("Retention must be zero or more days.")
+    if not 1 <= batch_size <= MAX_BATCH_SIZE:
+        raise ValueError(f"Batch size must be between 1 and {MAX_BATCH_SIZE}.")
+
+    now = clock()
+    cutoff = now - timedelta(days=retention_days)
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_loans(cutoff, batch_size, now)
+        if moved < 0:
+            raise RuntimeError(f"Archiving failed after {archived} loan(s).")
+        if moved == 0:
+            break
+        archived += moved
+        batches += 1
+        if moved < batch_size:
+            break
+
+    return {'cutoff': cutoff.isoformat(), 'archived': archived, 'batches': batches}
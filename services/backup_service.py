@@ -0,0 +1,263 @@
+"""
+Backup Service Module - Online backups, snapshots and restore
+Copies the live database with the sqlite3 backup API a few pages at a time,
+sleeping between steps so the writer thread and readers keep getting the
+lock. The copy is written to a temporary file, checked, and renamed into
+place, so a snapshot is never seen half-written.
+
+If the database keeps changing under an incremental backup, SQLite restarts
+the copy. After MAX_RESTARTS restarts the backup falls back to a single-step
+copy, which holds the read lock for one pass over the file.
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from database import create_schema, current_database_path, use_database
+from services import hold_service
+from services.loan_snapshot import DEFAULT_SNAPSHOT_DIR, reset_loan_snapshot
+from services.search_cache import search_cache
+from services.status_cache import status_cache
+
+logger = logging.getLogger(__name__)
+
+# Pages copied per step and pause between steps
+BACKUP_PAGES_PER_STEP = 256
+BACKUP_STEP_SLEEP = 0.01
+MAX_RESTARTS = 5
+
+DEFAULT_BACKUP_DIR = 'backups'
+DEFAULT_KEEP = 7
+
+SNAPSHOT_NAME = re.compile(r'^[A-Za-z0-9_.-]+-\d{8}-\d{6}(-\d+)?\.db$')
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, sleep: float) -> Dict:
+    stats = {'steps': 0, 'restarts': 0, 'pages': 0}
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal last_remaining
+        stats['steps'] += 1
+        stats['pages'] = total
+        if last_remaining is not None and remaining > last_remaining:
+            stats['restarts'] += 1
+            if stats['restarts'] > MAX_RESTARTS:
+                raise _Restarted()
+        last_remaining = remaining
+        if remaining and sleep:
+            time.sleep(sleep)
+
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    except _Restarted:
+        source.backup(target, pages=-1)
+        stats['steps'] += 1
+    return stats
+
+
+def backup_database(dest_path: str, pages: int = BACKUP_PAGES_PER_STEP, sleep: float = BACKUP_STEP_SLEEP) -> Dict:
+    """
+    Copy the current database to dest_path while it stays online.
+
+    Args:
+        dest_path: File to write (replaced atomically when the copy is complete)
+        pages: Pages copied per step (-1 copies everything in one step)
+        sleep: Seconds to pause between steps
+
+    Returns:
+        dict: {"path", "size", "pages", "steps", "restarts", "elapsed"}
+
+    Raises:
+        sqlite3.DatabaseError: If the copy fails or does not pass an integrity check
+    """
+    started = time.perf_counter()
+    tmp_path = f'{dest_path}.partial'
+    source = sqlite3.connect(current_database_path())
+    target = sqlite3.connect(tmp_path)
+    try:
+        stats = _copy(source, target, pages, sleep)
+        check = target.execute('PRAGMA quick_check').fetchone()[0]
+        if check != 'ok':
+            raise sqlite3.DatabaseError(f'Backup failed integrity check: {check}')
+    except Exception:
+        target.close()
+        os.remove(tmp_path)
+        raise
+    finally:
+        source.close()
+    target.close()
+    os.replace(tmp_path, dest_path)
+
+    return {'path': dest_path, 'size': os.path.getsize(dest_path), **stats,
+            'elapsed': round(time.perf_counter() - started, 3)}
+
+
+def _snapshot_prefix() -> str:
+    return os.path.splitext(os.path.basename(current_database_path()))[0]
+
+
+def list_snapshots(backup_dir: str = DEFAULT_BACKUP_DIR) -> List[Dict]:
+    """
+    List the current database's snapshots, newest first.
+
+    Returns:
+        list: {"name", "path", "size", "created_at"} dicts
+    """
+    if not os.path.isdir(backup_dir):
+        return []
+    prefix = _snapshot_prefix() + '-'
+    snapshots = []
+    for name in os.listdir(backup_dir):
+        if name.startswith(prefix) and SNAPSHOT_NAME.match(name) and name[len(prefix):len(prefix) + 1].isdigit():
+            path = os.path.join(backup_dir, name)
+            stamp = name[len(prefix):len(prefix) + 15]
+            snapshots.append({
+                'name': name,
+                'path': path,
+                'size': os.path.getsize(path),
+                'created_at': datetime.strptime(stamp, '%Y%m%d-%H%M%S').isoformat(),
+            })
+    snapshots.sort(key=lambda s: s['name'], reverse=True)
+    return snapshots
+
+
+def prune_snapshots(backup_dir: str = DEFAULT_BACKUP_DIR, keep: int = DEFAULT_KEEP) -> List[str]:
+    """Delete all but the newest `keep` snapshots. Returns the deleted names."""
+    if keep < 1:
+        raise ValueError("keep must be at least 1.")
+    removed = []
+    for snapshot in list_snapshots(backup_dir)[keep:]:
+        os.remove(snapshot['path'])
+        removed.append(snapshot['name'])
+    return removed
+
+
+def create_snapshot(backup_dir: str = DEFAULT_BACKUP_DIR, keep: Optional[int] = DEFAULT_KEEP,
+                    now: Optional[datetime] = None, **backup_options) -> Dict:
+    """
+    Take a timestamped snapshot into backup_dir and apply the retention limit.
+
+    Returns:
+        dict: backup_database() stats plus "name" and "pruned"
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = (now or datetime.now()).strftime('%Y%m%d-%H%M%S')
+    name = f'{_snapshot_prefix()}-{stamp}.db'
+    suffix = 1
+    while os.path.exists(os.path.join(backup_dir, name)):
+        name = f'{_snapshot_prefix()}-{stamp}-{suffix}.db'
+        suffix += 1
+
+    result = backup_database(os.path.join(backup_dir, name), **backup_options)
+    result['name'] = name
+    result['pruned'] = prune_snapshots(backup_dir, keep) if keep else []
+    return result
+
+
+def resolve_snapshot(name_or_path: str, backup_dir: str = DEFAULT_BACKUP_DIR) -> str:
+    """
+    Turn a snapshot name (from list_snapshots) or a file path into a path.
+
+    Raises:
+        ValueError: If the snapshot does not exist
+    """
+    if SNAPSHOT_NAME.match(name_or_path):
+        path = os.path.join(backup_dir, name_or_path)
+    else:
+        path = name_or_path
+    if not os.path.isfile(path):
+        raise ValueError(f"Snapshot not found: {name_or_path}.")
+    return path
+
+
+def restore_snapshot(snapshot_path: str, backup_dir: str = DEFAULT_BACKUP_DIR, save_current: bool = True,
+                     loan_snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> Dict:
+    """
+    Replace the contents of the current database with a snapshot.
+
+    The copy goes through the backup API into the live file, so open
+    connections see the restored data instead of a swapped-out inode.
+
+    Args:
+        snapshot_path: Snapshot file to restore
+        backup_dir: Where the pre-restore snapshot of the current data goes
+        save_current: Snapshot the current data first (without pruning)
+        loan_snapshot_dir: Loan snapshot to discard (its next build is a full one)
+
+    Returns:
+        dict: {"restored_from", "pre_restore_snapshot"}
+
+    Raises:
+        ValueError: If the snapshot is not a valid database
+    """
+    source = sqlite3.connect(f'file:{snapshot_path}?mode=ro', uri=True)
+    try:
+        try:
+            check = source.execute('PRAGMA quick_check').fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"Not a valid snapshot: {e}.")
+        if check != 'ok':
+            raise ValueError(f"Snapshot failed integrity check: {check}.")
+
+        saved = create_snapshot(backup_dir, keep=None)['name'] if save_current else None
+
+        target = sqlite3.connect(current_database_path(), timeout=30)
+        try:
+            source.backup(target, pages=-1)
+            create_schema(target)  # bring an older snapshot up to the current schema
+            target.commit()
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+    hold_service.clear_queue_cache()
+    search_cache.clear()  # restored data may reuse catalog versions
+    status_cache.clear()  # ...and the event sequence numbers status reports are keyed on
+    reset_loan_snapshot(loan_snapshot_dir)  # ...and the record ids and event seqs it was built up to
+    return {'restored_from': snapshot_path, 'pre_restore_snapshot': saved}
+
+
+class SnapshotScheduler:
+    """Background thread taking a snapshot every `interval` seconds."""
+
+    def __init__(self, interval: float, backup_dir: str = DEFAULT_BACKUP_DIR, keep: int = DEFAULT_KEEP,
+                 database_path: Optional[str] = None):
+        self.interval = interval
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.database_path = database_path or current_database_path()
+        self.last_result: Optional[Dict] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='snapshot-scheduler', daemon=True)
+
+    def start(self) -> 'SnapshotScheduler':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def run_once(self) -> Dict:
+        with use_database(self.database_path):
+            self.last_result = create_snapshot(self.backup_dir, self.keep)
+        return self.last_result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception('Scheduled snapshot of %s failed', self.database_path)
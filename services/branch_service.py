@@ -0,0 +1,58 @@
+"""
+Branch Service Module - Catalog operations spanning several branches
+Cross-branch search fans out to every branch database in parallel and merges
+the per-branch results.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from branches import branch_ids, use_branch
+from services.library_service import search_books_in_catalog
+
+logger = logging.getLogger(__name__)
+
+# Branch searches run concurrently on this pool
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='branch-search')
+
+
+def _search_branch(branch_id: str, search_term: str, search_type: str) -> List[Dict]:
+    with use_branch(branch_id):
+        return [dict(book, branch=branch_id) for book in search_books_in_catalog(search_term, search_type)]
+
+
+def search_all_branches(search_term: str, search_type: str, branches: Optional[List[str]] = None) -> Dict:
+    """
+    Search the catalogs of several branches in parallel.
+
+    Args:
+        search_term: Text to search for
+        search_type: title, author or isbn
+        branches: Branch ids to search (default: all configured branches)
+
+    Returns:
+        dict: {"results": [book + "branch"], "count", "branches", "failed"}
+              Results are ordered by title, then branch.
+
+    Raises:
+        ValueError: If no branches are configured or a branch is unknown
+    """
+    branches = branches or branch_ids()
+    if not branches:
+        raise ValueError("No branches are configured.")
+    unknown = sorted(set(branches) - set(branch_ids()))
+    if unknown:
+        raise ValueError(f"Unknown branch: {unknown[0]}.")
+
+    futures = {b: _search_pool.submit(_search_branch, b, search_term, search_type) for b in branches}
+    results, failed = [], []
+    for branch_id, future in futures.items():
+        try:
+            results.extend(future.result())
+        except Exception:
+            logger.exception("Search failed on branch %s", branch_id)
+            failed.append(branch_id)
+
+    results.sort(key=lambda book: (book['title'].lower(), book['branch']))
+    return {'results': results, 'count': len(results), 'branches': list(branches), 'failed': failed}
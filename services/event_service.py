@@ -0,0 +1,78 @@
+"""
+Event Service Module - Incremental consumers of the circulation event log
+Every borrow, return, book insert, fee payment, inventory repair and release
+of a ready hold's copy (cancelled or expired) appends an event to
+circulation_events in the same transaction as the change itself.
+Consumers (analytics, notifications, search indexes, ...) read the events
+after their saved checkpoint in batches instead of rescanning the tables.
+
+Delivery is at-least-once: the checkpoint is saved after the handler returns,
+so a consumer that crashes mid-batch sees that batch again.
+"""
+
+from typing import Callable, Dict, List, Optional
+from database import get_events_after, get_event_checkpoint, get_latest_event_seq, save_event_checkpoint
+
+# Events per batch read from the log
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 5000
+
+EVENT_TYPES = ('book_added', 'checkout', 'return', 'fee_paid', 'availability_repaired', 'hold_released')
+
+
+def read_events(after: int = 0, limit: int = DEFAULT_BATCH_SIZE, event_types: Optional[List[str]] = None) -> Dict:
+    """
+    Read one batch of events after a sequence number.
+
+    Returns:
+        dict: {"events": [...], "next_after": seq to pass for the next batch, "latest": newest seq}
+
+    Raises:
+        ValueError: If after, limit or an event type is invalid
+    """
+    if after < 0:
+        raise ValueError("after must be 0 or greater.")
+    if not 1 <= limit <= MAX_BATCH_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_BATCH_SIZE}.")
+    unknown = set(event_types or ()) - set(EVENT_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown event type: {sorted(unknown)[0]}. Choose from {', '.join(EVENT_TYPES)}.")
+
+    events = get_events_after(after, limit, event_types)
+    return {
+        'events': events,
+        'next_after': events[-1]['seq'] if events else after,
+        'latest': get_latest_event_seq(),
+    }
+
+
+def consume_events(consumer: str, handler: Callable[[List[Dict]], None], batch_size: int = DEFAULT_BATCH_SIZE,
+                   max_batches: Optional[int] = None, event_types: Optional[List[str]] = None) -> int:
+    """
+    Feed new events to a handler in batches, advancing the consumer's checkpoint after each batch.
+
+    Args:
+        consumer: Name the checkpoint is stored under
+        handler: Called with each non-empty batch of events; raising stops consumption
+        batch_size: Events per batch
+        max_batches: Stop after this many batches (default: until caught up)
+        event_types: Only deliver these event types (the checkpoint still advances past others)
+
+    Returns:
+        int: Number of events delivered
+    """
+    checkpoint = get_event_checkpoint(consumer)
+    delivered = batches = 0
+    while max_batches is None or batches < max_batches:
+        batch = get_events_after(checkpoint, batch_size)
+        if not batch:
+            break
+        wanted = [e for e in batch if not event_types or e['event_type'] in event_types]
+        if wanted:
+            handler(wanted)
+            delivered += len(wanted)
+        checkpoint = batch[-1]['seq']
+        if not save_event_checkpoint(consumer, checkpoint):
+            raise RuntimeError(f"Could not save checkpoint for consumer {consumer}.")
+        batches += 1
+    return delivered
@@ -0,0 +1,136 @@
+"""
+Export Service Module - Streaming CSV exports
+Streams the books and borrow_records tables as CSV (optionally gzip) without
+materializing the tables in memory. The borrow_records export includes
+archived loans (borrow_history).
+"""
+
+import csv
+import io
+import zlib
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+from database import iter_query_rows
+
+# Exportable tables, their columns (in output order), the column used for date-range filters
+# and the table or view read (default: the table itself)
+EXPORTABLE_TABLES: Dict[str, Dict] = {
+    'books': {
+        'columns': ('id', 'title', 'author', 'isbn', 'total_copies', 'available_copies'),
+        'date_column': None,
+    },
+    'borrow_records': {
+        'columns': ('id', 'patron_id', 'book_id', 'borrow_date', 'due_date', 'return_date'),
+        'date_column': 'borrow_date',
+        'source': 'all_borrow_records',
+    },
+}
+
+# Rows fetched from the cursor and encoded per chunk
+EXPORT_BATCH_SIZE = 1000
+
+
+def build_export_query(table: str, columns: Optional[List[str]] = None,
+                       start_date: Optional[date] = None, end_date: Optional[date] = None) -> Tuple[str, Tuple, List[str]]:
+    """
+    Build the SELECT statement for an export.
+
+    Args:
+        table: Name of an exportable table
+        columns: Subset of the table's columns (default: all)
+        start_date: Include rows on or after this date (date-filtered tables only)
+        end_date: Include rows on or before this date (date-filtered tables only)
+
+    Returns:
+        tuple: (query: str, params: tuple, columns: list)
+
+    Raises:
+        ValueError: If the table, a column or a date filter is not supported
+    """
+    spec = EXPORTABLE_TABLES.get(table)
+    if spec is None:
+        raise ValueError(f"Unknown export table: {table}.")
+
+    columns = list(columns) if columns else list(spec['columns'])
+    unknown = [c for c in columns if c not in spec['columns']]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}.")
+
+    conditions, params = [], []
+    if start_date or end_date:
+        date_column = spec['date_column']
+        if date_column is None:
+            raise ValueError(f"Date filters are not supported for {table}.")
+        if start_date:
+            conditions.append(f'{date_column} >= ?')
+            params.append(start_date.isoformat())
+        if end_date:
+            conditions.append(f'{date_column} < ?')
+            params.append((end_date + timedelta(days=1)).isoformat())
+
+    query = f"SELECT {', '.join(columns)} FROM {spec.get('source', table)}"
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY id'
+    return query, tuple(params), columns
+
+
+def iter_csv_chunks(table: str, columns: Optional[List[str]] = None,
+                    start_date: Optional[date] = None, end_date: Optional[date] = None,
+                    compress: bool = False) -> Iterator[bytes]:
+    """
+    Stream an export as encoded CSV chunks (header first), one chunk per batch.
+    With compress=True the chunks form a single gzip stream.
+
+    Raises:
+        ValueError: If the export parameters are invalid (raised before any output)
+    """
+    query, params, columns = build_export_query(table, columns, start_date, end_date)
+    return _generate_csv_chunks(query, params, columns, compress)
+
+
+def _generate_csv_chunks(query: str, params: Tuple, columns: List[str], compress: bool) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31 writes a gzip header
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    pending = 1
+    for row in iter_query_rows(query, params, EXPORT_BATCH_SIZE):
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            chunk = drain()
+            pending = 0
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def export_to_file(path: str, table: str, columns: Optional[List[str]] = None,
+                   start_date: Optional[date] = None, end_date: Optional[date] = None,
+                   compress: bool = False) -> int:
+    """
+    Write an export to a file.
+
+    Returns:
+        int: Number of bytes written
+    """
+    written = 0
+    chunks = iter_csv_chunks(table, columns, start_date, end_date, compress)
+    with open(path, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            written += len(chunk)
+    return written
@@ -0,0 +1,170 @@
+"""
+Fee Forecast Module - Live late fee assessments and late fee forecasting
+Applies the tiered late fee schedule (fees.py) to open loans, both for live
+per-loan assessments and for projecting fees across all open loans.
+
+Open loans are loaded into compact arrays (sorted due timestamps plus patron
+indexes). Aggregate curves are computed per as-of date from counts of loans
+past each day boundary, so they cost O(tiers x log n) per date rather than
+O(n). Per-patron totals use NumPy when it is installed and fall back to plain
+Python otherwise.
+"""
+
+import bisect
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+from database import iter_open_loan_due_dates
+from fees import MAX_FEE_PER_BOOK, days_overdue, late_fee_for_days
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+SECONDS_PER_DAY = 86400
+
+OpenLoans = namedtuple('OpenLoans', ['due', 'patron_index', 'patron_ids'])
+OpenLoans.__doc__ = """Open loans as compact arrays: due timestamps (ascending), patron index per loan, patron ids."""
+
+
+def assess_late_fee(due_date: datetime, clock: Callable[[], datetime] = datetime.now) -> Dict:
+    """
+    Assess the late fee for one loan as of clock().
+
+    Returns:
+        dict: {"fee_amount": float, "days_overdue": int}
+    """
+    overdue = days_overdue(due_date, clock())
+    return {"fee_amount": late_fee_for_days(overdue), "days_overdue": overdue}
+
+
+def _fee_steps() -> List[tuple]:
+    """
+    The schedule as (day, marginal fee) steps: a loan k or more days overdue
+    owes the sum of marginal fees for days 1..k.
+    """
+    steps = []
+    day = 1
+    while late_fee_for_days(day) < MAX_FEE_PER_BOOK:
+        steps.append((day, late_fee_for_days(day) - late_fee_for_days(day - 1)))
+        day += 1
+    steps.append((day, MAX_FEE_PER_BOOK - late_fee_for_days(day - 1)))
+    return steps
+
+
+FEE_STEPS = _fee_steps()
+CAP_DAY = FEE_STEPS[-1][0]
+
+
+def load_open_loans() -> OpenLoans:
+    """Load every open loan's due date and patron into compact arrays sorted by due date."""
+    rows = sorted((datetime.fromisoformat(due).timestamp(), patron_id)
+                  for patron_id, due in iter_open_loan_due_dates())
+    patron_ids, index_of = [], {}
+    due = array('d')
+    patron_index = array('l')
+    for timestamp, patron_id in rows:
+        if patron_id not in index_of:
+            index_of[patron_id] = len(patron_ids)
+            patron_ids.append(patron_id)
+        due.append(timestamp)
+        patron_index.append(index_of[patron_id])
+    return OpenLoans(due, patron_index, patron_ids)
+
+
+def _count_due_on_or_before(due: array, cutoffs: List[float]) -> List[int]:
+    if np is not None:
+        return np.searchsorted(np.frombuffer(due, dtype=np.float64), cutoffs, side='right').tolist()
+    return [bisect.bisect_right(due, cutoff) for cutoff in cutoffs]
+
+
+def _curve_point(due: array, as_of: float) -> Dict:
+    # A loan is at least k days overdue when due <= as_of - k days
+    cutoffs = [as_of - day * SECONDS_PER_DAY for day, _ in FEE_STEPS]
+    counts = _count_due_on_or_before(due, cutoffs)
+    total = sum(marginal * count for (_, marginal), count in zip(FEE_STEPS, counts))
+    return {
+        "total_fees": round(total, 2),
+        "overdue_loans": counts[0],
+        "capped_loans": counts[-1],
+    }
+
+
+def _per_loan_fees(due: array, as_of: float) -> Sequence[float]:
+    if np is not None:
+        days = np.floor((as_of - np.frombuffer(due, dtype=np.float64)) / SECONDS_PER_DAY)
+        fees = np.zeros(len(due))
+        for day, marginal in FEE_STEPS:
+            fees += marginal * (days >= day)
+        return fees
+    return [late_fee_for_days(int((as_of - d) // SECONDS_PER_DAY)) for d in due]
+
+
+def _per_patron_totals(loans: OpenLoans, as_of: float) -> Sequence[float]:
+    fees = _per_loan_fees(loans.due, as_of)
+    if np is not None:
+        return np.bincount(np.frombuffer(loans.patron_index, dtype=np.dtype(f'i{loans.patron_index.itemsize}')),
+                           weights=fees, minlength=len(loans.patron_ids)).tolist()
+    totals = [0.0] * len(loans.patron_ids)
+    for index, fee in zip(loans.patron_index, fees):
+        totals[index] += fee
+    return totals
+
+
+def forecast_late_fees(horizons: Sequence[int] = (30, 60, 90), step_days: int = 1, top_patrons: int = 20,
+                       clock: Callable[[], datetime] = datetime.now,
+                       loans: Optional[OpenLoans] = None) -> Dict:
+    """
+    Project late fees for all open loans, assuming none are returned.
+
+    Args:
+        horizons: Days ahead to report totals and per-patron exposure for
+        step_days: Spacing of the daily curve (up to the longest horizon)
+        top_patrons: Number of patrons with the highest exposure to list
+        clock: Returns "now" (injectable for tests and what-if runs)
+        loans: Preloaded open loans (default: load from the database)
+
+    Returns:
+        dict: {"as_of", "open_loans", "curve", "horizons", "patrons"}
+
+    Raises:
+        ValueError: If a horizon or the step is out of range
+    """
+    if not horizons or any(not 0 <= h <= 366 for h in horizons):
+        raise ValueError("Horizons must be between 0 and 366 days.")
+    if not 1 <= step_days <= 366:
+        raise ValueError("Step must be between 1 and 366 days.")
+
+    now = clock()
+    loans = loans if loans is not None else load_open_loans()
+    horizons = sorted(set(horizons))
+
+    curve = []
+    for days_ahead in range(0, horizons[-1] + 1, step_days):
+        as_of = now + timedelta(days=days_ahead)
+        point = _curve_point(loans.due, as_of.timestamp())
+        curve.append({"date": as_of.date().isoformat(), "days_ahead": days_ahead, **point})
+
+    horizon_totals = {}
+    patron_fees = {patron_id: {} for patron_id in loans.patron_ids}
+    for days_ahead in horizons:
+        as_of = (now + timedelta(days=days_ahead)).timestamp()
+        horizon_totals[str(days_ahead)] = _curve_point(loans.due, as_of)
+        for patron_id, total in zip(loans.patron_ids, _per_patron_totals(loans, as_of)):
+            patron_fees[patron_id][str(days_ahead)] = round(total, 2)
+
+    longest = str(horizons[-1])
+    ranked = sorted(
+        (p for p in patron_fees.items() if p[1][longest] > 0),
+        key=lambda p: (-p[1][longest], p[0])
+    )[:top_patrons]
+
+    return {
+        "as_of": now.isoformat(),
+        "open_loans": len(loans.due),
+        "curve": curve,
+        "horizons": horizon_totals,
+        "patrons": [{"patron_id": patron_id, "fees": fees} for patron_id, fees in ranked],
+    }
@@ -0,0 +1,273 @@
+"""
+Hold Service Module - Hold (reservation) queue for unavailable books
+Patrons queue for a book with no available copies; a returned copy goes to
+the oldest waiting hold, which then has HOLD_PICKUP_DAYS to borrow it.
+
+The database is the source of truth (the return handoff happens in the same
+transaction as the return). A per-book FIFO of waiting hold ids is cached in
+memory so queue positions and listings cost one version lookup instead of a
+queue read; each cached queue remembers the book's queue version, so a change
+made by another process is picked up on the next access. At most
+QUEUE_CACHE_SIZE queues are kept (least recently used go first), and books
+that never had a hold are not cached at all.
+
+Ready holds past their pickup deadline are expired by `flask holds expire`
+and, at most every EXPIRY_INTERVAL seconds, by the hold operations themselves,
+so a copy is passed on even when the command is not scheduled.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from database import (
+    current_database_path, get_book_by_id, get_active_hold, get_patron_holds as db_get_patron_holds,
+    get_waiting_holds, get_hold_queue_version, get_books_with_ready_holds, insert_hold, cancel_hold as db_cancel_hold,
+    expire_ready_holds as db_expire_ready_holds, get_patron_borrowed_books
+)
+
+# Days a patron has to borrow a copy reserved for them
+HOLD_PICKUP_DAYS = 3
+
+# Most book queues cached per process
+QUEUE_CACHE_SIZE = 4096
+
+# Seconds between expiry sweeps run by hold operations
+EXPIRY_INTERVAL = 60
+
+
+class _HoldQueue:
+    """A book's waiting holds in queue order, as of a queue version."""
+
+    def __init__(self, version: int, holds: List[Tuple[int, str]]):
+        self.version = version
+        self.entries: deque = deque()  # (hold_id, patron_id)
+        self.tickets: Dict[int, int] = {}  # hold_id -> place in line since the queue was loaded
+        self.head = 0  # ticket of entries[0]
+        for hold_id, patron_id in holds:
+            self.append(hold_id, patron_id)
+
+    def append(self, hold_id: int, patron_id: str):
+        self.tickets[hold_id] = self.head + len(self.entries)
+        self.entries.append((hold_id, patron_id))
+
+    def popleft(self) -> int:
+        hold_id, _ = self.entries.popleft()
+        del self.tickets[hold_id]
+        self.head += 1
+        return hold_id
+
+    def position(self, hold_id: int) -> Optional[int]:
+        """1-based position of a waiting hold, or None if it is not in the queue."""
+        ticket = self.tickets.get(hold_id)
+        return None if ticket is None else ticket - self.head + 1
+
+
+# (database path, book_id) -> cached queue, least recently used first
+_queue_cache: 'OrderedDict[Tuple[str, int], _HoldQueue]' = OrderedDict()
+_queue_cache_lock = threading.Lock()
+
+# database path -> time.monotonic() of the next expiry sweep
+_next_expiry: Dict[str, float] = {}
+_expiry_lock = threading.Lock()
+
+
+def _cached_queue(book_id: int) -> _HoldQueue:
+    key = (current_database_path(), book_id)
+    version = get_hold_queue_version(book_id)
+    if version == 0:
+        # No hold was ever placed on this book (or it does not exist)
+        return _HoldQueue(0, [])
+    with _queue_cache_lock:
+        queue = _queue_cache.get(key)
+        if queue is not None and queue.version == version:
+            _queue_cache.move_to_end(key)
+            return queue
+    queue = _HoldQueue(version, [(h['id'], h['patron_id']) for h in get_waiting_holds(book_id)])
+    if get_hold_queue_version(book_id) != version:
+        # Changed while loading; serve it once and reload on the next access
+        return queue
+    with _queue_cache_lock:
+        _queue_cache[key] = queue
+        _queue_cache.move_to_end(key)
+        while len(_queue_cache) > QUEUE_CACHE_SIZE:
+            _queue_cache.popitem(last=False)
+    return queue
+
+
+def _note_queue_change(book_id: int, update: Callable[[_HoldQueue], bool]):
+    """
+    Apply a change this process just made to a book's queue to the cached copy.
+    If anything else changed the queue too (or update returns False), the
+    cached copy is dropped and reloaded on next access.
+    """
+    key = (current_database_path(), book_id)
+    version = get_hold_queue_version(book_id)
+    with _queue_cache_lock:
+        queue = _queue_cache.get(key)
+        if queue is None:
+            return
+        if queue.version == version - 1 and update(queue):
+            queue.version = version
+        else:
+            del _queue_cache[key]
+
+
+def _invalidate_queue(book_id: int):
+    with _queue_cache_lock:
+        _queue_cache.pop((current_database_path(), book_id), None)
+
+
+def clear_queue_cache():
+    """Drop the cached queues of the current database (after it was replaced wholesale)."""
+    path = current_database_path()
+    with _queue_cache_lock:
+        for key in [key for key in _queue_cache if key[0] == path]:
+            del _queue_cache[key]
+    with _expiry_lock:
+        _next_expiry.pop(path, None)
+
+
+def _expire_overdue_holds():
+    """Run expire_ready_holds if the current database has not had a sweep in EXPIRY_INTERVAL seconds."""
+    path = current_database_path()
+    now = time.monotonic()
+    with _expiry_lock:
+        if _next_expiry.get(path, 0) > now:
+            return
+        _next_expiry[path] = now + EXPIRY_INTERVAL
+    expire_ready_holds()
+
+
+def note_handoff(book_id: int, handoff: Optional[Dict]):
+    """Update the cached queue after the head hold of a book became ready."""
+    if handoff is None:
+        return
+
+    def pop_head(queue: _HoldQueue) -> bool:
+        if not queue.entries or queue.entries[0][0] != handoff['hold_id']:
+            return False
+        queue.popleft()
+        return True
+
+    _note_queue_change(book_id, pop_head)
+
+
+def pickup_deadline(now: datetime) -> datetime:
+    """When a hold that becomes ready at `now` expires."""
+    return now + timedelta(days=HOLD_PICKUP_DAYS)
+
+
+def place_hold(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Place a hold on a book that has no available copies.
+
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the book to reserve
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    # An expired hold may have put a copy back on the shelf
+    _expire_overdue_holds()
+    book = get_book_by_id(book_id)
+    if not book:
+        return False, "Book not found."
+
+    if book['available_copies'] > 0:
+        return False, "This book is available. Borrow it instead of placing a hold."
+
+    if get_active_hold(patron_id, book_id):
+        return False, "You already have a hold on this book."
+
+    if any(b['book_id'] == book_id for b in get_patron_borrowed_books(patron_id)):
+        return False, "You are currently borrowing this book."
+
+    hold_id = insert_hold(patron_id, book_id, datetime.now())
+    if hold_id is None:
+        return False, "Database error occurred while placing the hold."
+
+    def join(queue: _HoldQueue) -> bool:
+        # The newest hold joins the back of the queue
+        queue.append(hold_id, patron_id)
+        return True
+
+    _note_queue_change(book_id, join)
+    position = _cached_queue(book_id).position(hold_id)
+
+    return True, f'Hold placed on "{book["title"]}". You are number {position} in the queue.'
+
+
+def cancel_hold(patron_id: str, book_id: int) -> Tuple[bool, str]:
+    """
+    Cancel a patron's hold. A reserved copy passes to the next patron in line.
+
+    Returns:
+        tuple: (success: bool, message: str)
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return False, "Invalid patron ID. Must be exactly 6 digits."
+
+    hold = get_active_hold(patron_id, book_id)
+    if not hold:
+        return False, "No active hold on this book."
+
+    now = datetime.now()
+    success, handoff = db_cancel_hold(hold['id'], now, pickup_deadline(now))
+    if not success:
+        return False, "Database error occurred while cancelling the hold."
+
+    if hold['status'] == 'waiting':
+        _invalidate_queue(book_id)
+    else:
+        note_handoff(book_id, handoff)
+    return True, "Hold cancelled."
+
+
+def get_hold_queue(book_id: int) -> List[Dict]:
+    """Get the waiting holds on a book in queue order (from the cache)."""
+    _expire_overdue_holds()
+    return [
+        {'position': i, 'hold_id': hold_id, 'patron_id': patron_id}
+        for i, (hold_id, patron_id) in enumerate(list(_cached_queue(book_id).entries), start=1)
+    ]
+
+
+def get_patron_holds(patron_id: str) -> List[Dict]:
+    """
+    Get a patron's active holds with their queue position (ready holds have position 0).
+
+    Returns:
+        list: Hold dicts with book title/author, status, position and expires_at
+    """
+    _expire_overdue_holds()
+    holds = db_get_patron_holds(patron_id)
+    for hold in holds:
+        hold['position'] = 0
+        if hold['status'] == 'waiting':
+            hold['position'] = _cached_queue(hold['book_id']).position(hold['id'])
+    return holds
+
+
+def books_awaiting_pickup(book_ids: Iterable[int]) -> Set[int]:
+    """Ids among book_ids with a copy reserved for a ready hold (which that hold's patron can borrow)."""
+    return get_books_with_ready_holds(list(book_ids))
+
+
+def expire_ready_holds(now: Optional[datetime] = None) -> int:
+    """
+    Expire ready holds past their pickup deadline and pass each copy on.
+
+    Returns:
+        int: Number of holds expired
+    """
+    now = now or datetime.now()
+    expired = db_expire_ready_holds(now, pickup_deadline(now))
+    for entry in expired:
+        note_handoff(entry['book_id'], entry['handoff'])
+    return len(expired)
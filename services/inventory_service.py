@@ -0,0 +1,70 @@
+"""
+Inventory Service Module - Reconciling available_copies with circulation
+A book should have total_copies minus its open loans minus copies held for
+pickup on the shelf. A failure between the separate borrow writes can leave
+available_copies out of step; reconcile_inventory finds such drift with one
+set-based query and can repair it in batched transactions.
+
+Incremental runs only check books named in circulation events since the
+previous incremental run (tracked as an event checkpoint).
+"""
+
+from typing import Dict
+from database import (
+    find_availability_drift, get_book_ids_in_events, get_event_checkpoint, get_latest_event_seq,
+    repair_book_availability, save_event_checkpoint
+)
+
+# Event checkpoint used by incremental runs
+CHECKPOINT_NAME = 'inventory_reconcile'
+
+# Books repaired per write transaction
+DEFAULT_REPAIR_BATCH_SIZE = 100
+
+
+def reconcile_inventory(repair: bool = False, incremental: bool = False,
+                        batch_size: int = DEFAULT_REPAIR_BATCH_SIZE) -> Dict:
+    """
+    Check (and optionally repair) available_copies for every book, or only recently touched ones.
+
+    Args:
+        repair: Reset drifted books to their expected availability
+        incremental: Only check books touched since the last incremental run
+                     (the first incremental run checks everything)
+        batch_size: Books repaired per transaction
+
+    Returns:
+        dict: {"mode", "checked", "drift": [...], "repaired": [...]}
+              "checked" is the number of books examined, or None for a full run
+
+    Raises:
+        ValueError: If batch_size is not positive
+    """
+    if batch_size < 1:
+        raise ValueError("Batch size must be positive.")
+
+    through = get_latest_event_seq()
+    book_ids = None
+    if incremental:
+        after = get_event_checkpoint(CHECKPOINT_NAME)
+        if after:
+            book_ids = get_book_ids_in_events(after, through)
+
+    drift = find_availability_drift(book_ids) if book_ids != [] else []
+
+    repaired = []
+    if repair:
+        ids = [d['book_id'] for d in drift]
+        for start in range(0, len(ids), batch_size):
+            repaired.extend(repair_book_availability(ids[start:start + batch_size]))
+
+    if incremental:
+        # Events after `through` (including our own repairs) are checked next time
+        save_event_checkpoint(CHECKPOINT_NAME, through)
+
+    return {
+        'mode': 'incremental' if book_ids is not None else 'full',
+        'checked': len(book_ids) if book_ids is not None else None,
+        'drift': drift,
+        'repaired': repaired,
+    }
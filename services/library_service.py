@@ -3,15 +3,27 @@ Library Service Module - Business Logic Functions
 Contains all the core business logic for the Library Management System
 """
 
-from datetime import datetime, timedelta
+import base64
+import json
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 from database import (
-    get_book_by_id, get_book_by_isbn, get_patron_borrow_count,
-    insert_book, insert_borrow_record, update_book_availability,
-    get_patron_borrowed_books, update_borrow_record_return_date, 
-    get_all_books
+    get_book_by_id, get_book_by_isbn, get_book_by_isbn13, get_patron_borrow_count,
+    insert_book, borrow_copy, get_patron_borrowed_books, complete_return,
+    get_all_books, get_books_page, get_patron_borrow_history, get_active_hold, record_fee_payment,
+    current_database_path, get_catalog_version, get_patron_loan_status, get_patron_last_write,
+    get_outstanding_late_fees, CATALOG_SORTS
 )
+from fees import FEE_PER_DAY_AFTER_FIRST_WEEK, FEE_PER_DAY_FIRST_WEEK, FIRST_WEEK_DAYS, MAX_FEE_PER_BOOK
+from isbn import format_isbn13, isbn13_key, parse_isbn
 from services.payment_service import PaymentGateway
+from services.fee_forecast import assess_late_fee
+from services.hold_service import note_handoff, pickup_deadline
+from services.search_cache import normalize_query, search_cache
+from services.status_cache import status_cache
+
+# R3: most books a patron may have out at once
+MAX_BORROWED_BOOKS = 5
 
 def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -> Tuple[bool, str]:
     """
@@ -21,7 +33,7 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     Args:
         title: Book title (max 200 chars)
         author: Book author (max 100 chars)
-        isbn: 13-digit ISBN
+        isbn: ISBN-13 or ISBN-10, hyphens allowed (stored as the canonical ISBN-13)
         total_copies: Number of copies (positive integer)
         
     Returns:
@@ -40,24 +52,95 @@ def add_book_to_catalog(title: str, author: str, isbn: str, total_copies: int) -
     if len(author.strip()) > 100:
         return False, "Author must be less than 100 characters."
     
-    if len(isbn) != 13:
-        return False, "ISBN must be exactly 13 digits."
+    if len(isbn.replace('-', '').replace(' ', '')) not in (10, 13):
+        return False, "ISBN must be exactly 13 digits (or an ISBN-10)."
     
     if not isinstance(total_copies, int) or total_copies <= 0:
         return False, "Total copies must be a positive integer."
     
-    # Check for duplicate ISBN
-    existing = get_book_by_isbn(isbn)
+    try:
+        isbn13 = parse_isbn(isbn)
+    except ValueError as e:
+        return False, str(e)
+    
+    # Check for duplicate ISBN (any spelling of the same ISBN-13)
+    existing = get_book_by_isbn13(isbn13)
     if existing:
         return False, "A book with this ISBN already exists."
     
     # Insert new book
-    success = insert_book(title.strip(), author.strip(), isbn, total_copies, total_copies)
+    success = insert_book(title.strip(), author.strip(), format_isbn13(isbn13), total_copies, total_copies)
     if success:
         return True, f'Book "{title.strip()}" has been successfully added to the catalog.'
     else:
         return False, "Database error occurred while adding the book."
 
+CATALOG_PAGE_SIZE = 50
+MAX_CATALOG_PAGE_SIZE = 200
+
+def browse_catalog(sort: str = "title", available_only: bool = False, author: Optional[str] = None,
+                   limit: int = CATALOG_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+    """
+    Get one page of the catalog, filtered and sorted in the database.
+    Supports R2: Book Catalog Display
+    
+    Args:
+        sort: "title" (A-Z), "availability" (most copies on the shelf first)
+              or "copies_out" (most copies borrowed first)
+        available_only: Only books with at least one available copy
+        author: Only books by this author (exact match)
+        limit: Page size (1-200)
+        cursor: next_cursor from the previous page, or None for the first page
+        
+    Returns:
+        dict: {"books", "next_cursor", "sort", "available_only", "author"} or {"error": message}
+    """
+    if sort not in CATALOG_SORTS:
+        return {"error": f"Sort must be one of: {', '.join(CATALOG_SORTS)}."}
+
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_CATALOG_PAGE_SIZE:
+        return {"error": f"Page size must be between 1 and {MAX_CATALOG_PAGE_SIZE}."}
+
+    author = author.strip() if author else None
+    after = None
+    if cursor:
+        after = _decode_catalog_cursor(cursor, sort)
+        if after is None:
+            return {"error": "Invalid cursor."}
+
+    # Fetch one extra row to know whether another page exists
+    books = get_books_page(sort, limit + 1, after, available_only, author)
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = _encode_catalog_cursor(books[-1], sort)
+
+    return {"books": books, "next_cursor": next_cursor, "sort": sort,
+            "available_only": available_only, "author": author}
+
+def _catalog_sort_key(book: Dict, sort: str):
+    if sort == "title":
+        return book["title"]
+    if sort == "availability":
+        return book["available_copies"]
+    return book["total_copies"] - book["available_copies"]
+
+def _encode_catalog_cursor(book: Dict, sort: str) -> str:
+    payload = json.dumps([sort, _catalog_sort_key(book, sort), book["id"]])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_catalog_cursor(cursor: str, sort: str) -> Optional[Tuple]:
+    try:
+        cursor_sort, key, book_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    # A cursor only continues the ordering it came from
+    key_type = str if sort == "title" else int
+    if cursor_sort != sort or type(key) is not key_type or type(book_id) is not int:
+        return None
+    return key, book_id
+
 def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     """
     Allow a patron to borrow a book.
@@ -79,28 +162,34 @@ def borrow_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not book:
         return False, "Book not found."
     
-    if book['available_copies'] <= 0:
-        return False, "This book is currently not available."
+    # A ready hold reserves a copy for this patron even when none are on the shelf
+    hold = get_active_hold(patron_id, book_id)
+    ready_hold = hold if hold and hold['status'] == 'ready' else None
+    
+    if book['available_copies'] <= 0 and not ready_hold:
+        return False, "This book is currently not available. You can place a hold to be next in line."
     
     # Check patron's current borrowed books count
     current_borrowed = get_patron_borrow_count(patron_id)
     
-    if current_borrowed > 5:
-        return False, "You have reached the maximum borrowing limit of 5 books."
+    if current_borrowed >= MAX_BORROWED_BOOKS:
+        return False, f"You have reached the maximum borrowing limit of {MAX_BORROWED_BOOKS} books."
     
     # Create borrow record
     borrow_date = datetime.now()
     due_date = borrow_date + timedelta(days=14)
     
-    # Insert borrow record and update availability
-    borrow_success = insert_borrow_record(patron_id, book_id, borrow_date, due_date)
-    if not borrow_success:
+    # The checks above are re-run inside the write, so a concurrent borrow cannot slip between them.
+    # A ready hold's copy was never returned to available_copies.
+    status = borrow_copy(patron_id, book_id, borrow_date, due_date, MAX_BORROWED_BOOKS,
+                         ready_hold['id'] if ready_hold else None)
+    if status == 'limit_reached':
+        return False, f"You have reached the maximum borrowing limit of {MAX_BORROWED_BOOKS} books."
+    if status == 'unavailable':
+        return False, "This book is currently not available. You can place a hold to be next in line."
+    if status != 'borrowed':
         return False, "Database error occurred while creating borrow record."
     
-    availability_success = update_book_availability(book_id, -1)
-    if not availability_success:
-        return False, "Database error occurred while updating book availability."
-    
     return True, f'Successfully borrowed "{book["title"]}". Due date: {due_date.strftime("%Y-%m-%d")}.'
 
 
@@ -125,107 +214,196 @@ def return_book_by_patron(patron_id: str, book_id: int) -> Tuple[bool, str]:
     if not borrowed_book:
         return False, "Book was not Borrowed by Patron"
 
-    #record return date
-    update_success = update_borrow_record_return_date(patron_id,book_id,datetime.now())
+    #record return date, assess the late fee and pass the copy to the next hold, or back to available copies
+    return_date = datetime.now()
+    update_success, handoff, fee = complete_return(patron_id, book_id, return_date, pickup_deadline(return_date))
+    if update_success is None:  # returned concurrently
+        return False, "Book was not Borrowed by Patron"
     if not update_success:
         return False, "Database error occurred while updating patron borrow record"
+    note_handoff(book_id, handoff)
     
-    #update number of available copies
-    if not update_book_availability(book_id, +1):
-        return False, "Database error occurred while updating book availability."
-    
-    #calculate and return/display any late fees owed
-    late_fees_owed = calculate_late_fee_for_book(patron_id,book_id)
-    fee, overdue_days = late_fees_owed["fee_amount"], late_fees_owed["days_overdue"]
-
-    if fee > 0:
+    #display any late fees owed (stored on the loan for pay_late_fees)
+    if fee["fee_amount"] > 0:
         return True, (
-            f'Successfully returned "{book["title"]}".'
-            f'Overdue by {overdue_days} day(s). Late fee: ${fee:.2f}.'
+            f'Successfully returned "{book["title"]}". '
+            f'Overdue by {fee["days_overdue"]} day(s). Late fee: ${fee["fee_amount"]:.2f}.'
         )
     else:
         return True, f'Successfully returned "{book["title"]}". No late fees owed.'
-    
 
 
 
-def calculate_late_fee_for_book(patron_id: str, book_id: int) -> Dict:
+def calculate_late_fee_for_book(patron_id: str, book_id: int, clock=datetime.now) -> Dict:
+    """
+    Calculate the late fee owed on a patron's open loan of a book.
+    Implements R5: Late Fee Calculation
     
+    Args:
+        patron_id: 6-digit library card ID
+        book_id: ID of the borrowed book
+        clock: Returns the current time (injectable for testing and forecasts)
+        
+    Returns:
+        dict: {"fee_amount": float, "days_overdue": int}
+    """
     borrowed_book = get_patron_borrowed_books(patron_id)
     record = next((b for b in borrowed_book if b["book_id"] == book_id), None)
     if not record:
         return {"fee_amount": 0.00, "days_overdue": 0}
 
-    now = datetime.now()
-    due_date = record["due_date"]
-    days_overdue = (now - due_date).days
+    return assess_late_fee(record["due_date"], clock)
 
-    if days_overdue <= 0:
-        return {"fee_amount": 0.00, "days_overdue": 0}
-
-    if days_overdue <= 7:
-        fee = days_overdue * 0.5
-    else:
-        fee = 7 * 0.5 + (days_overdue - 7) * 1.0
-
-    fee = min(fee, 15.0)
-
-    return {"fee_amount": round(fee, 2), "days_overdue": days_overdue}
-
-    
 
 def search_books_in_catalog(search_term: str, search_type: str) -> List[Dict]:
 
     if not search_term or not search_term.strip():
         return []
 
-    search_term = search_term.strip().lower()
-    results = []
+    search_term, search_type = normalize_query(search_term, search_type)
+    isbn13 = isbn13_key(search_term) if search_type == "isbn" else None
+    if isbn13 is not None:
+        search_term = format_isbn13(isbn13)  # every spelling of an ISBN shares one cache entry
 
-    if search_type.lower() == "isbn":
-        book = get_book_by_isbn(search_term)
-        return [book] if book else []
+    # Read the version first: results computed after a concurrent change are stored under the older version
+    cache_key = (current_database_path(), search_term, search_type)
+    version = get_catalog_version()
+    cached = search_cache.get(cache_key, version)
+    if cached is not None:
+        return cached
 
-    books = get_all_books()
+    results = []
+
+    if search_type == "isbn":
+        # Valid ISBNs use the integer key; anything else can only match a legacy row exactly
+        book = get_book_by_isbn13(isbn13) if isbn13 is not None else get_book_by_isbn(search_term)
+        results = [book] if book else []
+    else:
+        books = get_all_books()
 
-    if search_type.lower() == "title":
-        results = [b for b in books if search_term in b["title"].lower()]
-    elif search_type.lower() == "author":
-        results = [b for b in books if search_term in b["author"].lower()]
+        if search_type == "title":
+            results = [b for b in books if search_term in b["title"].lower()]
+        elif search_type == "author":
+            results = [b for b in books if search_term in b["author"].lower()]
 
+    search_cache.put(cache_key, version, results)
     return results
 
-def get_patron_status_report(patron_id: str) -> Dict:
+def get_patron_status_report(patron_id: str, clock=datetime.now) -> Dict:
     """
     Get status report for a patron.
+    Implements R7: Patron Status Report
+    
+    Open loans, counts and late fees come from one aggregate query. Reports are
+    cached briefly and invalidated by the patron's next borrow, return or payment.
     
-    TODO: Implement R7 as per requirements
+    Args:
+        patron_id: 6-digit library card ID
+        clock: Returns the current time (injectable for testing)
+        
+    Returns:
+        dict: {"patron_id", "borrowed_books", "total_borrowed", "total_late_fees" (accruing on open loans),
+               "currently_overdue", "outstanding_fees" (assessed on returns, unpaid),
+               "borrowing_history", "history_next_cursor"}
+              or {"error": message}
     """
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return {"error": "Invalid patron ID. Must be exactly 6 digits."}
 
-    borrowed_books = get_patron_borrowed_books(patron_id)
-    total_borrowed = len(borrowed_books)
+    # Read the last write first: a report computed after a concurrent write is stored under the older one
+    cache_key = (current_database_path(), patron_id)
+    last_write = get_patron_last_write(patron_id)
+    cached = status_cache.get(cache_key, last_write)
+    if cached is not None:
+        return cached
 
-    #total late fees
-    total_late_fees = 0.0
-    for b in borrowed_books:
-        if b["is_overdue"]:
-            fee_info = calculate_late_fee_for_book(patron_id, b["book_id"])
-            total_late_fees += fee_info["fee_amount"]
+    status = get_patron_loan_status(patron_id, clock(), FIRST_WEEK_DAYS, FEE_PER_DAY_FIRST_WEEK,
+                                    FEE_PER_DAY_AFTER_FIRST_WEEK, MAX_FEE_PER_BOOK)
+
+    #most recent page of borrowing history
+    history = get_patron_borrowing_history(patron_id)
 
     #patron status report
     report = {
         "patron_id": patron_id,
-        "borrowed_books": borrowed_books,  
-        "total_borrowed": total_borrowed,
-        "total_late_fees": round(total_late_fees, 2),
-        "currently_overdue": len([b for b in borrowed_books if b["is_overdue"]]),
+        "borrowed_books": status["loans"],
+        "total_borrowed": status["total_borrowed"],
+        "total_late_fees": status["total_late_fees"],
+        "currently_overdue": status["currently_overdue"],
+        "outstanding_fees": get_outstanding_late_fees(patron_id),
+        "borrowing_history": history["records"],
+        "history_next_cursor": history["next_cursor"],
     }
 
+    status_cache.put(cache_key, last_write, report)
     return report
 
 
+HISTORY_PAGE_SIZE = 20
+MAX_HISTORY_PAGE_SIZE = 100
+HISTORY_STATUSES = ("all", "open", "returned")
+
+def get_patron_borrowing_history(patron_id: str, limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None,
+                                 start_date: Optional[date] = None, end_date: Optional[date] = None,
+                                 status: str = "all") -> Dict:
+    """
+    Get one page of a patron's borrowing history, newest first.
+    Supports R7: Patron Status Report (borrowing history)
+    
+    Args:
+        patron_id: 6-digit library card ID
+        limit: Page size (1-100)
+        cursor: next_cursor from the previous page, or None for the first page
+        start_date: Only loans borrowed on or after this date
+        end_date: Only loans borrowed on or before this date
+        status: "all", "open" or "returned"
+        
+    Returns:
+        dict: {"patron_id", "records", "next_cursor"} or {"error": message}
+    """
+    if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
+        return {"error": "Invalid patron ID. Must be exactly 6 digits."}
+
+    if not isinstance(limit, int) or not 1 <= limit <= MAX_HISTORY_PAGE_SIZE:
+        return {"error": f"Page size must be between 1 and {MAX_HISTORY_PAGE_SIZE}."}
+
+    if status not in HISTORY_STATUSES:
+        return {"error": "Status must be one of: all, open, returned."}
+
+    before = None
+    if cursor:
+        before = _decode_history_cursor(cursor)
+        if before is None:
+            return {"error": "Invalid cursor."}
+
+    # Fetch one extra row to know whether another page exists
+    records = get_patron_borrow_history(
+        patron_id, limit + 1, before,
+        start_date.isoformat() if start_date else None,
+        (end_date + timedelta(days=1)).isoformat() if end_date else None,
+        status
+    )
+
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        last = records[-1]
+        next_cursor = _encode_history_cursor(last["borrow_date"].isoformat(), last["record_id"])
+
+    return {"patron_id": patron_id, "records": records, "next_cursor": next_cursor}
+
+def _encode_history_cursor(borrow_date: str, record_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{borrow_date}|{record_id}".encode()).decode()
+
+def _decode_history_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    try:
+        borrow_date, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        datetime.fromisoformat(borrow_date)
+        return borrow_date, int(record_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
 def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway = None) -> Tuple[bool, str, Optional[str]]:
     """
     Process payment for late fees using external payment gateway.
@@ -251,14 +429,8 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
     if not patron_id or not patron_id.isdigit() or len(patron_id) != 6:
         return False, "Invalid patron ID. Must be exactly 6 digits.", None
     
-    # Calculate late fee first
-    fee_info = calculate_late_fee_for_book(patron_id, book_id)
-    
-    # Check if there's a fee to pay
-    if not fee_info or 'fee_amount' not in fee_info:
-        return False, "Unable to calculate late fees.", None
-    
-    fee_amount = fee_info.get('fee_amount', 0.0)
+    # Fees are assessed and stored when a book is returned
+    fee_amount = get_outstanding_late_fees(patron_id, book_id)
     
     if fee_amount <= 0:
         return False, "No late fees to pay for this book.", None
@@ -282,6 +454,8 @@ def pay_late_fees(patron_id: str, book_id: int, payment_gateway: PaymentGateway
         )
         
         if success:
+            # The gateway has charged the patron; keep the record even if logging it fails
+            record_fee_payment(patron_id, book_id, fee_amount, transaction_id, datetime.now())
             return True, f"Payment successful! {message}", transaction_id
         else:
             return False, f"Payment failed: {message}", None
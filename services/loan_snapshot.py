@@ -0,0 +1,275 @@
+"""
+Loan Snapshot Module - Compact columnar copy of every loan for analytics scans
+Each column is a fixed-width binary file of native machine values, one value
+per loan in record id order:
+
+    record_id  int64   borrow_records id
+    book_id    int32
+    patron_id  int32   (-1 if the card number is not numeric)
+    borrow_ts  int64   Unix seconds
+    due_ts     int64   Unix seconds
+    return_ts  int64   Unix seconds, 0 while the loan is open
+    fee_cents  int32   late fee assessed at return
+
+meta.json (written last) records how many rows are valid, the last exported
+record id and the last circulation event applied. Rebuilds are incremental:
+loans with a higher id are appended, and returns logged since the last run
+patch return_ts and fee_cents (the fee assessed at return, carried by the
+return event, or the loan's stored fee for events logged before that) of rows
+already in the file.
+
+LoanSnapshot memory-maps the files and exposes each column as a memoryview
+(or a NumPy array when NumPy is installed) over the mapping, so a scan over
+millions of loans allocates no per-row Python objects.
+"""
+
+import bisect
+import json
+import mmap
+import os
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from database import get_events_after, get_latest_event_seq, get_loan_late_fees, iter_loans_after
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+DEFAULT_SNAPSHOT_DIR = 'snapshots/loans'
+# 2: return events carry the assessed fee (older snapshots are rebuilt in full)
+FORMAT_VERSION = 2
+
+# Column name -> array typecode (the files are fixed width; itemsizes are checked below)
+COLUMNS = {
+    'record_id': 'q',
+    'book_id': 'i',
+    'patron_id': 'i',
+    'borrow_ts': 'q',
+    'due_ts': 'q',
+    'return_ts': 'q',
+    'fee_cents': 'i',
+}
+ITEMSIZES = {'q': 8, 'i': 4}
+if any(array(code).itemsize != size for code, size in ITEMSIZES.items()):
+    raise RuntimeError("Loan snapshots need 8-byte 'q' and 4-byte 'i' arrays on this platform.")
+
+# Loans appended (and return events read) per batch
+BATCH_SIZE = 5000
+
+META_FILE = 'meta.json'
+
+
+def _column_path(snapshot_dir: str, name: str) -> str:
+    return os.path.join(snapshot_dir, f'{name}.col')
+
+
+def _timestamp(value: Optional[str]) -> int:
+    return int(datetime.fromisoformat(value).timestamp()) if value else 0
+
+
+def _patron_number(patron_id: str) -> int:
+    return int(patron_id) if patron_id.isdigit() else -1
+
+
+def read_meta(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> Optional[Dict]:
+    """Get a snapshot's metadata, or None if there is no usable snapshot in snapshot_dir."""
+    try:
+        with open(os.path.join(snapshot_dir, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != FORMAT_VERSION or meta.get('columns') != COLUMNS \
+            or meta.get('byteorder') != sys.byteorder:
+        return None
+    return meta
+
+
+def reset_loan_snapshot(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR) -> bool:
+    """
+    Discard the snapshot in snapshot_dir so the next build is a full one
+    (needed when the database is replaced, as record ids and event seqs may be reused).
+
+    Returns:
+        bool: Whether there was a snapshot to discard
+    """
+    try:
+        os.remove(os.path.join(snapshot_dir, META_FILE))
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _write_meta(snapshot_dir: str, meta: Dict):
+    path = os.path.join(snapshot_dir, META_FILE)
+    with open(path + '.partial', 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(path + '.partial', path)
+
+
+def _append_rows(snapshot_dir: str, rows: Iterable[tuple]) -> List[int]:
+    """Append loans to the column files. Returns the record ids appended."""
+    files = {name: open(_column_path(snapshot_dir, name), 'ab') for name in COLUMNS}
+    record_ids = []
+    try:
+        batch = {name: array(code) for name, code in COLUMNS.items()}
+        for record_id, book_id, patron_id, borrow_date, due_date, return_date, late_fee in rows:
+            batch['record_id'].append(record_id)
+            batch['book_id'].append(book_id)
+            batch['patron_id'].append(_patron_number(patron_id))
+            batch['borrow_ts'].append(_timestamp(borrow_date))
+            batch['due_ts'].append(_timestamp(due_date))
+            batch['return_ts'].append(_timestamp(return_date))
+            batch['fee_cents'].append(round((late_fee or 0) * 100))
+            record_ids.append(record_id)
+            if len(batch['record_id']) == BATCH_SIZE:
+                for name, values in batch.items():
+                    files[name].write(values.tobytes())
+                    del values[:]
+        for name, values in batch.items():
+            files[name].write(values.tobytes())
+    finally:
+        for f in files.values():
+            f.close()
+    return record_ids
+
+
+def _apply_returns(snapshot_dir: str, rows: int, after_seq: int, up_to_seq: int) -> int:
+    """Patch return_ts and fee_cents of exported loans returned in (after_seq, up_to_seq]. Returns rows patched."""
+    if rows == 0:
+        return 0
+    patched = 0
+    with open(_column_path(snapshot_dir, 'record_id'), 'rb') as f, \
+            mmap.mmap(f.fileno(), rows * ITEMSIZES['q'], access=mmap.ACCESS_READ) as ids_map, \
+            open(_column_path(snapshot_dir, 'return_ts'), 'r+b') as return_file, \
+            open(_column_path(snapshot_dir, 'fee_cents'), 'r+b') as fee_file:
+        record_ids = memoryview(ids_map).cast('q')
+        try:
+            seq = after_seq
+            while seq < up_to_seq:
+                events = get_events_after(seq, BATCH_SIZE, ['return'])
+                returns = []
+                for event in events:
+                    if event['seq'] > up_to_seq:
+                        break
+                    record_id = event['payload'].get('record_id')
+                    index = bisect.bisect_left(record_ids, record_id) if record_id is not None else rows
+                    if index < rows and record_ids[index] == record_id:
+                        returns.append((index, record_id, event))
+                # Return events logged before they carried the fee: use the fee stored on the loan
+                stored_fees = get_loan_late_fees(
+                    [record_id for _, record_id, event in returns if event['payload'].get('late_fee') is None])
+                for index, record_id, event in returns:
+                    fee = event['payload'].get('late_fee')
+                    if fee is None:
+                        fee = stored_fees.get(record_id) or 0
+                    return_file.seek(index * ITEMSIZES['q'])
+                    return_file.write(array('q', [_timestamp(event['occurred_at'])]).tobytes())
+                    fee_file.seek(index * ITEMSIZES['i'])
+                    fee_file.write(array('i', [round(fee * 100)]).tobytes())
+                    patched += 1
+                if len(events) < BATCH_SIZE:
+                    break
+                seq = events[-1]['seq']
+        finally:
+            record_ids.release()
+    return patched
+
+
+def build_loan_snapshot(snapshot_dir: str = DEFAULT_SNAPSHOT_DIR, full: bool = False) -> Dict:
+    """
+    Bring the snapshot in snapshot_dir up to date with the database.
+
+    Args:
+        snapshot_dir: Where the column files and meta.json live (created if missing)
+        full: Rebuild from scratch instead of appending to the existing snapshot
+
+    Returns:
+        dict: {"rows", "appended", "patched", "last_record_id", "last_event_seq", "full"}
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    meta = None if full else read_meta(snapshot_dir)
+    full = meta is None
+    if full:
+        meta = {'rows': 0, 'last_record_id': 0, 'last_event_seq': 0}
+
+    # Drop anything appended after the last completed build
+    for name, code in COLUMNS.items():
+        with open(_column_path(snapshot_dir, name), 'ab') as f:
+            f.truncate(meta['rows'] * ITEMSIZES[code])
+
+    # Read the event high-water mark first: a return logged after it is applied by the next build
+    latest_seq = get_latest_event_seq()
+    appended = _append_rows(snapshot_dir, iter_loans_after(meta['last_record_id'], BATCH_SIZE))
+    rows = meta['rows'] + len(appended)
+    patched = 0 if full else _apply_returns(snapshot_dir, rows, meta['last_event_seq'], latest_seq)
+
+    meta = {
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'columns': COLUMNS,
+        'rows': rows,
+        'last_record_id': appended[-1] if appended else meta['last_record_id'],
+        'last_event_seq': latest_seq,
+        'built_at': datetime.now().isoformat(),
+    }
+    _write_meta(snapshot_dir, meta)
+    return {'rows': rows, 'appended': len(appended), 'patched': patched,
+            'last_record_id': meta['last_record_id'], 'last_event_seq': latest_seq, 'full': full}
+
+
+class LoanSnapshot:
+    """
+    Read-only, memory-mapped view of a loan snapshot.
+
+    Columns are available as snapshot['book_id'] (or snapshot.column('book_id')):
+    a NumPy array when NumPy is installed, otherwise a memoryview. Both share
+    the mapping, so release them (or let the snapshot close) before closing.
+    """
+
+    def __init__(self, snapshot_dir: str = DEFAULT_SNAPSHOT_DIR):
+        meta = read_meta(snapshot_dir)
+        if meta is None:
+            raise FileNotFoundError(f"No loan snapshot in {snapshot_dir}.")
+        self.meta = meta
+        self.rows = meta['rows']
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._views: Dict[str, memoryview] = {}
+        for name, code in COLUMNS.items():
+            size = self.rows * ITEMSIZES[code]
+            if size == 0:
+                self._views[name] = memoryview(array(code))
+                continue
+            with open(_column_path(snapshot_dir, name), 'rb') as f:
+                self._maps[name] = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            self._views[name] = memoryview(self._maps[name]).cast(code)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name: str):
+        return self.column(name)
+
+    def column(self, name: str, use_numpy: bool = True):
+        """Get a column without copying: a NumPy array if available (and use_numpy), else a memoryview."""
+        view = self._views[name]
+        if use_numpy and np is not None:
+            return np.frombuffer(view, dtype=np.dtype(COLUMNS[name]))
+        return view
+
+    def close(self):
+        for view in self._views.values():
+            view.release()
+        for mapped in self._maps.values():
+            mapped.close()
+        self._views.clear()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,97 @@
+"""
+Notification Service Module - Due-soon and overdue notice batches
+Finds open loans that are overdue or due within a few days by walking the
+open-loan due date index in chunks, and queues one outbox message per patron
+per batch. Each loan is noticed at most once per kind and due date, so
+reruns (or overlapping runs) never notify a patron twice for the same window.
+
+A mailer drains the outbox; flush_outbox writes pending messages to a JSONL
+file for one that reads files.
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from database import get_notifiable_loans, get_pending_notifications, mark_notifications_sent, queue_notifications
+
+# Loans due within this many days get a due-soon notice
+DUE_SOON_DAYS = 3
+
+# Loans read and queued per write transaction
+DEFAULT_CHUNK_SIZE = 500
+
+
+def generate_notifications(due_within_days: int = DUE_SOON_DAYS, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                           clock: Callable[[], datetime] = datetime.now, batch_id: Optional[str] = None) -> Dict:
+    """
+    Queue overdue and due-soon notices for every open loan that has not had one for its due date.
+
+    Args:
+        due_within_days: Loans due between now and this many days ahead get a due-soon notice
+        chunk_size: Loans read and queued per transaction
+        clock: Returns "now" (injectable for tests)
+        batch_id: Outbox batch to add to (default: derived from now)
+
+    Returns:
+        dict: {"batch_id", "overdue", "due_soon"} with the number of loans queued per kind
+
+    Raises:
+        ValueError: If the window or the chunk size is out of range
+    """
+    if not 0 <= due_within_days <= 60:
+        raise ValueError("Due-soon window must be between 0 and 60 days.")
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be positive.")
+
+    now = clock()
+    batch_id = batch_id or now.strftime('%Y%m%d-%H%M%S')
+    windows = {
+        'overdue': ('', now.isoformat()),
+        'due_soon': (now.isoformat(), (now + timedelta(days=due_within_days)).isoformat()),
+    }
+
+    queued = {}
+    for kind, (start, end) in windows.items():
+        queued[kind] = 0
+        after = (start, 0)
+        while True:
+            loans = get_notifiable_loans(kind, after, end, chunk_size)
+            if not loans:
+                break
+            queued[kind] += queue_notifications(batch_id, kind, loans, now)
+            after = (loans[-1]['due_date'], loans[-1]['record_id'])
+            if len(loans) < chunk_size:
+                break
+
+    return {'batch_id': batch_id, **queued}
+
+
+def flush_outbox(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 clock: Callable[[], datetime] = datetime.now) -> int:
+    """
+    Append every unsent outbox message to a JSONL file and mark it sent, a chunk at a time.
+
+    Returns:
+        int: Number of messages written
+    """
+    written = 0
+    after_id = 0
+    with open(path, 'a', encoding='utf-8') as out:
+        while True:
+            messages = get_pending_notifications(after_id, chunk_size)
+            if not messages:
+                break
+            for message in messages:
+                out.write(json.dumps({
+                    'id': message['id'],
+                    'batch_id': message['batch_id'],
+                    'patron_id': message['patron_id'],
+                    'created_at': message['created_at'],
+                    **message['payload'],
+                }) + '\n')
+            out.flush()
+            if not mark_notifications_sent([m['id'] for m in messages], clock()):
+                raise RuntimeError("Failed to mark notifications sent.")
+            written += len(messages)
+            after_id = messages[-1]['id']
+    return written
@@ -0,0 +1,112 @@
+"""
+Profile Service Module - On-disk ring buffer of request profiles
+Each capture is a pstats dump (<id>.prof), a text summary (<id>.txt) and its
+metadata (<id>.json, written last so a listed capture is always complete).
+Only the newest `keep` captures are kept.
+"""
+
+import contextlib
+import io
+import json
+import os
+import pstats
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_KEEP = 50
+
+# Functions listed in a capture's text summary
+SUMMARY_LINES = 40
+
+CAPTURE_ID = re.compile(r'^\d{8}-\d{6}-\d{6}-[A-Za-z0-9_.]+$')
+CAPTURE_FILE = re.compile(r'^(?P<id>\d{8}-\d{6}-\d{6}-[A-Za-z0-9_.]+)\.(?P<kind>prof|txt)$')
+
+
+def _write(path: str, data: bytes):
+    with open(path + '.partial', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.partial', path)
+
+
+def save_capture(profile, meta: Dict, profile_dir: str = DEFAULT_PROFILE_DIR, keep: int = DEFAULT_KEEP,
+                 now: Optional[datetime] = None) -> str:
+    """
+    Store a finished cProfile.Profile with its request metadata and apply the retention limit.
+
+    Args:
+        profile: Disabled cProfile.Profile
+        meta: Request details ("method", "path", "endpoint", "status", "duration_ms", ...)
+
+    Returns:
+        str: The capture id
+    """
+    now = now or datetime.now()
+    endpoint = re.sub(r'[^A-Za-z0-9_.]', '_', meta.get('endpoint') or 'unmatched')
+    capture_id = f"{now:%Y%m%d-%H%M%S-%f}-{endpoint}"
+    base = os.path.join(profile_dir, capture_id)
+    os.makedirs(profile_dir, exist_ok=True)
+
+    profile.dump_stats(base + '.prof.partial')
+    os.replace(base + '.prof.partial', base + '.prof')
+
+    summary = io.StringIO()
+    summary.write(f"{meta.get('method')} {meta.get('path')} -> {meta.get('status')} "
+                  f"in {meta.get('duration_ms')} ms ({now.isoformat()})\n\n")
+    pstats.Stats(profile, stream=summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+    _write(base + '.txt', summary.getvalue().encode())
+
+    _write(base + '.json', json.dumps({'id': capture_id, 'captured_at': now.isoformat(), **meta}).encode())
+    prune_captures(profile_dir, keep)
+    return capture_id
+
+
+def list_captures(profile_dir: str = DEFAULT_PROFILE_DIR) -> List[Dict]:
+    """
+    List stored captures, newest first.
+
+    Returns:
+        list: Capture metadata dicts ({"id", "captured_at", "method", "path", "status", "duration_ms", ...})
+    """
+    if not os.path.isdir(profile_dir):
+        return []
+    captures = []
+    for name in os.listdir(profile_dir):
+        capture_id, ext = os.path.splitext(name)
+        if ext != '.json' or not CAPTURE_ID.match(capture_id):
+            continue
+        with contextlib.suppress(OSError, ValueError):  # pruned by another thread meanwhile
+            with open(os.path.join(profile_dir, name), encoding='utf-8') as f:
+                captures.append(json.load(f))
+    captures.sort(key=lambda c: c['id'], reverse=True)
+    return captures
+
+
+def prune_captures(profile_dir: str = DEFAULT_PROFILE_DIR, keep: int = DEFAULT_KEEP) -> List[str]:
+    """Delete all but the newest `keep` captures. Returns the deleted ids."""
+    if keep < 1:
+        raise ValueError("keep must be at least 1.")
+    removed = []
+    for capture in list_captures(profile_dir)[keep:]:
+        # Metadata first: a capture without it is no longer listed
+        for ext in ('.json', '.prof', '.txt'):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(profile_dir, capture['id'] + ext))
+        removed.append(capture['id'])
+    return removed
+
+
+def resolve_capture(filename: str, profile_dir: str = DEFAULT_PROFILE_DIR) -> str:
+    """
+    Turn a capture file name (<id>.prof or <id>.txt) into a path.
+
+    Raises:
+        ValueError: If the name is malformed or the capture does not exist
+    """
+    if not CAPTURE_FILE.match(filename):
+        raise ValueError(f"Capture not found: {filename}.")
+    path = os.path.join(profile_dir, filename)
+    if not os.path.isfile(path):
+        raise ValueError(f"Capture not found: {filename}.")
+    return path
@@ -0,0 +1,94 @@
+"""
+Search Cache Module - Bounded LRU cache of catalog search results
+Keyed by database file and the normalized (search_term, search_type). Each
+entry remembers the catalog version it was computed at; the version is bumped
+by triggers on every change to the books table (new books, availability), so
+a stale entry is never served. Memory is bounded by the total (approximate,
+JSON-encoded) size of the cached results, and results larger than
+MAX_ENTRY_BYTES are not cached at all.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+from json_provider import dumps_bytes
+
+MAX_ENTRIES = 1024
+MAX_BYTES = 8 * 1024 * 1024
+MAX_ENTRY_BYTES = 256 * 1024
+
+
+def normalize_query(search_term: str, search_type: str) -> Tuple[str, str]:
+    """Normalize a search the same way search_books_in_catalog matches it."""
+    return search_term.strip().lower(), search_type.strip().lower()
+
+
+class SearchCache:
+    """Thread-safe LRU of search results with a total size budget."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES,
+                 max_entry_bytes: int = MAX_ENTRY_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (version, results, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, version: int) -> Optional[List[Dict]]:
+        """Get a copy of the cached results for key at this catalog version, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != version:
+                self._remove(key)
+                metrics.increment('search_cache.invalidations')
+                entry = None
+            if entry is None:
+                metrics.increment('search_cache.misses')
+                return None
+            self._entries.move_to_end(key)
+        metrics.increment('search_cache.hits')
+        return [dict(book) for book in entry[1]]
+
+    def put(self, key: Tuple, version: int, results: List[Dict]) -> bool:
+        """Cache results computed at a catalog version. Returns False if they are too large."""
+        size = len(dumps_bytes(results))
+        if size > self.max_entry_bytes:
+            metrics.increment('search_cache.oversize')
+            return False
+        results = [dict(book) for book in results]
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (version, results, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                metrics.increment('search_cache.evictions')
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Current size plus hit rate over the process lifetime."""
+        counters = metrics.snapshot()['counters']
+        hits = counters.get('search_cache.hits', 0)
+        lookups = hits + counters.get('search_cache.misses', 0)
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[2]
+
+
+search_cache = SearchCache()
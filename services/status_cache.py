@@ -0,0 +1,63 @@
+"""
+Status Cache Module - Short-lived LRU cache of patron status reports
+Keyed by database file and patron ID. Each entry remembers the patron's last
+write (the sequence number of their latest circulation event) it was computed
+at, so a borrow, return or fee payment invalidates it immediately. Entries
+also expire after a few seconds because fees and overdue flags change with
+the clock, not only with writes.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import metrics
+
+MAX_ENTRIES = 4096
+TTL_SECONDS = 30.0
+
+
+class StatusCache:
+    """Thread-safe LRU of patron status reports, versioned by last write and bounded in age."""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES, ttl: float = TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: OrderedDict = OrderedDict()  # key -> (last_write, expires_at, report)
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, last_write: int) -> Optional[Dict]:
+        """Get a copy of the cached report for key at this last write, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != last_write or entry[1] <= self.clock()):
+                del self._entries[key]
+                metrics.increment('status_cache.invalidations')
+                entry = None
+            if entry is None:
+                metrics.increment('status_cache.misses')
+                return None
+            self._entries.move_to_end(key)
+        metrics.increment('status_cache.hits')
+        return copy.deepcopy(entry[2])
+
+    def put(self, key: Tuple, last_write: int, report: Dict):
+        """Cache a report computed at the patron's last write."""
+        report = copy.deepcopy(report)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (last_write, self.clock() + self.ttl, report)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                metrics.increment('status_cache.evictions')
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+status_cache = StatusCache()
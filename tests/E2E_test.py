@@ -2,13 +2,15 @@ import pytest
 import time
 from flask import url_for
 from playwright.sync_api import Page, expect
+from isbn import isbn13_check_digit
 
 
 URL = "http://localhost:5000"
 
 @pytest.fixture(scope="session")
 def new_isbn():
- return str(int(time.time()))[:13].ljust(13,"0")
+ first12 = str(int(time.time()))[:12].ljust(12,"0")
+ return first12 + str(isbn13_check_digit(first12))
 
 def test_add_new_book_and_verify_book_in_catalog(page: Page, new_isbn):
 
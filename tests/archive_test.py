@@ -0,0 +1,78 @@
+import pytest
+import sqlite3
+from datetime import datetime, timedelta
+
+import database
+from services.archive_service import archive_closed_loans
+from services.export_service import iter_csv_chunks
+from services.library_service import get_patron_borrowing_history
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+@pytest.fixture
+def seed():
+    """Patron 222222 has three loans returned two years ago, one returned last month and one open"""
+    def seed_database():
+        for book_id, borrowed, returned in [(1, NOW - timedelta(days=760), NOW - timedelta(days=750)),
+                                            (2, NOW - timedelta(days=740), NOW - timedelta(days=735)),
+                                            (1, NOW - timedelta(days=720), NOW - timedelta(days=715)),
+                                            (2, NOW - timedelta(days=40), NOW - timedelta(days=30))]:
+            database.insert_borrow_record("222222", book_id, borrowed, borrowed + timedelta(days=14))
+            database.update_borrow_record_return_date("222222", book_id, returned)
+        database.insert_borrow_record("222222", 1, NOW - timedelta(days=2), NOW + timedelta(days=12))
+    return seed_database
+
+
+def count(table):
+    conn = sqlite3.connect(database.DATABASE)
+    rows = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE patron_id = '222222'").fetchone()[0]
+    conn.close()
+    return rows
+
+
+def test_old_returns_move_in_batches(app):
+    result = archive_closed_loans(365, batch_size=2, clock=lambda: NOW)
+
+    assert (result["archived"], result["batches"]) == (3, 2)
+    assert (count("borrow_records"), count("borrow_history")) == (2, 3)
+    assert archive_closed_loans(365, clock=lambda: NOW)["archived"] == 0
+
+
+def test_max_batches_stops_early(app):
+    assert archive_closed_loans(365, batch_size=1, max_batches=2, clock=lambda: NOW)["archived"] == 2
+    assert count("borrow_history") == 2
+
+
+def test_history_spans_both_tables(app):
+    before = get_patron_borrowing_history("222222", limit=100)["records"]
+    archive_closed_loans(365, clock=lambda: NOW)
+
+    seen, cursor = [], None
+    while True:
+        page = get_patron_borrowing_history("222222", limit=2, cursor=cursor)
+        seen.extend(page["records"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert seen == before and len(seen) == 5
+    assert len(get_patron_borrowing_history("222222", status="returned")["records"]) == 4
+    assert len(get_patron_borrowing_history("222222", status="open")["records"]) == 1
+
+
+def test_rollups_and_export_include_archived_loans(app):
+    days = ((NOW - timedelta(days=800)).date().isoformat(), NOW.date().isoformat())
+    totals = database.get_circulation_totals(*days)
+    archive_closed_loans(365, clock=lambda: NOW)
+
+    assert database.rebuild_circulation_rollups()
+    assert database.get_circulation_totals(*days) == totals
+    exported = b"".join(iter_csv_chunks("borrow_records")).decode().splitlines()
+    assert sum(",222222," in line for line in exported) == 5
+
+
+def test_invalid_arguments(app):
+    with pytest.raises(ValueError):
+        archive_closed_loans(-1)
+    with pytest.raises(ValueError):
+        archive_closed_loans(365, batch_size=0)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import time
+import pytest
+
+import asgi
+import branches
+from app import create_app
+from asgi import AsyncApi
+from async_database import AsyncDatabase
+
+
+@pytest.fixture
+def api(app):
+    api = AsyncApi(AsyncDatabase(max_workers=16))
+    yield api
+    api.db.close()
+
+
+async def call(app, path, query="", method="GET", headers=(), messages=None):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(), "headers": list(headers),
+             "client": ("10.0.0.1", 5000)}
+    messages = [] if messages is None else messages
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages[0]["status"], json.loads(messages[1]["body"] or b"null")
+
+
+def test_search_matches_flask_api(api):
+    """the async endpoint returns the same payload as the Flask one"""
+    status, body = asyncio.run(call(api, "/api/search", "q=gatsby&type=title"))
+    expected = create_app().test_client().get("/api/search?q=gatsby&type=title").get_json()
+
+    assert status == 200
+    assert body == expected
+    assert asyncio.run(call(api, "/api/search"))[0] == 400
+
+
+def test_late_fee_and_unknown_routes(api):
+    status, body = asyncio.run(call(api, "/api/late_fee/123456/3"))
+    assert status == 200
+    assert body["fee_amount"] == 0.0
+
+    assert asyncio.run(call(api, "/api/nope"))[0] == 404
+    assert asyncio.run(call(api, "/api/search", "q=x", method="POST"))[0] == 405
+
+
+def test_late_fee_is_rate_limited_like_the_flask_api(app):
+    api = AsyncApi(AsyncDatabase(max_workers=2), rate_limits={"api": {"patron": "1/minute", "client": "3/minute"}})
+    try:
+        assert asyncio.run(call(api, "/api/late_fee/123456/3"))[0] == 200
+        messages = []
+        assert asyncio.run(call(api, "/api/late_fee/123456/3", messages=messages)) == \
+            (429, {"error": "Too many requests. Please slow down."})
+        assert (b"retry-after", b"60") in messages[0]["headers"]
+
+        assert asyncio.run(call(api, "/api/late_fee/111111/3"))[0] == 200
+        assert asyncio.run(call(api, "/api/search", "q=gatsby"))[0] == 200
+        assert asyncio.run(call(api, "/api/search", "q=gatsby"))[0] == 429  # the client's bucket is empty now
+    finally:
+        api.db.close()
+
+
+def test_fetch_helpers(api):
+    row = asyncio.run(api.db.fetchone("SELECT title FROM books WHERE id = ?", (1,)))
+    assert row == {"title": "The Great Gatsby"}
+    assert len(asyncio.run(api.db.fetchall("SELECT id FROM books"))) == 3
+
+
+def test_slow_queries_do_not_block_the_event_loop(api, monkeypatch):
+    """concurrent requests overlap instead of queueing behind each other"""
+    def slow_search(term, search_type):
+        time.sleep(0.1)
+        return []
+    monkeypatch.setattr(asgi, "search_books_in_catalog", slow_search)
+
+    async def burst():
+        return await asyncio.gather(*(call(api, "/api/search", "q=x") for _ in range(16)))
+
+    started = time.perf_counter()
+    results = asyncio.run(burst())
+    elapsed = time.perf_counter() - started
+
+    assert all(status == 200 for status, _ in results)
+    assert elapsed < 0.8  # serial handling would take 1.6s
+
+
+def test_lifespan_loads_branches_without_the_flask_app(database_path, tmp_path, monkeypatch):
+    """a standalone ASGI server routes X-Branch requests using LIBRARY_BRANCHES_FILE"""
+    config = tmp_path / "branches.json"
+    config.write_text(json.dumps({"branches": {"east": str(tmp_path / "east.db")}}))
+    monkeypatch.setenv("LIBRARY_BRANCHES_FILE", str(config))
+    branches.load_branches({})
+    api = AsyncApi(AsyncDatabase(max_workers=2))
+
+    async def serve():
+        inbox, sent = asyncio.Queue(), []
+
+        async def send(message):
+            sent.append(message["type"])
+
+        lifespan = asyncio.ensure_future(api({"type": "lifespan"}, inbox.get, send))
+        await inbox.put({"type": "lifespan.startup"})
+        while not sent:
+            await asyncio.sleep(0.01)
+        response = await call(api, "/api/search", "q=gatsby", headers=[(b"x-branch", b"east")])
+        await inbox.put({"type": "lifespan.shutdown"})
+        await lifespan
+        return sent, *response
+
+    try:
+        sent, status, body = asyncio.run(serve())
+    finally:
+        branches.load_branches({})
+
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert status == 200 and body["count"] == 0  # east has no books
@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+import pytest
+
+import database
+from app import create_app
+from services.backup_service import backup_database, create_snapshot, list_snapshots, restore_snapshot
+from services.hold_service import get_hold_queue, place_hold
+from services.loan_snapshot import LoanSnapshot, build_loan_snapshot
+from services.library_service import (
+    add_book_to_catalog, borrow_book_by_patron, get_patron_status_report, return_book_by_patron
+)
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"BACKUP_DIR": str(tmp_path / "backups"), "BACKUP_KEEP": 2, "ADMIN_TOKEN": "secret"}
+
+
+def book_titles(path):
+    conn = sqlite3.connect(path)
+    titles = [row[0] for row in conn.execute("SELECT title FROM books ORDER BY id")]
+    conn.close()
+    return titles
+
+
+def test_backup_runs_alongside_writes(app, tmp_path):
+    """a page-at-a-time backup completes while borrows and returns keep committing"""
+    stop = threading.Event()
+    writes = []
+
+    def traffic():
+        while not stop.is_set():
+            writes.append(borrow_book_by_patron("111111", 1)[0])
+            return_book_by_patron("111111", 1)
+
+    thread = threading.Thread(target=traffic)
+    thread.start()
+    try:
+        result = backup_database(str(tmp_path / "copy.db"), pages=1, sleep=0.001)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert all(writes) and writes
+    assert result["steps"] >= 1 and result["size"] > 0
+    assert book_titles(result["path"]) == ["The Great Gatsby", "To Kill a Mockingbird", "1984"]
+    assert not (tmp_path / "copy.db.partial").exists()
+
+
+def test_snapshots_apply_retention(app):
+    backup_dir = app.config["BACKUP_DIR"]
+    start = datetime(2024, 1, 1, 2, 0, 0)
+    for hours in range(3):
+        create_snapshot(backup_dir, keep=2, now=start + timedelta(hours=hours))
+
+    assert [s["name"] for s in list_snapshots(backup_dir)] == [
+        "library-20240101-040000.db", "library-20240101-030000.db"]
+
+
+def test_restore_replaces_live_data(app):
+    backup_dir = app.config["BACKUP_DIR"]
+    snapshot = create_snapshot(backup_dir)
+    add_book_to_catalog("Added Later", "Author", "9780000000019", 1)
+    place_hold("111111", 3)
+
+    result = restore_snapshot(snapshot["path"], backup_dir)
+
+    assert "Added Later" not in [b["title"] for b in database.get_all_books()]
+    assert get_hold_queue(3) == []  # cached queue dropped with the old data
+    assert "Added Later" in book_titles(f"{backup_dir}/{result['pre_restore_snapshot']}")
+    assert add_book_to_catalog("After Restore", "Author", "9780000000026", 1)[0] is True
+
+
+def test_restore_drops_cached_status_reports(app):
+    """event sequence numbers reused after a restore do not bring back a stale report"""
+    snapshot = create_snapshot(app.config["BACKUP_DIR"])
+    borrow_book_by_patron("111111", 1)
+    assert get_patron_status_report("111111")["borrowed_books"][0]["book_id"] == 1
+
+    restore_snapshot(snapshot["path"], app.config["BACKUP_DIR"])
+    borrow_book_by_patron("111111", 2)  # gets the same event seq as the borrow that was rolled back
+
+    assert [b["book_id"] for b in get_patron_status_report("111111")["borrowed_books"]] == [2]
+
+
+def test_restore_resets_the_loan_snapshot(app, tmp_path):
+    """record ids and event seqs reused after a restore do not patch or skip snapshot rows"""
+    loans_dir = str(tmp_path / "loans")
+    snapshot = create_snapshot(app.config["BACKUP_DIR"])
+    borrow_book_by_patron("111111", 1)
+    build_loan_snapshot(loans_dir)
+
+    restore_snapshot(snapshot["path"], app.config["BACKUP_DIR"], loan_snapshot_dir=loans_dir)
+    borrow_book_by_patron("222222", 2)  # reuses the rolled-back loan's record id
+
+    assert build_loan_snapshot(loans_dir)["full"] is True
+    with LoanSnapshot(loans_dir) as loans:
+        rows = list(zip(loans.column("record_id", use_numpy=False), loans.column("book_id", use_numpy=False)))
+    assert rows == [(r[0], r[1]) for r in database.iter_loans_after(0)]
+
+
+def test_admin_backup_endpoints(app):
+    client = app.test_client()
+    headers = {"X-Admin-Token": "secret"}
+    assert client.get("/admin/backups").status_code == 403
+
+    created = client.post("/admin/backups", headers=headers)
+    assert created.status_code == 201
+    name = created.get_json()["name"]
+    assert [s["name"] for s in client.get("/admin/backups", headers=headers).get_json()["snapshots"]] == [name]
+
+    assert client.post(f"/admin/backups/{name}/restore", headers=headers).status_code == 200
+    assert client.post("/admin/backups/library-20000101-000000.db/restore", headers=headers).status_code == 404
+
+
+def test_admin_api_disabled_without_token(database_path):
+    assert create_app().test_client().get("/admin/backups").status_code == 404
+
+
+def test_backup_cli(app, tmp_path):
+    runner = app.test_cli_runner()
+    result = runner.invoke(args=["backup", "create", "--dest", str(tmp_path / "cli.db")])
+    assert result.exit_code == 0, result.output
+    assert book_titles(str(tmp_path / "cli.db"))[0] == "The Great Gatsby"
+
+    runner.invoke(args=["backup", "create"])
+    name = list_snapshots(app.config["BACKUP_DIR"])[0]["name"]
+    assert name in runner.invoke(args=["backup", "list"]).output
+
+    result = runner.invoke(args=["backup", "restore", name, "--yes", "--no-save"])
+    assert result.exit_code == 0, result.output
+    assert runner.invoke(args=["backup", "restore", "missing.db", "--yes"]).exit_code != 0
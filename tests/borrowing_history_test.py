@@ -0,0 +1,87 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+import database
+from services.library_service import get_patron_borrowing_history, get_patron_status_report
+
+
+@pytest.fixture
+def seed():
+    """Two more books and five loans for patron 222222"""
+    def seed_database():
+        database.insert_book("Book 4", "Author", "9780000000019", 1, 1)
+        database.insert_book("Book 5", "Author", "9780000000026", 1, 1)
+        for day in range(1, 6):
+            borrowed = datetime(2024, 1, day, 10, 0)
+            database.insert_borrow_record("222222", day, borrowed, borrowed + timedelta(days=14))
+        # Return the two oldest loans
+        database.update_borrow_record_return_date("222222", 1, datetime(2024, 1, 10))
+        database.update_borrow_record_return_date("222222", 2, datetime(2024, 1, 11))
+    return seed_database
+
+
+def test_history_pages_newest_first(app):
+    """cursor pagination walks every loan exactly once, newest first"""
+    seen = []
+    cursor = None
+    while True:
+        page = get_patron_borrowing_history("222222", limit=2, cursor=cursor)
+        seen.extend(r["borrow_date"].day for r in page["records"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [5, 4, 3, 2, 1]
+
+
+def test_history_status_and_date_filters(app):
+    """status and inclusive date range narrow the history"""
+    returned = get_patron_borrowing_history("222222", status="returned")
+    ranged = get_patron_borrowing_history("222222", start_date=date(2024, 1, 2), end_date=date(2024, 1, 3))
+
+    assert len(returned["records"]) == 2
+    assert all(r["return_date"] is not None for r in returned["records"])
+    assert [r["borrow_date"].day for r in ranged["records"]] == [3, 2]
+
+
+def test_history_invalid_input():
+    """invalid patron id, status and cursor are reported as errors"""
+    assert "error" in get_patron_borrowing_history("12345")
+    assert "error" in get_patron_borrowing_history("222222", status="lost")
+    assert "error" in get_patron_borrowing_history("222222", cursor="not-a-cursor")
+
+
+def test_status_report_includes_history(app):
+    """R7 status report carries the first page of borrowing history"""
+    report = get_patron_status_report("222222")
+
+    assert len(report["borrowing_history"]) == 5
+    assert report["total_borrowed"] == 3
+
+
+def test_history_api_and_page(app):
+    """JSON and HTML endpoints serve the same page"""
+    client = app.test_client()
+    data = client.get("/api/patron/222222/history?limit=3&status=all").get_json()
+    html = client.get("/patron/222222/history?limit=3").data.decode()
+
+    assert len(data["records"]) == 3
+    assert data["next_cursor"]
+    assert client.get("/api/patron/222222/history?start=yesterday").status_code == 400
+    assert "Older loans" in html
+
+
+def test_history_query_uses_index(app):
+    """the history query is served by the (patron_id, borrow_date, id) index"""
+    conn = database.get_db_connection()
+    plan = conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT br.id FROM borrow_records br JOIN books b ON br.book_id = b.id
+        WHERE br.patron_id = ? AND (br.borrow_date, br.id) < (?, ?)
+        ORDER BY br.borrow_date DESC, br.id DESC LIMIT 20
+    """, ("222222", "2024-01-03", 3)).fetchall()
+    conn.close()
+    details = " ".join(row["detail"] for row in plan)
+
+    assert "idx_borrow_records_patron_history" in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import pytest
+
+import branches
+from asgi import AsyncApi
+from services.branch_service import search_all_branches
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"BRANCHES": {"north": str(tmp_path / "north.db"), "south": str(tmp_path / "south.db")}}
+
+
+@pytest.fixture
+def client(app):
+    yield app.test_client()
+    branches.load_branches({})
+
+
+def add_book(client, branch, title, isbn):
+    form = {"title": title, "author": "Branch Author", "isbn": isbn, "total_copies": 2}
+    return client.post("/add_book", data=form, headers={"X-Branch": branch})
+
+
+def test_requests_route_to_their_branch(client):
+    """books added at one branch only show up in that branch's catalog"""
+    add_book(client, "north", "Northern Lights", "9780000000019")
+
+    assert b"Northern Lights" in client.get("/catalog", headers={"X-Branch": "north"}).data
+    assert b"Northern Lights" not in client.get("/catalog?branch=south").data
+    assert b"Northern Lights" not in client.get("/catalog").data  # main database
+    assert b"The Great Gatsby" in client.get("/catalog").data
+
+    response = client.get("/catalog", headers={"X-Branch": "east"})
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Unknown branch: east."}
+
+
+def test_search_fans_out_and_merges(client):
+    add_book(client, "north", "Lights Out", "9780000000019")
+    add_book(client, "south", "Southern Lights", "9780000000026")
+    add_book(client, "south", "Another Lights", "9780000000033")
+
+    data = client.get("/api/branches/search?q=lights").get_json()
+    assert [(b["title"], b["branch"]) for b in data["results"]] == [
+        ("Another Lights", "south"), ("Lights Out", "north"), ("Southern Lights", "south")]
+    assert data["failed"] == []
+
+    assert search_all_branches("lights", "title", ["north"])["count"] == 1
+    with pytest.raises(ValueError):
+        search_all_branches("lights", "title", ["east"])
+    assert client.get("/api/branches").get_json() == {"branches": ["north", "south"], "default": None}
+
+
+def test_branch_config_file_and_validation(tmp_path):
+    path = tmp_path / "branches.json"
+    path.write_text(json.dumps({"branches": {"east": str(tmp_path / "east.db")}, "default": "east"}))
+    try:
+        branches.configure_branches({"BRANCHES_FILE": str(path)})
+        assert branches.branch_ids() == ["east"]
+        assert branches.default_branch() == "east"
+        with pytest.raises(ValueError):
+            branches.load_branches({"bad id": "x.db"})
+    finally:
+        branches.load_branches({})
+
+
+def test_asgi_api_honours_branch_header(client):
+    add_book(client, "north", "Northern Lights", "9780000000019")
+    api = AsyncApi()
+
+    async def search(headers):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request"}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": "/api/search", "query_string": b"q=northern",
+                 "headers": headers}
+        await api(scope, receive, send)
+        return messages[0]["status"], json.loads(messages[1]["body"])
+
+    assert asyncio.run(search([(b"x-branch", b"north")]))[1]["count"] == 1
+    assert asyncio.run(search([(b"x-branch", b"south")]))[1]["count"] == 0
+    assert asyncio.run(search([(b"x-branch", b"east")]))[0] == 404
+    api.db.close()
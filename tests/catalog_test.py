@@ -0,0 +1,95 @@
+import pytest
+
+import database
+from isbn import format_isbn13
+from loadtest import _isbn13
+from services.library_service import browse_catalog
+
+AUTHORS = ["Austen", "Orwell", "Woolf"]
+
+
+@pytest.fixture
+def seed():
+    def seed_database():
+        for i in range(30):
+            database.insert_book(f"Book {i % 7} {i}", AUTHORS[i % 3], _isbn13(979100000000 + i), 4, i % 5)
+    return seed_database
+
+
+def all_pages(**options):
+    books, cursor = [], None
+    while True:
+        page = browse_catalog(limit=4, cursor=cursor, **options)
+        books.extend(page["books"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return books
+
+
+@pytest.mark.parametrize("sort", ["title", "availability", "copies_out"])
+@pytest.mark.parametrize("available_only", [False, True])
+@pytest.mark.parametrize("author", [None, "Orwell"])
+def test_pages_match_full_ordering(app, sort, available_only, author):
+    """paging through any view returns every matching book once, in order"""
+    expected = [b for b in database.get_all_books()
+                if (not available_only or b["available_copies"] > 0) and (not author or b["author"] == author)]
+    key = {
+        "title": lambda b: (b["title"], b["id"]),
+        "availability": lambda b: (-b["available_copies"], -b["id"]),
+        "copies_out": lambda b: (b["available_copies"] - b["total_copies"], -b["id"]),
+    }[sort]
+    expected.sort(key=key)
+
+    books = all_pages(sort=sort, available_only=available_only, author=author)
+    assert [b["id"] for b in books] == [b["id"] for b in expected]
+
+
+@pytest.mark.parametrize("sort", list(database.CATALOG_SORTS))
+@pytest.mark.parametrize("available_only", [False, True])
+@pytest.mark.parametrize("author", [None, "Orwell"])
+def test_every_view_is_an_index_walk(app, monkeypatch, sort, available_only, author):
+    """no view sorts in a temp B-tree or reads the table outside an index, with or without a cursor"""
+    statements = []
+    real_connect = database._connect
+
+    def connect(path):
+        conn = real_connect(path)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(database, "_connect", connect)
+    for after in (None, ("Book 3", 10) if sort == "title" else (2, 10)):
+        database.get_books_page(sort, 5, after, available_only, author)
+
+    conn = real_connect(database.DATABASE)
+    for sql in [s for s in statements if s.lstrip().startswith("SELECT * FROM books")]:
+        plan = " | ".join(row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+        assert "TEMP B-TREE" not in plan and "USING INDEX" in plan, plan
+    conn.close()
+
+
+def test_invalid_options(app):
+    assert browse_catalog(sort="price")["error"] == "Sort must be one of: title, availability, copies_out."
+    assert "Page size" in browse_catalog(limit=0)["error"]
+    assert browse_catalog(cursor="not-a-cursor")["error"] == "Invalid cursor."
+    # A cursor only continues the ordering it came from
+    cursor = browse_catalog(sort="title", limit=2)["next_cursor"]
+    assert browse_catalog(sort="copies_out", cursor=cursor)["error"] == "Invalid cursor."
+
+
+def test_catalog_routes(app):
+    client = app.test_client()
+
+    data = client.get("/api/catalog?sort=copies_out&available=1&author=Woolf&limit=3").get_json()
+    assert data["count"] == 3 and data["next_cursor"]
+    assert all(b["author"] == "Woolf" and b["available_copies"] > 0 for b in data["books"])
+    more = client.get(f"/api/catalog?sort=copies_out&available=1&author=Woolf&limit=3&cursor={data['next_cursor']}")
+    assert not {b["id"] for b in more.get_json()["books"]} & {b["id"] for b in data["books"]}
+
+    assert client.get("/api/catalog?sort=price").status_code == 400
+    assert client.get("/api/catalog?limit=abc").status_code == 400
+
+    page = client.get("/catalog?author=Austen&limit=2").data
+    assert b"Next page" in page and b"Book 0 0" in page and b"Orwell" not in page
+    assert b"No books match" in client.get("/catalog?author=Nobody").data
+    assert format_isbn13(9780743273565).encode() in client.get("/catalog?sort=availability").data
@@ -0,0 +1,69 @@
+import gzip
+import json
+import zlib
+from datetime import datetime
+import pytest
+
+import database
+import json_provider
+import metrics
+
+
+@pytest.fixture
+def app_config():
+    return {"COMPRESS_MIN_SIZE": 100}
+
+
+@pytest.fixture
+def client(app):
+    metrics.reset()
+    return app.test_client()
+
+
+def test_datetimes_serialize_as_iso(client):
+    """borrowed-book datetimes encode natively with and without orjson"""
+    borrowed = database.get_patron_borrowed_books("123456")
+    with client.application.app_context():
+        encoded = json.loads(client.application.json.dumps(borrowed))
+    assert encoded[0]["due_date"] == borrowed[0]["due_date"].isoformat()
+
+    value = {"when": datetime(2024, 1, 2, 3, 4, 5), 1: "non-str key"}
+    fast = json.loads(json_provider.dumps_bytes(value))
+    json_provider.orjson, orjson = None, json_provider.orjson
+    try:
+        fallback = json.loads(json_provider.dumps_bytes(value))
+    finally:
+        json_provider.orjson = orjson
+    assert fast == fallback == {"when": "2024-01-02T03:04:05", "1": "non-str key"}
+
+
+def test_large_responses_are_compressed(client):
+    """JSON and HTML above the threshold honour Accept-Encoding"""
+    response = client.get("/catalog", headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert b"The Great Gatsby" in gzip.decompress(response.data)
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+    response = client.get("/api/search?q=the&type=title", headers={"Accept-Encoding": "deflate"})
+    assert response.headers["Content-Encoding"] == "deflate"
+    assert json.loads(zlib.decompress(response.data))["count"] == 1
+
+
+def test_small_or_unaccepted_responses_are_not_compressed(client):
+    assert "Content-Encoding" not in client.get("/catalog").headers
+    client.application.config["COMPRESS_MIN_SIZE"] = 10_000
+    small = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    assert b"The Great Gatsby" in small.data
+
+
+def test_sizes_are_reported_in_metrics(client):
+    response = client.get("/catalog", headers={"Accept-Encoding": "gzip"})
+    client.post("/borrow", data={"patron_id": "111111", "book_id": 1})
+
+    snapshot = client.get("/api/metrics").get_json()
+    summaries = snapshot["summaries"]
+    assert summaries["http.response_wire_bytes.catalog.catalog"]["sum"] == len(response.data)
+    assert summaries["http.response_bytes.catalog.catalog"]["sum"] > len(response.data)
+    assert summaries["http.request_bytes.borrowing.borrow_book"]["max"] > 0
+    assert snapshot["counters"]["http.compressed_responses.gzip"] == 1
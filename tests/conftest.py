@@ -0,0 +1,41 @@
+"""
+Shared fixtures: an app backed by a fresh temporary database
+
+Test modules customize the app fixture by overriding app_config (config
+overrides passed to create_app) or seed (a callable that adds rows once the
+sample data is in place).
+"""
+
+import pytest
+
+import database
+from app import create_app
+
+
+@pytest.fixture
+def database_path(tmp_path, monkeypatch):
+    """Point the database module at a fresh file in tmp_path"""
+    path = str(tmp_path / "library.db")
+    monkeypatch.setattr(database, "DATABASE", path)
+    return path
+
+
+@pytest.fixture
+def app_config():
+    """Config overrides for the app fixture"""
+    return {}
+
+
+@pytest.fixture
+def seed():
+    """Called after the app is created, to add a module's own rows (None: sample data only)"""
+    return None
+
+
+@pytest.fixture
+def app(database_path, app_config, seed):
+    """App backed by a temporary database holding the sample data and whatever seed adds"""
+    app = create_app(app_config)
+    if seed is not None:
+        seed()
+    return app
@@ -0,0 +1,77 @@
+import pytest
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import database
+from db_writer import WriteQueue
+
+
+@pytest.fixture
+def temp_db(database_path):
+    """A fresh temporary database with the schema but no sample data"""
+    database.init_database()
+    return database_path
+
+
+def test_concurrent_borrow_writes_all_commit(temp_db):
+    """parallel borrow record inserts from many threads all land in the database"""
+    now = datetime.now()
+    results = []
+
+    def worker(i):
+        results.append(database.insert_borrow_record(f"{100000 + i}", 1, now, now + timedelta(days=14)))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(25)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [True] * 25
+    conn = sqlite3.connect(temp_db)
+    assert conn.execute("SELECT COUNT(*) FROM borrow_records").fetchone()[0] == 25
+    conn.close()
+
+
+def test_queued_writes_are_group_committed(tmp_path):
+    """operations queued behind a slow write are committed together in one transaction"""
+    path = str(tmp_path / "writer.db")
+    sqlite3.connect(path).execute("CREATE TABLE t (v INTEGER)").connection.commit()
+    writer = WriteQueue(lambda: sqlite3.connect(path))
+
+    started, gate = threading.Event(), threading.Event()
+    first = writer.submit(lambda conn: started.set() or gate.wait(5))
+    started.wait(5)
+    rest = [writer.submit(lambda conn, v: conn.execute("INSERT INTO t VALUES (?)", (v,)).rowcount, i) for i in range(5)]
+    gate.set()
+
+    assert first.result(5) is True
+    assert [f.result(5) for f in rest] == [1] * 5
+    assert writer.batches_committed == 2
+
+
+def test_failed_operation_does_not_roll_back_neighbours(tmp_path):
+    """a failing operation raises through its future while the rest of the batch commits"""
+    path = str(tmp_path / "writer.db")
+    sqlite3.connect(path).execute("CREATE TABLE t (v INTEGER UNIQUE)").connection.commit()
+    writer = WriteQueue(lambda: sqlite3.connect(path))
+
+    started, gate = threading.Event(), threading.Event()
+    writer.submit(lambda conn: started.set() or gate.wait(5))
+    started.wait(5)
+    ok = writer.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)"))
+    dup = writer.submit(lambda conn: conn.execute("INSERT INTO t VALUES (1)"))
+    gate.set()
+
+    ok.result(5)
+    with pytest.raises(sqlite3.IntegrityError):
+        dup.result(5)
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+
+
+def test_write_helper_reports_failure_as_false(temp_db):
+    """write helpers still return False when the underlying write fails"""
+    database.insert_book("Book", "Author", "9780743273565", 1, 1)
+
+    assert database.insert_book("Book", "Author", "9780743273565", 1, 1) is False
@@ -0,0 +1,78 @@
+import pytest
+from unittest.mock import Mock
+
+import database
+from services.event_service import consume_events, read_events
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, pay_late_fees, return_book_by_patron
+from services.payment_service import PaymentGateway
+
+
+def event_types(events):
+    return [(e["event_type"], e["book_id"], e["patron_id"]) for e in events]
+
+
+def test_changes_append_events_in_order(app):
+    """sample data, inserts, borrows and returns each log an event with a rising seq"""
+    add_book_to_catalog("Event Book", "Author", "9780000000019", 1)
+    borrow_book_by_patron("111111", 4)
+    return_book_by_patron("111111", 4)
+
+    events = read_events()["events"]
+    assert event_types(events) == [
+        ("book_added", 1, None), ("book_added", 2, None), ("book_added", 3, None), ("checkout", 3, "123456"),
+        ("book_added", 4, None), ("checkout", 4, "111111"), ("return", 4, "111111"),
+    ]
+    assert [e["seq"] for e in events] == sorted(e["seq"] for e in events)
+    assert events[-1]["payload"]["record_id"] == events[-2]["payload"]["record_id"]
+
+
+def test_failed_write_logs_no_event(app):
+    """events commit or roll back with the change they describe"""
+    before = read_events()["latest"]
+    assert not database.insert_book("Dup", "Author", "9780743273565", 1, 1)  # duplicate ISBN
+    assert read_events()["latest"] == before
+
+
+def test_payment_logs_event(app, mocker):
+    mocker.patch("services.library_service.get_outstanding_late_fees", return_value=2.5)
+    gateway = Mock(spec=PaymentGateway)
+    gateway.process_payment.return_value = (True, "txn_1", "ok")
+
+    pay_late_fees("123456", 3, gateway)
+
+    event = read_events(event_types=["fee_paid"])["events"][0]
+    assert event["payload"] == {"amount": 2.5, "transaction_id": "txn_1"}
+
+
+def test_consumer_resumes_from_checkpoint(app):
+    batches = []
+    assert consume_events("indexer", batches.append, batch_size=3) == 4
+    assert [len(b) for b in batches] == [3, 1]
+
+    add_book_to_catalog("Event Book", "Author", "9780000000019", 1)
+    batches.clear()
+    assert consume_events("indexer", batches.append) == 1
+    assert batches[0][0]["payload"]["title"] == "Event Book"
+    assert consume_events("indexer", batches.append) == 0
+
+    # a failing handler leaves the checkpoint where it was
+    borrow_book_by_patron("111111", 4)
+    with pytest.raises(RuntimeError):
+        consume_events("indexer", Mock(side_effect=RuntimeError("boom")))
+    assert consume_events("indexer", batches.append, event_types=["checkout"]) == 1
+
+
+def test_events_api(app):
+    app.config["ADMIN_TOKEN"] = "secret"
+    client = app.test_client()
+    admin = {"X-Admin-Token": "secret"}
+    page = client.get("/api/events?after=1&limit=2", headers=admin).get_json()
+    assert [e["seq"] for e in page["events"]] == [2, 3]
+    assert page["next_after"] == 3 and page["latest"] == 4
+
+    assert client.get("/api/events?type=checkout", headers=admin).get_json()["events"][0]["patron_id"] == "123456"
+    assert client.get("/api/events?type=deleted", headers=admin).status_code == 400
+
+    assert client.get("/api/events").status_code == 403
+    app.config["ADMIN_TOKEN"] = None
+    assert client.get("/api/events", headers=admin).status_code == 404
@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime, timedelta
+
+import database
+from services import fee_forecast
+from services.fee_forecast import MAX_FEE_PER_BOOK, forecast_late_fees, late_fee_for_days, load_open_loans
+from services.library_service import calculate_late_fee_for_book
+
+NOW = datetime(2024, 5, 1, 12, 0)
+# Patron -> days from NOW until each open loan (books 1, 2, ...) is due
+OFFSETS = {"111111": [-3, 10], "222222": [-20], "333333": [5, 40]}
+
+
+@pytest.fixture
+def loans(app):
+    """Open loans due at various offsets from NOW"""
+    database.update_borrow_record_return_date("123456", 3, NOW)  # close the sample loan
+    for patron_id, days in OFFSETS.items():
+        for book_id, offset in enumerate(days, start=1):
+            due = NOW + timedelta(days=offset)
+            database.insert_borrow_record(patron_id, book_id, due - timedelta(days=14), due)
+    return load_open_loans()
+
+
+def _brute_force_total(due_dates, as_of):
+    return round(sum(late_fee_for_days((as_of - due).days) for due in due_dates), 2)
+
+
+def test_fee_schedule_tiers():
+    """R5 tiers: $0.50/day for a week, $1.00/day after, capped at $15"""
+    assert [late_fee_for_days(d) for d in (0, 1, 7, 8, 18, 19, 60)] == [0.0, 0.5, 3.5, 4.5, 14.5, 15.0, 15.0]
+
+
+def test_curve_matches_per_loan_schedule(loans):
+    """aggregate curve equals summing the scalar schedule over every open loan"""
+    sample = database.get_patron_borrowed_books("111111") + database.get_patron_borrowed_books("222222") \
+        + database.get_patron_borrowed_books("333333")
+    due_dates = [b["due_date"] for b in sample]
+    result = forecast_late_fees((30, 60), step_days=5, clock=lambda: NOW, loans=loans)
+
+    assert result["open_loans"] == 5
+    for point in result["curve"]:
+        as_of = NOW + timedelta(days=point["days_ahead"])
+        assert point["total_fees"] == _brute_force_total(due_dates, as_of)
+    assert result["horizons"]["60"]["capped_loans"] == 5
+
+
+def _assert_matches_schedule(result):
+    """curve and per-patron totals equal the scalar schedule applied to OFFSETS by hand"""
+    for point in result["curve"]:
+        days = [point["days_ahead"] - offset for offsets in OFFSETS.values() for offset in offsets]
+        assert point["total_fees"] == round(sum(late_fee_for_days(d) for d in days), 2)
+        assert point["overdue_loans"] == sum(d >= 1 for d in days)
+        assert point["capped_loans"] == sum(late_fee_for_days(d) == MAX_FEE_PER_BOOK for d in days)
+
+    patrons = {p["patron_id"]: p["fees"] for p in result["patrons"]}
+    for patron_id, offsets in OFFSETS.items():
+        expected = {h: round(sum(late_fee_for_days(int(h) - offset) for offset in offsets), 2) for h in ("30", "90")}
+        assert patrons[patron_id] == expected
+    assert [p["patron_id"] for p in result["patrons"]] == ["111111", "333333", "222222"]
+
+
+def test_per_patron_totals_without_numpy(loans, monkeypatch):
+    """pure Python fallback matches the schedule and ranks patrons by exposure"""
+    monkeypatch.setattr(fee_forecast, "np", None)
+    _assert_matches_schedule(forecast_late_fees((30, 90), step_days=3, clock=lambda: NOW, loans=loans))
+
+
+def test_per_patron_totals_with_numpy(loans):
+    """vectorized searchsorted/bincount path matches the schedule"""
+    pytest.importorskip("numpy")
+    assert fee_forecast.np is not None
+    _assert_matches_schedule(forecast_late_fees((30, 90), step_days=3, clock=lambda: NOW, loans=loans))
+
+
+def test_invalid_horizons(loans):
+    """horizons beyond a year are rejected"""
+    with pytest.raises(ValueError):
+        forecast_late_fees((30, 500), loans=loans)
+
+
+def test_live_fee_uses_injected_clock(loans):
+    """the live calculation and the forecast share one engine and clock"""
+    result = calculate_late_fee_for_book("222222", 1, clock=lambda: NOW + timedelta(days=1))
+
+    assert result == {"fee_amount": 15.0, "days_overdue": 21}
+
+
+def test_forecast_endpoint(app, loans):
+    client = app.test_client()
+
+    assert client.get("/api/fees/forecast?horizons=30&step=10").get_json()["open_loans"] == 5
+    assert client.get("/api/fees/forecast?horizons=abc").status_code == 400
@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+
+import database
+from services import hold_service
+from services.hold_service import place_hold, cancel_hold, get_hold_queue, get_patron_holds, expire_ready_holds
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+# Sample data: book 3 ("1984") has one copy, borrowed by patron 123456
+BOOK = 3
+
+
+def test_place_hold_queues_in_order(app):
+    """holds on an unavailable book queue FIFO"""
+    assert place_hold("111111", BOOK) == (True, 'Hold placed on "1984". You are number 1 in the queue.')
+    assert place_hold("222222", BOOK)[0] is True
+
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["111111", "222222"]
+    assert get_patron_holds("222222")[0]["position"] == 2
+
+
+def test_place_hold_rejections(app):
+    """duplicate holds, available books and the current borrower are rejected"""
+    place_hold("111111", BOOK)
+
+    assert "already have a hold" in place_hold("111111", BOOK)[1]
+    assert "available" in place_hold("111111", 1)[1]
+    assert "currently borrowing" in place_hold("123456", BOOK)[1]
+    assert "Book not found" in place_hold("111111", 99)[1]
+
+
+def test_return_hands_copy_to_next_hold(app):
+    """a return reserves the copy for the head of the queue instead of the shelf"""
+    place_hold("111111", BOOK)
+    place_hold("222222", BOOK)
+
+    assert return_book_by_patron("123456", BOOK)[0] is True
+    assert database.get_book_by_id(BOOK)["available_copies"] == 0
+    assert get_patron_holds("111111")[0]["status"] == "ready"
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["222222"]
+
+    assert borrow_book_by_patron("222222", BOOK)[0] is False
+    assert borrow_book_by_patron("111111", BOOK)[0] is True
+    assert database.get_book_by_id(BOOK)["available_copies"] == 0
+    assert get_patron_holds("111111") == []
+
+
+def test_return_without_holds_restores_availability(app):
+    assert return_book_by_patron("123456", BOOK)[0] is True
+    assert database.get_book_by_id(BOOK)["available_copies"] == 1
+
+
+def test_expired_and_cancelled_ready_holds_pass_copy_on(app):
+    """an expired ready hold moves to the next patron; the last one frees the copy"""
+    place_hold("111111", BOOK)
+    place_hold("222222", BOOK)
+    return_book_by_patron("123456", BOOK)
+
+    assert expire_ready_holds(datetime.now()) == 0
+    assert expire_ready_holds(datetime.now() + timedelta(days=hold_service.HOLD_PICKUP_DAYS + 1)) == 1
+    assert get_patron_holds("222222")[0]["status"] == "ready"
+
+    assert cancel_hold("222222", BOOK) == (True, "Hold cancelled.")
+    assert database.get_book_by_id(BOOK)["available_copies"] == 1
+
+
+def test_queue_cache_recovers_from_outside_changes(app):
+    """a stale cached queue is dropped when the database hands the copy to another hold"""
+    place_hold("111111", BOOK)
+    get_hold_queue(BOOK)
+    hold_service._queue_cache.clear()
+    database.insert_hold("222222", BOOK, datetime.now() - timedelta(days=1))  # older hold added elsewhere
+    get_hold_queue(BOOK)
+    hold_service._queue_cache[(database.current_database_path(), BOOK)].entries.rotate(1)  # simulate stale order
+
+    return_book_by_patron("123456", BOOK)
+
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["111111"]
+
+
+def test_queue_cache_sees_changes_from_other_processes(app):
+    """holds placed or cancelled behind the cache's back show up in positions and listings"""
+    place_hold("111111", BOOK)
+    place_hold("222222", BOOK)
+    assert get_patron_holds("222222")[0]["position"] == 2
+
+    # Written straight to the database, as another worker would
+    first = database.get_active_hold("111111", BOOK)
+    database.cancel_hold(first["id"], datetime.now(), datetime.now())
+    database.insert_hold("333333", BOOK, datetime.now())
+
+    assert get_patron_holds("222222")[0]["position"] == 1
+    assert get_patron_holds("333333")[0]["position"] == 2
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["222222", "333333"]
+
+
+def test_borrowing_a_shelf_copy_fulfils_a_waiting_hold(app):
+    """a queued patron who gets a copy off the shelf leaves the queue"""
+    place_hold("111111", BOOK)
+    place_hold("222222", BOOK)
+    database.update_book_availability(BOOK, 1)  # a copy reaches the shelf without a handoff
+
+    assert borrow_book_by_patron("111111", BOOK)[0] is True
+    assert get_patron_holds("111111") == []
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["222222"]
+
+    return_book_by_patron("123456", BOOK)
+    assert get_patron_holds("222222")[0]["status"] == "ready"
+
+
+def test_hold_routes(app):
+    client = app.test_client()
+    client.post("/hold", data={"patron_id": "111111", "book_id": BOOK})
+
+    assert client.get(f"/api/books/{BOOK}/holds").get_json()["count"] == 1
+    assert client.get("/api/patron/111111/holds").get_json()["holds"][0]["book_id"] == BOOK
+    assert b"Place Hold" in client.get("/catalog").data
+    assert b"Pick Up Hold" not in client.get("/catalog").data
+
+    # The returned copy is reserved, so the shelf stays empty but the holder can pick it up from the catalog
+    return_book_by_patron("123456", BOOK)
+    assert b"Pick Up Hold" in client.get("/catalog").data
+    client.post("/borrow", data={"patron_id": "111111", "book_id": BOOK})
+    assert get_patron_holds("111111") == []
+    assert b"Pick Up Hold" not in client.get("/catalog").data
+
+
+def test_next_hold_lookup_uses_queue_index(app):
+    conn = database.get_db_connection()
+    plan = conn.execute("""
+        EXPLAIN QUERY PLAN
+        SELECT id, patron_id FROM holds WHERE book_id = ? AND status = 'waiting'
+        ORDER BY created_at, id LIMIT 1
+    """, (BOOK,)).fetchall()
+    conn.close()
+
+    assert "idx_holds_book_queue" in " ".join(row["detail"] for row in plan)
+
+
+def test_queue_cache_is_bounded_and_skips_books_without_holds(app, monkeypatch):
+    monkeypatch.setattr(hold_service, "QUEUE_CACHE_SIZE", 1)
+    path = database.current_database_path()
+    assert get_hold_queue(99) == []
+    assert (path, 99) not in hold_service._queue_cache
+
+    place_hold("111111", BOOK)
+    database.insert_hold("111111", 1, datetime.now())
+    assert [h["patron_id"] for h in get_hold_queue(BOOK)] == ["111111"]
+    assert [h["patron_id"] for h in get_hold_queue(1)] == ["111111"]
+    assert [key for key in hold_service._queue_cache if key[0] == path] == [(path, 1)]
+
+
+def test_hold_operations_expire_overdue_ready_holds(app):
+    """a ready hold past its deadline is passed on without running `flask holds expire`"""
+    place_hold("111111", BOOK)
+    place_hold("222222", BOOK)
+    return_book_by_patron("123456", BOOK)
+    conn = database.get_db_connection()
+    conn.execute("UPDATE holds SET expires_at = ? WHERE status = 'ready'",
+                 ((datetime.now() - timedelta(minutes=1)).isoformat(),))
+    conn.commit()
+    conn.close()
+
+    hold_service.clear_queue_cache()  # also resets the sweep interval
+    assert get_patron_holds("222222")[0]["status"] == "ready"
+    assert get_patron_holds("111111") == []
@@ -0,0 +1,76 @@
+import sqlite3
+
+import database
+from services.hold_service import cancel_hold, place_hold
+from services.inventory_service import reconcile_inventory
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+
+
+def set_available(book_id, copies):
+    conn = sqlite3.connect(database.DATABASE)
+    conn.execute("UPDATE books SET available_copies = ? WHERE id = ?", (copies, book_id))
+    conn.commit()
+    conn.close()
+
+
+def test_consistent_data_has_no_drift(app):
+    """sample data, loans and ready holds all count against availability"""
+    borrow_book_by_patron("111111", 1)
+    place_hold("222222", 3)
+    return_book_by_patron("123456", 3)  # copy is held for 222222, not shelved
+
+    assert reconcile_inventory()["drift"] == []
+
+
+def test_reports_and_repairs_drift_in_batches(app):
+    set_available(1, 0)      # lost increment
+    set_available(2, 5)      # more than total
+    result = reconcile_inventory()
+    assert [(d["book_id"], d["available_copies"], d["expected"]) for d in result["drift"]] == [(1, 0, 3), (2, 5, 2)]
+    assert database.get_book_by_id(1)["available_copies"] == 0  # report only
+
+    result = reconcile_inventory(repair=True, batch_size=1)
+    assert result["repaired"] == [{"book_id": 1, "before": 0, "after": 3}, {"book_id": 2, "before": 5, "after": 2}]
+    assert reconcile_inventory()["drift"] == []
+
+    events = database.get_events_after(0, 100, ["availability_repaired"])
+    assert [e["book_id"] for e in events] == [1, 2]
+
+
+def test_incremental_checks_only_touched_books(app):
+    assert reconcile_inventory(incremental=True)["mode"] == "full"
+
+    set_available(2, 0)       # untouched by events: not seen incrementally
+    borrow_book_by_patron("111111", 1)
+    set_available(1, 0)
+
+    result = reconcile_inventory(incremental=True, repair=True)
+    assert result["checked"] == 1
+    assert [d["book_id"] for d in result["drift"]] == [1]
+    assert database.get_book_by_id(1)["available_copies"] == 2
+
+    assert reconcile_inventory(incremental=True)["drift"] == []
+    assert [d["book_id"] for d in reconcile_inventory()["drift"]] == [2]
+
+
+def test_reconcile_cli(app):
+    set_available(1, 1)
+    result = app.test_cli_runner().invoke(args=["inventory", "reconcile", "--repair"])
+    assert "1 with drift" in result.output
+    assert "Repaired 1 book(s)." in result.output
+
+
+def test_incremental_sees_books_changed_by_released_holds(app):
+    """a cancelled ready hold shelves its copy; the hold_released event puts the book in the next incremental run"""
+    place_hold("222222", 3)
+    return_book_by_patron("123456", 3)
+    reconcile_inventory(incremental=True)
+
+    cancel_hold("222222", 3)
+    set_available(3, 0)  # the shelving increment was lost
+
+    result = reconcile_inventory(incremental=True, repair=True)
+    assert [d["book_id"] for d in result["drift"]] == [3]
+    events = database.get_events_after(0, 100, ["hold_released"])
+    assert [(e["book_id"], e["payload"]["status"], e["payload"]["next_hold_id"]) for e in events] == \
+        [(3, "cancelled", None)]
@@ -0,0 +1,66 @@
+import pytest
+import sqlite3
+
+import database
+from isbn import format_isbn13, isbn13_key, parse_isbn
+from services.library_service import add_book_to_catalog, search_books_in_catalog
+
+GATSBY = 9780743273565  # sample book 1
+
+
+def test_parse_isbn_spellings():
+    """hyphens, spaces and ISBN-10 (including an X check digit) reduce to one ISBN-13"""
+    assert parse_isbn("9780743273565") == GATSBY
+    assert parse_isbn("978-0-7432-7356-5") == GATSBY
+    assert parse_isbn("0 7432 7356 7") == GATSBY
+    assert parse_isbn("0-8044-2957-x") == 9780804429573
+    assert format_isbn13(GATSBY) == "9780743273565"
+
+
+def test_parse_isbn_rejections():
+    with pytest.raises(ValueError, match="13 digits"):
+        parse_isbn("12345678")
+    with pytest.raises(ValueError, match="check digit"):
+        parse_isbn("9780743273566")
+    with pytest.raises(ValueError):
+        parse_isbn("0-7432-7356-8")
+    with pytest.raises(ValueError, match="only digits"):
+        parse_isbn("97807432735X5")
+    assert isbn13_key("1234567890123") is None
+
+
+def test_add_book_stores_canonical_isbn(app):
+    """books are stored under the canonical ISBN-13 and other spellings are duplicates"""
+    assert add_book_to_catalog("Hyphenated", "Author", "978-0-00-000001-9", 2)[0] is True
+    book = database.get_book_by_isbn13(9780000000019)
+    assert book["isbn"] == "9780000000019"
+
+    assert add_book_to_catalog("Same Book", "Author", "9780000000019", 2) == \
+        (False, "A book with this ISBN already exists.")
+    assert add_book_to_catalog("Gatsby Again", "Author", "0-7432-7356-7", 1) == \
+        (False, "A book with this ISBN already exists.")
+    assert add_book_to_catalog("Bad Check", "Author", "9780000000018", 1) == \
+        (False, "ISBN check digit is invalid.")
+
+
+def test_search_finds_any_spelling(app):
+    for spelling in ("9780743273565", "978-0-7432-7356-5", "0743273567"):
+        assert [b["id"] for b in search_books_in_catalog(spelling, "isbn")] == [1]
+    assert search_books_in_catalog("9780743273566", "isbn") == []
+
+
+def test_legacy_rows_get_integer_key(tmp_path, monkeypatch):
+    """files from before the isbn13 column are migrated on first connection"""
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE books (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL,
+                    author TEXT NOT NULL, isbn TEXT UNIQUE NOT NULL, total_copies INTEGER NOT NULL,
+                    available_copies INTEGER NOT NULL)""")
+    conn.executemany("INSERT INTO books (title, author, isbn, total_copies, available_copies) VALUES (?, ?, ?, 1, 1)",
+                     [("Valid", "A", "9780743273565"), ("Legacy", "B", "1234567890123")])
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(database, "DATABASE", path)
+    assert database.get_book_by_isbn13(GATSBY)["title"] == "Valid"
+    assert database.get_book_by_isbn("1234567890123")["isbn13"] is None
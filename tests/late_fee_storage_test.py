@@ -0,0 +1,92 @@
+import pytest
+import sqlite3
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import database
+from services.archive_service import archive_closed_loans
+from services.library_service import get_patron_status_report, pay_late_fees, return_book_by_patron
+from services.payment_service import PaymentGateway
+
+
+@pytest.fixture
+def seed():
+    """Patron 222222 has book 1 ten days overdue and book 2 due in a week"""
+    def seed_database():
+        now = datetime.now()
+        database.insert_borrow_record("222222", 1, now - timedelta(days=24, hours=1), now - timedelta(days=10, hours=1))
+        database.insert_borrow_record("222222", 2, now - timedelta(days=7), now + timedelta(days=7))
+    return seed_database
+
+
+def gateway():
+    mock = Mock(spec=PaymentGateway)
+    mock.process_payment.return_value = (True, "txn_1", "ok")
+    return mock
+
+
+def test_fee_is_assessed_and_stored_on_return(app):
+    success, message = return_book_by_patron("222222", 1)
+
+    assert success and "Overdue by 10 day(s). Late fee: $6.50." in message
+    assert database.get_outstanding_late_fees("222222") == 6.5
+    record = get_patron_status_report("222222")["borrowing_history"][-1]
+    assert (record["late_fee"], record["fee_paid"]) == (6.5, 0.0)
+
+    assert return_book_by_patron("222222", 2) == (True, 'Successfully returned "To Kill a Mockingbird". No late fees owed.')
+    assert database.get_outstanding_late_fees("222222") == 6.5
+
+
+def test_payment_charges_the_stored_fee(app):
+    assert pay_late_fees("222222", 1, gateway())[1] == "No late fees to pay for this book."
+    return_book_by_patron("222222", 1)
+
+    charged = gateway()
+    success, _, transaction_id = pay_late_fees("222222", 1, charged)
+    assert success and transaction_id == "txn_1"
+    assert charged.process_payment.call_args.kwargs["amount"] == 6.5
+    assert database.get_outstanding_late_fees("222222") == 0.0
+    assert get_patron_status_report("222222")["outstanding_fees"] == 0.0
+
+
+def test_partial_payment_settles_oldest_loan_first(app):
+    return_book_by_patron("222222", 1)
+    now = datetime.now()
+    database.insert_borrow_record("222222", 1, now - timedelta(days=20), now - timedelta(days=3))
+    return_book_by_patron("222222", 1)
+
+    assert database.get_outstanding_late_fees("222222", 1) == 8.0
+    assert database.record_fee_payment("222222", 1, 7.0, "txn_2", now)
+    assert database.get_outstanding_late_fees("222222", 1) == 1.0
+
+
+def test_unpaid_loans_are_not_archived(app):
+    return_book_by_patron("222222", 1)
+    return_book_by_patron("222222", 2)
+    assert archive_closed_loans(0, clock=lambda: datetime.now() + timedelta(seconds=1))["archived"] == 1
+
+    pay_late_fees("222222", 1, gateway())
+    assert archive_closed_loans(0, clock=lambda: datetime.now() + timedelta(seconds=1))["archived"] == 1
+
+
+def test_older_files_record_lateness_without_charging_past_returns(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE borrow_records (id INTEGER PRIMARY KEY AUTOINCREMENT, patron_id TEXT NOT NULL,
+            book_id INTEGER NOT NULL, borrow_date TEXT NOT NULL, due_date TEXT NOT NULL, return_date TEXT)
+    """)
+    conn.executemany("INSERT INTO borrow_records (patron_id, book_id, borrow_date, due_date, return_date) "
+                     "VALUES (?, ?, ?, ?, ?)",
+                     [("222222", 1, "2024-01-01T10:00:00", "2024-01-15T10:00:00", "2024-02-14T10:00:00"),
+                      ("222222", 2, "2024-01-01T10:00:00", "2024-01-15T10:00:00", "2024-01-10T10:00:00"),
+                      ("222222", 3, "2024-01-01T10:00:00", "2024-01-15T10:00:00", None)])
+    conn.commit()
+    conn.close()
+
+    with database.use_database(path):
+        assert database.get_outstanding_late_fees("222222") == 0.0
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT days_overdue, late_fee, fee_paid FROM borrow_records ORDER BY id").fetchall() == \
+        [(30, 0.0, 0.0), (0, 0.0, 0.0), (0, 0.0, 0.0)]
+    conn.close()
@@ -0,0 +1,97 @@
+import pytest
+import sqlite3
+
+import database
+from app import create_app
+from loadtest import compare_servers, parse_mix, percentile, run_load_test, seed_dataset, summarize
+
+
+def test_parse_mix():
+    """mix strings become weights and bad entries are rejected"""
+    assert parse_mix("catalog=3, borrow=1") == {"catalog": 3, "borrow": 1}
+    with pytest.raises(ValueError):
+        parse_mix("catalog=3,delete=1")
+    with pytest.raises(ValueError):
+        parse_mix("catalog=0")
+
+
+def test_percentiles_and_summary():
+    """nearest-rank percentiles and per-endpoint error rates"""
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+
+    report = summarize([("search", 0.01, None), ("search", 0.03, "lock_timeout"), ("borrow", 0.02, "refused")],
+                       elapsed=1.0)
+    assert report["endpoints"]["search"]["error_rate"] == 0.5
+    assert report["endpoints"]["search"]["errors"] == {"lock_timeout": 1}
+    assert report["endpoints"]["borrow"]["error_rate"] == 0.0 and report["endpoints"]["borrow"]["refused"] == 1
+
+
+def test_seeded_dataset_is_consistent(tmp_path):
+    """seeded availability matches the open loans"""
+    path = str(tmp_path / "seed.db")
+    seed_dataset(path, books=50, patrons=20, loans=200)
+
+    conn = sqlite3.connect(path)
+    drift = conn.execute("""
+        SELECT COUNT(*) FROM books b
+        WHERE b.available_copies != b.total_copies -
+            (SELECT COUNT(*) FROM borrow_records r WHERE r.book_id = b.id AND r.return_date IS NULL)
+    """).fetchone()[0]
+    conn.close()
+    assert drift == 0
+
+
+def test_short_threaded_run(tmp_path):
+    """a short run against a local app covers every endpoint without server errors"""
+    path = str(tmp_path / "load.db")
+    report = run_load_test(workers=4, duration=30, requests_per_worker=25, books=30, patrons=10, loans=60,
+                           database_path=path)
+
+    assert report["requests"] == 100
+    assert set(report["endpoints"]) == {"catalog", "search", "borrow", "return", "late_fee"}
+    for stats in report["endpoints"].values():
+        assert "http_5xx" not in stats["errors"]
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+
+    # Borrows counted as successful (neither refused nor failed) are exactly the loans added
+    borrow = report["endpoints"]["borrow"]
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM borrow_records").fetchone()[0] == \
+        60 + borrow["requests"] - borrow["refused"] - sum(borrow["errors"].values())
+    conn.close()
+
+
+def test_asgi_runs_only_take_operations_it_serves():
+    with pytest.raises(ValueError, match="only serves search, late_fee"):
+        run_load_test(server="asgi", mix={"search": 1, "borrow": 1})
+    with pytest.raises(ValueError, match="Unknown server"):
+        run_load_test(server="gunicorn")
+
+
+def test_compare_wsgi_and_asgi():
+    """the same search/late-fee mix runs against both apps without server errors"""
+    pytest.importorskip("uvicorn")
+    reports = compare_servers(workers=4, duration=30, requests_per_worker=10, books=30, patrons=10, loans=60)
+
+    assert list(reports) == ["wsgi", "asgi"]
+    for report in reports.values():
+        assert report["requests"] == 40
+        assert set(report["endpoints"]) == {"search", "late_fee"}
+        assert all(not stats["errors"] for stats in report["endpoints"].values())
+
+
+def test_configured_database_stays_with_its_app(database_path, tmp_path):
+    """an app built with DATABASE serves that file without repointing the database module"""
+    path = str(tmp_path / "load.db")
+    seed_dataset(path, books=5, patrons=2, loans=0)
+    load_app = create_app({"DATABASE": path, "RATE_LIMITS": {}})
+
+    assert database.DATABASE == database_path
+    assert database.current_database_path() == database.DATABASE
+    with load_app.app_context():
+        assert database.current_database_path() == path
+    assert load_app.test_client().get("/api/catalog?limit=50").get_json()["count"] == 5
+    assert create_app().test_client().get("/api/catalog?limit=50").get_json()["count"] == 3  # sample data
+    assert database.current_database_path() == database.DATABASE
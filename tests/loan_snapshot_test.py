@@ -0,0 +1,112 @@
+import os
+import pytest
+from datetime import datetime, timedelta
+
+import database
+from services import loan_snapshot
+from services.archive_service import archive_closed_loans
+from services.library_service import borrow_book_by_patron, return_book_by_patron
+from services.loan_snapshot import LoanSnapshot, build_loan_snapshot
+
+
+@pytest.fixture
+def seed():
+    """Patron 222222 has book 1 ten days overdue"""
+    def seed_database():
+        now = datetime.now()
+        database.insert_borrow_record("222222", 1, now - timedelta(days=24, hours=1), now - timedelta(days=10, hours=1))
+    return seed_database
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    return str(tmp_path / "snapshot")
+
+
+def columns(snapshot_dir):
+    with LoanSnapshot(snapshot_dir) as snapshot:
+        return {name: list(snapshot.column(name, use_numpy=False)) for name in loan_snapshot.COLUMNS}
+
+
+def expected():
+    """The snapshot columns, computed row by row from the database"""
+    rows = list(database.iter_loans_after(0))
+    stamp = lambda value: int(datetime.fromisoformat(value).timestamp()) if value else 0
+    return {
+        'record_id': [r[0] for r in rows],
+        'book_id': [r[1] for r in rows],
+        'patron_id': [int(r[2]) for r in rows],
+        'borrow_ts': [stamp(r[3]) for r in rows],
+        'due_ts': [stamp(r[4]) for r in rows],
+        'return_ts': [stamp(r[5]) for r in rows],
+        'fee_cents': [round(r[6] * 100) for r in rows],
+    }
+
+
+def test_full_build_matches_database(app, snapshot_dir):
+    result = build_loan_snapshot(snapshot_dir)
+
+    assert (result["full"], result["rows"], result["appended"]) == (True, 2, 2)
+    assert columns(snapshot_dir) == expected()
+
+
+def test_incremental_build_appends_loans_and_applies_returns(app, snapshot_dir):
+    build_loan_snapshot(snapshot_dir)
+    assert return_book_by_patron("222222", 1)[0]
+    assert borrow_book_by_patron("333333", 2)[0]
+
+    result = build_loan_snapshot(snapshot_dir)
+
+    assert (result["full"], result["appended"], result["patched"], result["rows"]) == (False, 1, 1, 3)
+    snapshot = columns(snapshot_dir)
+    assert snapshot == expected()
+    assert snapshot["fee_cents"][1] == 650
+    assert database.get_events_after(0, 500, ["return"])[-1]["payload"]["late_fee"] == 6.5  # patched from here
+    assert build_loan_snapshot(snapshot_dir)["appended"] == 0
+
+
+def test_returns_logged_without_a_fee_use_the_stored_fee(app, snapshot_dir):
+    build_loan_snapshot(snapshot_dir)
+    assert return_book_by_patron("222222", 1)[0]
+    conn = database.get_db_connection()  # as logged before return events carried the fee
+    conn.execute("UPDATE circulation_events SET payload = json_remove(payload, '$.late_fee') WHERE event_type = 'return'")
+    conn.commit()
+    conn.close()
+
+    assert build_loan_snapshot(snapshot_dir)["patched"] == 1
+    assert columns(snapshot_dir)["fee_cents"][1] == 650
+    assert columns(snapshot_dir) == expected()
+
+
+def test_archived_loans_keep_their_rows(app, snapshot_dir):
+    return_book_by_patron("123456", 3)
+    archive_closed_loans(0, clock=lambda: datetime.now() + timedelta(seconds=1))
+    build_loan_snapshot(snapshot_dir)
+
+    assert columns(snapshot_dir) == expected()
+    assert len(columns(snapshot_dir)["record_id"]) == 2
+
+
+def test_interrupted_build_is_discarded(app, snapshot_dir):
+    build_loan_snapshot(snapshot_dir)
+    with open(os.path.join(snapshot_dir, "book_id.col"), "ab") as f:
+        f.write(b"\xff" * 12)  # rows from a build that never wrote meta.json
+
+    build_loan_snapshot(snapshot_dir)
+
+    assert os.path.getsize(os.path.join(snapshot_dir, "book_id.col")) == 2 * 4
+    assert columns(snapshot_dir) == expected()
+
+
+def test_reader_maps_columns_without_copying(app, snapshot_dir):
+    with pytest.raises(FileNotFoundError):
+        LoanSnapshot(snapshot_dir)
+    build_loan_snapshot(snapshot_dir)
+
+    with LoanSnapshot(snapshot_dir) as snapshot:
+        book_ids = snapshot.column("book_id", use_numpy=False)
+        assert isinstance(book_ids, memoryview) and book_ids.readonly
+        assert (book_ids.format, book_ids.itemsize, len(snapshot)) == ("i", 4, 2)
+        assert list(book_ids) == [3, 1]
+        if loan_snapshot.np is not None:
+            assert not snapshot["book_id"].flags.owndata
@@ -0,0 +1,81 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+
+import database
+from services.notification_service import flush_outbox, generate_notifications
+
+NOW = datetime(2026, 3, 2, 12, 0)
+
+
+@pytest.fixture
+def seed():
+    def seed_database():
+        # Sample data has patron 123456 borrowing book 3, due in 9 days from the real now
+        loans = [
+            ("111111", 1, NOW - timedelta(days=20), NOW - timedelta(days=6)),   # overdue
+            ("111111", 2, NOW - timedelta(days=12), NOW + timedelta(days=2)),   # due soon
+            ("111111", 3, NOW - timedelta(days=1), NOW + timedelta(days=13)),   # not yet
+            ("222222", 1, NOW - timedelta(days=15), NOW - timedelta(days=1)),   # overdue
+        ]
+        for patron_id, book_id, borrowed, due in loans:
+            database.insert_borrow_record(patron_id, book_id, borrowed, due)
+    return seed_database
+
+
+def outbox():
+    return {m["patron_id"]: m["payload"] for m in database.get_pending_notifications()}
+
+
+def test_notices_are_grouped_by_patron(app):
+    """one message per patron holds both kinds; loans outside the window are left out"""
+    result = generate_notifications(3, chunk_size=1, clock=lambda: NOW)
+    assert (result["overdue"], result["due_soon"]) == (2, 1)
+
+    messages = outbox()
+    assert set(messages) == {"111111", "222222"}
+    assert [loan["book_id"] for loan in messages["111111"]["overdue"]] == [1]
+    assert [loan["book_id"] for loan in messages["111111"]["due_soon"]] == [2]
+    assert messages["222222"]["due_soon"] == []
+
+
+def test_loans_are_noticed_once_per_window(app):
+    generate_notifications(3, clock=lambda: NOW)
+    assert generate_notifications(3, clock=lambda: NOW + timedelta(hours=1), batch_id="rerun") == \
+        {"batch_id": "rerun", "overdue": 0, "due_soon": 0}
+
+    # The due-soon loan becomes overdue: a new kind of notice for the same loan
+    later = generate_notifications(3, clock=lambda: NOW + timedelta(days=3), batch_id="later")
+    assert (later["overdue"], later["due_soon"]) == (1, 0)
+
+
+def test_flush_writes_jsonl_and_marks_sent(app, tmp_path):
+    generate_notifications(3, clock=lambda: NOW)
+    path = tmp_path / "outbox.jsonl"
+
+    assert flush_outbox(str(path), chunk_size=1) == 2
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["patron_id"] for line in lines] == ["111111", "222222"]
+    assert database.get_pending_notifications() == []
+    assert flush_outbox(str(path)) == 0
+
+
+def test_reused_batch_id_after_flush_requeues_new_loans(app, tmp_path):
+    """a flushed message is not reused: loans found later under the same batch id still get sent"""
+    generate_notifications(3, clock=lambda: NOW, batch_id="b")
+    flush_outbox(str(tmp_path / "first.jsonl"))
+    database.insert_borrow_record("111111", 3, NOW - timedelta(days=30), NOW - timedelta(days=16))
+
+    assert generate_notifications(3, clock=lambda: NOW, batch_id="b")["overdue"] == 1
+    messages = outbox()
+    assert set(messages) == {"111111"}
+    assert [loan["book_id"] for loan in messages["111111"]["overdue"]] == [3]
+    assert messages["111111"]["due_soon"] == []
+    assert flush_outbox(str(tmp_path / "second.jsonl")) == 1
+
+
+def test_invalid_window(app):
+    with pytest.raises(ValueError):
+        generate_notifications(-1)
+    with pytest.raises(ValueError):
+        generate_notifications(3, chunk_size=0)
@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime, timedelta
+
+import database
+from services import library_service
+from services.fee_forecast import late_fee_for_days
+from services.library_service import borrow_book_by_patron, get_patron_status_report
+
+NOW = datetime(2026, 3, 2, 12, 0)
+DAYS_OVERDUE = [-3, 0, 1, 7, 8, 14, 15, 40]
+
+
+@pytest.fixture
+def seed():
+    """Patron 333333 has loans DAYS_OVERDUE days past due as of NOW"""
+    def seed_database():
+        for days in DAYS_OVERDUE:
+            due = NOW - timedelta(days=days, hours=1)
+            database.insert_borrow_record("333333", 1, due - timedelta(days=14), due)
+    return seed_database
+
+
+def test_fee_tiers_applied_in_sql_match_schedule(app):
+    report = get_patron_status_report("333333", clock=lambda: NOW)
+
+    loans = report["borrowed_books"]
+    assert [loan["days_overdue"] for loan in loans] == [max(d, 0) for d in reversed(DAYS_OVERDUE)]
+    assert [loan["fee_amount"] for loan in loans] == [late_fee_for_days(d) for d in reversed(DAYS_OVERDUE)]
+    assert report["total_borrowed"] == len(DAYS_OVERDUE)
+    assert report["currently_overdue"] == 7  # due an hour ago counts as overdue, with no fee yet
+    assert report["total_late_fees"] == round(sum(late_fee_for_days(d) for d in DAYS_OVERDUE), 2)
+
+
+def test_patron_without_loans(app):
+    report = get_patron_status_report("444444")
+    assert (report["total_borrowed"], report["currently_overdue"], report["total_late_fees"]) == (0, 0, 0.0)
+    assert report["borrowed_books"] == []
+
+
+def test_report_is_cached_until_the_patron_writes(app, monkeypatch):
+    calls = []
+    loan_status = library_service.get_patron_loan_status
+    monkeypatch.setattr(library_service, "get_patron_loan_status", lambda *args: calls.append(args) or loan_status(*args))
+
+    first = get_patron_status_report("123456")
+    first["borrowed_books"].clear()  # callers get copies
+    assert get_patron_status_report("123456")["total_borrowed"] == 1
+    assert len(calls) == 1
+
+    get_patron_status_report("555555")
+    assert borrow_book_by_patron("123456", 1)[0]
+    assert get_patron_status_report("123456")["total_borrowed"] == 2
+    assert len(calls) == 3
+
+
+def test_status_api_and_page(app):
+    client = app.test_client()
+    data = client.get("/api/patron/123456/status").get_json()
+    html = client.get("/patron/status?patron_id=123456").data.decode()
+
+    assert data["total_borrowed"] == 1 and data["borrowed_books"][0]["title"] == "1984"
+    assert client.get("/api/patron/12345/status").status_code == 400
+    assert "1984" in html and "Late fees accruing" in html
+    assert "Invalid patron ID" in client.get("/patron/abc/status").data.decode()
@@ -0,0 +1,71 @@
+import pstats
+import time
+import pytest
+
+from app import create_app
+from middleware.profiling import sign_profile_request
+from services.profile_service import list_captures
+
+ADMIN = {"X-Admin-Token": "secret-admin"}
+
+
+@pytest.fixture
+def make_app(database_path, tmp_path):
+    def make(**config):
+        return create_app({"ADMIN_TOKEN": "secret-admin", "PROFILE_DIR": str(tmp_path / "profiles"),
+                           "RATE_LIMITS": {}, **config})
+    return make
+
+
+def test_profiling_is_off_by_default(make_app, tmp_path):
+    client = make_app(PROFILE_THRESHOLD_MS=0).test_client()
+    client.get("/catalog")
+    assert list_captures(str(tmp_path / "profiles")) == []
+
+
+def test_slow_requests_are_captured_and_downloadable(make_app):
+    client = make_app(PROFILE_REQUESTS=True, PROFILE_THRESHOLD_MS=0).test_client()
+    client.get("/catalog?sort=availability")
+
+    profiles = client.get("/admin/profiles", headers=ADMIN).get_json()["profiles"]
+    assert len(profiles) == 1
+    capture = profiles[0]
+    assert (capture["path"], capture["endpoint"], capture["status"]) == ("/catalog?sort=availability",
+                                                                        "catalog.catalog", 200)
+
+    summary = client.get(f"/admin/profiles/{capture['id']}.txt", headers=ADMIN)
+    assert summary.status_code == 200 and b"GET /catalog?sort=availability -> 200" in summary.data
+    dump = client.get(f"/admin/profiles/{capture['id']}.prof", headers=ADMIN)
+    assert dump.status_code == 200 and dump.data
+
+    assert client.get("/admin/profiles/../library.db.txt", headers=ADMIN).status_code == 404
+    assert client.get(f"/admin/profiles/{capture['id']}.prof").status_code == 403
+
+
+def test_fast_requests_are_discarded_and_buffer_is_bounded(make_app, tmp_path):
+    app = make_app(PROFILE_REQUESTS=True, PROFILE_THRESHOLD_MS=60_000)
+    client = app.test_client()
+    client.get("/catalog")
+    assert list_captures(str(tmp_path / "profiles")) == []
+
+    app.config.update(PROFILE_THRESHOLD_MS=0, PROFILE_KEEP=2)
+    for _ in range(4):
+        client.get("/api/catalog")
+    captures = list_captures(str(tmp_path / "profiles"))
+    assert len(captures) == 2
+    assert len(list((tmp_path / "profiles").iterdir())) == 6  # .prof, .txt and .json each
+    pstats.Stats(str(tmp_path / "profiles" / f"{captures[0]['id']}.prof"))
+
+
+def test_signed_header_opts_in_one_request(make_app, tmp_path):
+    client = make_app(PROFILE_SECRET="profile-key", PROFILE_THRESHOLD_MS=0).test_client()
+    expires = int(time.time()) + 60
+
+    client.get("/catalog")
+    client.get("/catalog", headers={"X-Profile": sign_profile_request("wrong-key", "/catalog", expires)})
+    client.get("/catalog", headers={"X-Profile": sign_profile_request("profile-key", "/api/catalog", expires)})
+    client.get("/catalog", headers={"X-Profile": sign_profile_request("profile-key", "/catalog", expires - 120)})
+    assert list_captures(str(tmp_path / "profiles")) == []
+
+    client.get("/catalog", headers={"X-Profile": sign_profile_request("profile-key", "/catalog", expires)})
+    assert [c["path"] for c in list_captures(str(tmp_path / "profiles"))] == ["/catalog"]
@@ -0,0 +1,290 @@
+"""
+Runs the database helpers and services against a large seeded database,
+traces their SQL and checks every statement's EXPLAIN QUERY PLAN.
+"""
+
+import inspect
+import re
+import sqlite3
+import threading
+import time
+import warnings
+from datetime import date, datetime, timedelta
+import pytest
+
+import database
+from loadtest import seed_dataset
+from services import (
+    analytics_service, archive_service, event_service, export_service, fee_forecast, hold_service,
+    inventory_service, library_service, notification_service
+)
+
+BOOKS, PATRONS, LOANS = 3000, 1500, 30000
+PATRON = "100007"
+
+# Fingerprint pattern -> why a full scan / temp B-tree is expected
+ALLOWED = {
+    r"^SELECT \* FROM books ORDER BY title$":
+        "catalog page and title/author search read the whole catalog",
+    r"^SELECT \* FROM books (WHERE \+?available_copies > \? )?ORDER BY .* LIMIT \?$":
+        "first catalog page walks its sort index from the start; LIMIT bounds it",
+    r"^SELECT patron_id, due_date FROM borrow_records WHERE return_date IS NULL$":
+        "fee forecast reads every open loan (via the open-loan partial index)",
+    r"^SELECT id, patron_id, book_id, borrow_date, due_date, return_date FROM all_borrow_records WHERE":
+        "CSV export streams a date range in id order",
+    r"^(DELETE FROM|INSERT INTO) (book_)?circulation_daily":
+        "rollup rebuild recomputes everything from borrow_records",
+    r"^SELECT \* FROM \( SELECT b\.id AS book_id.* FROM books b \) WHERE":
+        "full inventory reconciliation checks every book",
+    r"^SELECT DISTINCT book_id FROM circulation_events":
+        "incremental reconciliation dedupes the books touched since its checkpoint",
+    r"^SELECT r\.book_id, b\.title, b\.author, SUM\(r\.checkouts\)":
+        "ranking sorts aggregated rollup rows; the day range uses the rollup key",
+}
+
+# database.py functions that issue no query of their own
+NOT_QUERIES = {
+    'current_database_path', 'use_database', 'get_db_connection', 'get_write_queue', 'write_queue_depth',
+    'execute_write',
+    'init_database', 'create_schema', 'add_sample_data', 'iter_query_rows',
+}
+
+# A statement counts as slower than its baseline past both limits
+SLOWDOWN_FACTOR = 5
+SLOWDOWN_MIN_SECONDS = 0.005
+
+
+def fingerprint(sql):
+    """Normalize a traced statement: literals become ?, whitespace collapses."""
+    sql = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    sql = re.sub(r"\b\d+(?:\.\d+)?\b", "?", sql)
+    sql = re.sub(r"\?(?:\s*,\s*\?)+", "?, ...", sql)
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def workload():
+    """(name, call) pairs covering the database helpers and the services on top of them."""
+    now = datetime.now()
+    today = date.today()
+    day = lambda d: (today - timedelta(days=d)).isoformat()
+    later = now + timedelta(days=1)
+
+    def hold_cycle():
+        hold_id = database.insert_hold(PATRON, 2, now)
+        database.cancel_hold(hold_id, now, later)
+
+    def catalog_pages():
+        for sort in database.CATALOG_SORTS:
+            for available_only in (False, True):
+                for author in (None, 'Austen'):
+                    first = database.get_books_page(sort, 20, None, available_only, author)
+                    last = first[-1]
+                    key = {'title': last['title'], 'availability': last['available_copies'],
+                           'copies_out': last['total_copies'] - last['available_copies']}[sort]
+                    database.get_books_page(sort, 20, (key, last['id']), available_only, author)
+
+    def drain_outbox():
+        pending = database.get_pending_notifications(0, 50)
+        database.mark_notifications_sent([m['id'] for m in pending], now)
+
+    def held_borrow():
+        book = database.get_book_by_id(5)
+        database.update_book_availability(5, -book['available_copies'])
+        hold_id = database.insert_hold("100008", 5, now)
+        database.complete_return("100009", 5, now, later)
+        database.borrow_held_copy(hold_id, "100008", 5, now, later)
+
+    return [
+        ('get_all_books', database.get_all_books),
+        ('get_catalog_version', database.get_catalog_version),
+        ('get_books_page', catalog_pages),
+        ('get_book_by_id', lambda: database.get_book_by_id(42)),
+        ('get_book_by_isbn', lambda: database.get_book_by_isbn('9790000000421')),
+        ('get_book_by_isbn13', lambda: database.get_book_by_isbn13(9790000000421)),
+        ('get_patron_borrowed_books', lambda: database.get_patron_borrowed_books(PATRON)),
+        ('archive_loans', lambda: archive_service.archive_closed_loans(30, batch_size=200, max_batches=2)),
+        ('get_patron_borrow_history', lambda: database.get_patron_borrow_history(PATRON, 20)),
+        ('get_patron_borrow_history:page', lambda: database.get_patron_borrow_history(
+            PATRON, 20, (now.isoformat(), 10 ** 9), day(30), day(0), 'returned')),
+        ('get_patron_borrow_history:open', lambda: database.get_patron_borrow_history(PATRON, 20, status='open')),
+        ('get_patron_borrow_count', lambda: database.get_patron_borrow_count(PATRON)),
+        ('get_outstanding_late_fees', lambda: database.get_outstanding_late_fees(PATRON)),
+        ('get_outstanding_late_fees:book', lambda: database.get_outstanding_late_fees(PATRON, 7)),
+        ('get_daily_circulation', lambda: database.get_daily_circulation(day(30), day(0))),
+        ('get_circulation_totals', lambda: database.get_circulation_totals(day(30), day(0))),
+        ('get_top_borrowed_books', lambda: database.get_top_borrowed_books(day(30), day(0), 10)),
+        ('rebuild_circulation_rollups', database.rebuild_circulation_rollups),
+        ('iter_open_loan_due_dates', lambda: list(database.iter_open_loan_due_dates())),
+        ('iter_loans_after', lambda: list(database.iter_loans_after(100))),
+        ('get_loan_late_fees', lambda: database.get_loan_late_fees(list(range(1, 21)))),
+        ('get_events_after', lambda: database.get_events_after(100, 500)),
+        ('get_events_after:typed', lambda: database.get_events_after(100, 500, ['checkout', 'return'])),
+        ('get_latest_event_seq', database.get_latest_event_seq),
+        ('get_event_checkpoint', lambda: database.get_event_checkpoint('query_plan')),
+        ('save_event_checkpoint', lambda: database.save_event_checkpoint('query_plan', 10)),
+        ('find_availability_drift', database.find_availability_drift),
+        ('find_availability_drift:ids', lambda: database.find_availability_drift(list(range(1, 50)))),
+        ('repair_book_availability', lambda: database.repair_book_availability(list(range(1, 50)))),
+        ('get_book_ids_in_events', lambda: database.get_book_ids_in_events(100, 600)),
+        ('get_notifiable_loans+queue_notifications', lambda: notification_service.generate_notifications(
+            chunk_size=200)),
+        ('get_pending_notifications+mark_notifications_sent', drain_outbox),
+        ('get_active_hold', lambda: database.get_active_hold(PATRON, 1)),
+        ('get_patron_holds', lambda: database.get_patron_holds(PATRON)),
+        ('get_waiting_holds', lambda: database.get_waiting_holds(1)),
+        ('get_hold_queue_version', lambda: database.get_hold_queue_version(1)),
+        ('get_books_with_ready_holds', lambda: database.get_books_with_ready_holds(list(range(1, 21)))),
+        ('insert_hold+cancel_hold', hold_cycle),
+        ('complete_return+borrow_held_copy', held_borrow),
+        ('expire_ready_holds', lambda: database.expire_ready_holds(now, later)),
+        ('insert_book', lambda: database.insert_book('Plan Book', 'Plan Author', '9780000000019', 2, 2)),
+        ('insert_borrow_record', lambda: database.insert_borrow_record(PATRON, 7, now, later)),
+        ('borrow_copy', lambda: database.borrow_copy("100012", 11, now, later, 5)),
+        ('update_book_availability', lambda: database.update_book_availability(7, -1)),
+        ('update_borrow_record_return_date', lambda: database.update_borrow_record_return_date(PATRON, 7, now)),
+        ('record_fee_payment', lambda: database.record_fee_payment(PATRON, 7, 1.5, 'txn_plan', now)),
+        # Services
+        ('borrow_book_by_patron', lambda: library_service.borrow_book_by_patron("100010", 9)),
+        ('return_book_by_patron', lambda: library_service.return_book_by_patron("100010", 9)),
+        ('calculate_late_fee_for_book', lambda: library_service.calculate_late_fee_for_book(PATRON, 1)),
+        ('browse_catalog', lambda: library_service.browse_catalog('copies_out', True, 'Orwell')),
+        ('search:title', lambda: library_service.search_books_in_catalog('river', 'title')),
+        ('search:isbn', lambda: library_service.search_books_in_catalog('979-0-00-000042-1', 'isbn')),
+        ('get_patron_status_report', lambda: library_service.get_patron_status_report(PATRON)),
+        ('get_patron_loan_status', lambda: database.get_patron_loan_status(PATRON, now, 7, 0.5, 1.0, 15.0)),
+        ('get_patron_last_write', lambda: database.get_patron_last_write(PATRON)),
+        ('get_patron_borrowing_history', lambda: library_service.get_patron_borrowing_history(PATRON)),
+        ('analytics:daily', analytics_service.get_daily_checkouts_and_returns),
+        ('analytics:summary', analytics_service.get_circulation_summary),
+        ('analytics:top_books', analytics_service.get_top_books),
+        ('forecast_late_fees', fee_forecast.forecast_late_fees),
+        ('place_hold', lambda: hold_service.place_hold("100011", 5)),
+        ('get_hold_queue', lambda: hold_service.get_hold_queue(5)),
+        ('hold_service.get_patron_holds', lambda: hold_service.get_patron_holds("100011")),
+        ('hold_service.expire_ready_holds', hold_service.expire_ready_holds),
+        ('export:borrow_records', lambda: list(export_service.iter_csv_chunks(
+            'borrow_records', start_date=today - timedelta(days=7), end_date=today))),
+        ('read_events', lambda: event_service.read_events(100, 200)),
+        ('consume_events', lambda: event_service.consume_events('query_plan_consumer', lambda batch: None,
+                                                                max_batches=2)),
+        ('reconcile_inventory', inventory_service.reconcile_inventory),
+        ('reconcile_inventory:incremental', lambda: inventory_service.reconcile_inventory(incremental=True)),
+    ]
+
+
+@pytest.fixture(scope="module")
+def traced(tmp_path_factory):
+    """Seed a large database, run the workload and collect {fingerprint: statement info}."""
+    path = str(tmp_path_factory.mktemp("plans") / "large.db")
+    seed_dataset(path, BOOKS, PATRONS, LOANS)
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO holds (patron_id, book_id, created_at, status, expires_at) VALUES (?, ?, ?, ?, ?)",
+                     [(f"{100000 + i % PATRONS}", i % BOOKS + 1, datetime.now().isoformat(),
+                       'waiting' if i % 4 else 'ready', datetime.now().isoformat()) for i in range(2000)])
+    conn.executemany("INSERT INTO circulation_events (event_type, occurred_at, book_id, patron_id) VALUES (?, ?, ?, ?)",
+                     [('checkout' if i % 2 else 'return', datetime.now().isoformat(), i % BOOKS + 1,
+                       f"{100000 + i % PATRONS}") for i in range(20000)])
+    conn.commit()
+    conn.close()
+
+    statements = {}
+    current = {'step': None}
+    lock = threading.Lock()
+    real_connect = sqlite3.connect
+
+    def record(sql):
+        if current['step'] and re.match(r"\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", sql, re.I):
+            with lock:
+                info = statements.setdefault(fingerprint(sql), {'sql': sql, 'steps': set()})
+                info['steps'].add(current['step'])
+
+    def connect(*args, **kwargs):
+        conn = real_connect(*args, **kwargs)
+        conn.set_trace_callback(record)
+        return conn
+
+    calls = workload()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sqlite3, "connect", connect)
+        with database.use_database(path):
+            database.get_db_connection().close()  # schema check outside the trace
+            database.rebuild_circulation_rollups()
+            for step, call in calls:
+                current['step'] = step
+                call()
+            current['step'] = None
+            database.get_write_queue().submit(lambda conn: None).result()
+
+    return path, statements, [step for step, _ in calls]
+
+
+def plan_problems(conn, sql):
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+    problems = []
+    for row in rows:
+        detail = row[3]
+        if detail.startswith("SCAN ") and not re.match(r"SCAN (CONSTANT ROW|\(subquery-\d+\)|\w+ VIRTUAL TABLE)", detail):
+            problems.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def allowed_reason(key):
+    for pattern, reason in ALLOWED.items():
+        if re.search(pattern, key):
+            return reason
+    return None
+
+
+def test_workload_covers_every_database_query():
+    """every public query helper in database.py is exercised by the workload"""
+    helpers = {name for name, obj in inspect.getmembers(database, inspect.isfunction)
+               if obj.__module__ == 'database' and not name.startswith('_')}
+    exercised = {part.split(':')[0] for step, _ in workload() for part in step.split('+')}
+    assert helpers - NOT_QUERIES - exercised == set()
+
+
+def test_hot_queries_use_indexes(traced):
+    path, statements, _ = traced
+    conn = sqlite3.connect(path)
+    failures = []
+    for key, info in sorted(statements.items()):
+        problems = plan_problems(conn, info['sql'])
+        if problems and not allowed_reason(key):
+            failures.append(f"{sorted(info['steps'])}: {key}\n    " + "\n    ".join(problems))
+    conn.close()
+    assert not failures, "Queries without a usable index:\n" + "\n".join(failures)
+
+
+def test_allowlist_has_no_stale_entries(traced):
+    """each allowlisted pattern still matches a traced statement that needs it"""
+    path, statements, _ = traced
+    conn = sqlite3.connect(path)
+    needed = {pattern for key, info in statements.items() if plan_problems(conn, info['sql'])
+              for pattern in ALLOWED if re.search(pattern, key)}
+    conn.close()
+    assert set(ALLOWED) - needed == set()
+
+
+def test_record_timing_baseline(traced, request):
+    """time each read statement and compare with the baseline from the previous run"""
+    path, statements, _ = traced
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    timings = {}
+    for key, info in statements.items():
+        if not info['sql'].lstrip().upper().startswith(('SELECT', 'WITH')):
+            continue
+        started = time.perf_counter()
+        conn.execute(info['sql']).fetchall()
+        timings[key] = round(time.perf_counter() - started, 6)
+    conn.close()
+
+    baseline = request.config.cache.get("query_plan/timings", {})
+    slower = [f"{timings[k]:.4f}s (was {baseline[k]:.4f}s): {k}" for k in timings
+              if k in baseline and timings[k] > max(baseline[k] * SLOWDOWN_FACTOR, SLOWDOWN_MIN_SECONDS)]
+    if slower:
+        warnings.warn("Queries slower than the recorded baseline:\n" + "\n".join(slower))
+
+    request.config.cache.set("query_plan/timings", {**baseline, **timings})
+    assert timings
@@ -0,0 +1,113 @@
+import pytest
+
+import metrics
+from middleware import rate_limit
+from middleware.rate_limit import PRUNE_INTERVAL, RateLimiter, parse_limit
+
+
+@pytest.fixture
+def app_config():
+    return {"RATE_LIMITS": {
+        "borrowing": {"patron": "2/minute", "client": "5/minute"},
+        "api": {"client": "3/second"},
+    }}
+
+
+@pytest.fixture
+def app(app):
+    metrics.reset()
+    return app
+
+
+def test_parse_limit():
+    assert parse_limit("30/minute") == (0.5, 30)
+    with pytest.raises(ValueError):
+        parse_limit("30 per minute")
+
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    limiter = RateLimiter({"bp": {"client": "2/second"}}, clock=lambda: now[0])
+    keys = {"client": "10.0.0.1"}
+
+    assert limiter.check("bp", keys) == (0.0, None)
+    assert limiter.check("bp", keys) == (0.0, None)
+    wait, kind = limiter.check("bp", keys)
+    assert kind == "client" and wait == pytest.approx(0.5)
+
+    now[0] = 0.5
+    assert limiter.check("bp", keys) == (0.0, None)
+    assert limiter.check("other", keys) == (0.0, None)  # unconfigured blueprints are not limited
+
+
+def test_refused_requests_cost_no_tokens():
+    """a patron over their limit does not drain the shared client bucket"""
+    limiter = RateLimiter({"bp": {"patron": "1/minute", "client": "3/minute"}}, clock=lambda: 0.0)
+    assert limiter.check("bp", {"patron": "111111", "client": "kiosk"})[1] is None
+    for _ in range(5):
+        assert limiter.check("bp", {"patron": "111111", "client": "kiosk"})[1] == "patron"
+    assert limiter.check("bp", {"patron": "222222", "client": "kiosk"})[1] is None
+
+
+def test_idle_buckets_are_pruned_on_an_interval():
+    now = [0.0]
+    limiter = RateLimiter({"bp": {"client": "1/second"}}, clock=lambda: now[0])
+    for client in ("a", "b", "c"):
+        limiter.check("bp", {"client": client})
+    now[0] = PRUNE_INTERVAL - 0.5
+    limiter.check("bp", {"client": "c"})
+    assert list(limiter._buckets) == [("bp", "client", "a"), ("bp", "client", "b"), ("bp", "client", "c")]
+
+    now[0] = PRUNE_INTERVAL
+    limiter.check("bp", {"client": "d"})
+    assert list(limiter._buckets) == [("bp", "client", "c"), ("bp", "client", "d")]
+
+
+def test_least_recently_used_buckets_are_evicted_past_the_cap(monkeypatch):
+    monkeypatch.setattr(rate_limit, "MAX_BUCKETS", 2)
+    limiter = RateLimiter({"bp": {"client": "1/minute"}}, clock=lambda: 0.0)
+    limiter.check("bp", {"client": "a"})
+    limiter.check("bp", {"client": "b"})
+    assert limiter.check("bp", {"client": "a"})[1] == "client"  # a is now the most recent
+    limiter.check("bp", {"client": "c"})
+    assert list(limiter._buckets) == [("bp", "client", "a"), ("bp", "client", "c")]
+    assert limiter.check("bp", {"client": "a"})[1] == "client"
+
+
+def test_patron_limit_returns_429_with_retry_after(app):
+    client = app.test_client()
+    for _ in range(2):
+        assert client.post("/borrow", data={"patron_id": "111111", "book_id": 1}).status_code == 302
+
+    response = client.post("/borrow", data={"patron_id": "111111", "book_id": 1})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 30
+
+    # another patron at the same kiosk still gets through, until the client limit
+    assert client.post("/return", data={"patron_id": "222222", "book_id": 1}).status_code != 429
+    assert client.post("/return", data={"patron_id": "333333", "book_id": 1}).status_code != 429
+    assert client.post("/return", data={"patron_id": "444444", "book_id": 1}).status_code != 429
+    assert client.post("/return", data={"patron_id": "555555", "book_id": 1}).status_code == 429
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["rate_limit.limited.borrowing.patron"] == 1
+    assert counters["rate_limit.limited.borrowing.client"] == 1
+    assert counters["rate_limit.allowed.borrowing"] == 5
+
+
+def test_api_limit_and_unlimited_blueprints(app):
+    client = app.test_client()
+    statuses = [client.get("/api/late_fee/123456/3").status_code for _ in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    assert all(client.get("/catalog").status_code == 200 for _ in range(10))
+
+
+def test_writes_are_shed_when_the_queue_is_deep(app, monkeypatch):
+    monkeypatch.setattr("middleware.rate_limit.write_queue_depth", lambda: 1000)
+    client = app.test_client()
+
+    response = client.post("/borrow", data={"patron_id": "111111", "book_id": 1})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert client.get("/api/late_fee/123456/3").status_code == 200  # reads are not shed
+    assert metrics.snapshot()["counters"]["rate_limit.shed.borrowing"] == 1
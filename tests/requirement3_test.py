@@ -14,11 +14,8 @@ def test_borrow_book_valid_input(mocker):
     # Mock patron borrow count (currently has 0 books)
     mocker.patch("services.library_service.get_patron_borrow_count", return_value=0)
     
-    # Mock inserting borrow record → succeed
-    mocker.patch("services.library_service.insert_borrow_record", return_value=True)
-    
-    # Mock updating book availability → succeed
-    mocker.patch("services.library_service.update_book_availability", return_value=True)
+    # Mock the atomic borrow write (record + availability) → succeed
+    mocker.patch("services.library_service.borrow_copy", return_value="borrowed")
 
     success, message = borrow_book_by_patron("123456", 83)
 
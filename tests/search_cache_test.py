@@ -0,0 +1,85 @@
+import sqlite3
+import pytest
+
+import database
+import metrics
+from services.library_service import add_book_to_catalog, borrow_book_by_patron, search_books_in_catalog
+from services.search_cache import SearchCache, search_cache
+
+
+@pytest.fixture
+def app(app):
+    search_cache.clear()
+    metrics.reset()
+    return app
+
+
+def counter(name):
+    return metrics.snapshot()["counters"].get(name, 0)
+
+
+def test_repeated_searches_hit_the_cache(app, mocker):
+    """normalized repeats are served without re-reading the catalog"""
+    spy = mocker.spy(database, "get_all_books")
+    mocker.patch("services.library_service.get_all_books", spy)
+
+    first = search_books_in_catalog("Gatsby", "title")
+    second = search_books_in_catalog("  gatsby ", "TITLE")
+
+    assert first == second and len(first) == 1
+    assert spy.call_count == 1
+    assert counter("search_cache.hits") == 1
+
+    second[0]["title"] = "mutated"  # callers get copies
+    assert search_books_in_catalog("gatsby", "title")[0]["title"] == "The Great Gatsby"
+
+
+def test_catalog_changes_invalidate(app):
+    """new books and availability changes (even from other connections) bump the version"""
+    assert search_books_in_catalog("gatsby", "title")[0]["available_copies"] == 3
+
+    borrow_book_by_patron("111111", 1)
+    assert search_books_in_catalog("gatsby", "title")[0]["available_copies"] == 2
+
+    add_book_to_catalog("Gatsby Revisited", "Author", "9780000000019", 1)
+    assert len(search_books_in_catalog("gatsby", "title")) == 2
+
+    conn = sqlite3.connect(database.DATABASE)
+    conn.execute("DELETE FROM books WHERE title = 'Gatsby Revisited'")
+    conn.commit()
+    conn.close()
+    assert len(search_books_in_catalog("gatsby", "title")) == 1
+    assert counter("search_cache.invalidations") == 3
+
+
+def test_lru_eviction_and_size_caps():
+    cache = SearchCache(max_entries=2, max_bytes=10_000, max_entry_bytes=500)
+    metrics.reset()
+    book = {"title": "x" * 50}
+    cache.put(("db", "a", "title"), 1, [book])
+    cache.put(("db", "b", "title"), 1, [book])
+    cache.get(("db", "a", "title"), 1)           # a is now most recent
+    cache.put(("db", "c", "title"), 1, [book])   # evicts b
+
+    assert cache.get(("db", "b", "title"), 1) is None
+    assert cache.get(("db", "a", "title"), 1) == [book]
+    assert counter("search_cache.evictions") == 1
+
+    assert cache.put(("db", "broad", "title"), 1, [book] * 20) is False
+    assert counter("search_cache.oversize") == 1
+
+    small = SearchCache(max_bytes=200)
+    for term in "abcd":
+        small.put(("db", term, "title"), 1, [book])
+    assert small.stats()["bytes"] <= 200
+    assert small.stats()["entries"] == 3  # 63 bytes each
+
+
+def test_cache_stats_in_metrics(app):
+    client = app.test_client()
+    client.get("/api/search?q=gatsby")
+    client.get("/api/search?q=gatsby")
+
+    stats = client.get("/api/metrics").get_json()["search_cache"]
+    assert stats["entries"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,67 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import database
+from loadtest import check_borrow_invariants, run_borrow_stress, seed_dataset
+from services.library_service import MAX_BORROWED_BOOKS, borrow_book_by_patron, return_book_by_patron
+
+
+@pytest.fixture
+def db(database_path):
+    seed_dataset(database_path, books=12, patrons=5, loans=0)
+    return database_path
+
+
+def together(count, call):
+    """run call(i) from `count` threads released at the same moment"""
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        return call(i)
+    with ThreadPoolExecutor(count) as pool:
+        return list(pool.map(run, range(count)))
+
+
+def test_last_copy_goes_to_exactly_one_patron(db):
+    database.insert_book("Last Copy", "Author", "9790000009990", 1, 1)
+    book_id = database.get_book_by_isbn("9790000009990")["id"]
+
+    results = together(16, lambda i: borrow_book_by_patron(f"{200000 + i}", book_id))
+    assert sum(success for success, _ in results) == 1
+    assert database.get_book_by_id(book_id)["available_copies"] == 0
+    assert check_borrow_invariants(db) == {"negative_availability": [], "over_limit": [], "drift": []}
+
+
+def test_parallel_borrows_stop_at_the_limit(db):
+    results = together(12, lambda i: borrow_book_by_patron("300000", i + 1))
+    assert sum(success for success, _ in results) == MAX_BORROWED_BOOKS
+    assert database.get_patron_borrow_count("300000") == MAX_BORROWED_BOOKS
+
+
+def test_concurrent_returns_of_one_loan_return_one_copy(db):
+    assert borrow_book_by_patron("300000", 1)[0]
+    results = together(8, lambda i: return_book_by_patron("300000", 1))
+    assert sum(success for success, _ in results) == 1
+    assert all(message == "Book was not Borrowed by Patron" for success, message in results if not success)
+    assert check_borrow_invariants(db)["drift"] == []
+
+
+def test_second_copy_return_closes_one_loan(db):
+    now = datetime.now()
+    for _ in range(2):
+        assert database.borrow_copy("300000", 1, now, now, MAX_BORROWED_BOOKS) == "borrowed"
+    assert return_book_by_patron("300000", 1)[0]
+    assert database.get_patron_borrow_count("300000") == 1
+    assert check_borrow_invariants(db)["drift"] == []
+
+
+@pytest.mark.parametrize("workers,use_processes", [(1, False), (4, False), (8, False), (2, True)])
+def test_stress_keeps_invariants(tmp_path, workers, use_processes):
+    result = run_borrow_stress(workers, 60, use_processes, books=8, patrons=4,
+                               database_path=str(tmp_path / "run.db"))
+    assert result["invariants"] == {"negative_availability": [], "over_limit": [], "drift": []}
+    assert result["errors"] == 0
+    assert result["borrowed"] > 0 and result["borrows_per_second"] > 0
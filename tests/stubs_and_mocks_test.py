@@ -54,10 +54,10 @@ def test_get_book_by_id_stub(mocker):
 # pay_late_fees tests
 # Successful payment
 def test_pay_late_fees_successful_payment_mock():
-    with patch("services.library_service.calculate_late_fee_for_book") as mock_fee, \
+    with patch("services.library_service.get_outstanding_late_fees") as mock_fee, \
          patch("services.library_service.get_book_by_id") as mock_book:
 
-        mock_fee.return_value = {"fee_amount": 1.5, "days_overdue": 3}
+        mock_fee.return_value = 1.5
         mock_book.return_value = {"id": 1, "title": "Test Book"}
 
         mock_gateway = Mock(spec=PaymentGateway)
@@ -78,10 +78,10 @@ def test_pay_late_fees_successful_payment_mock():
 
 # Declined payment
 def test_pay_late_fees_declined_payment_mock():
-    with patch("services.library_service.calculate_late_fee_for_book") as mock_fee, \
+    with patch("services.library_service.get_outstanding_late_fees") as mock_fee, \
          patch("services.library_service.get_book_by_id") as mock_book:
 
-        mock_fee.return_value = {"fee_amount": 2.5, "days_overdue": 5}
+        mock_fee.return_value = 2.5
         mock_book.return_value = {"id": 1, "title": "Test Book"}
 
         mock_gateway = Mock(spec=PaymentGateway)
@@ -114,10 +114,10 @@ def test_pay_late_fees_invalid_id_mock():
 
 # No late fees 
 def test_pay_late_fees_zero_late_fees_mock():
-    with patch("services.library_service.calculate_late_fee_for_book") as mock_fee, \
+    with patch("services.library_service.get_outstanding_late_fees") as mock_fee, \
          patch("services.library_service.get_book_by_id") as mock_book:
 
-        mock_fee.return_value = {"fee_amount": 0.0, "days_overdue": 0}
+        mock_fee.return_value = 0.0
         mock_book.return_value = {"id": 1, "title": "Test Book"}
 
         mock_gateway = Mock(spec=PaymentGateway)
@@ -131,10 +131,10 @@ def test_pay_late_fees_zero_late_fees_mock():
 
 # Network error 
 def test_pay_late_fees_network_error_mock():
-    with patch("services.library_service.calculate_late_fee_for_book") as mock_fee, \
+    with patch("services.library_service.get_outstanding_late_fees") as mock_fee, \
          patch("services.library_service.get_book_by_id") as mock_book:
 
-        mock_fee.return_value = {"fee_amount": 1.5, "days_overdue": 3}
+        mock_fee.return_value = 1.5
         mock_book.return_value = {"id": 1, "title": "Test Book"}
 
         mock_gateway = Mock(spec=PaymentGateway)